@@ -1,3 +1,6 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import Depends, FastAPI
 from .middleware.rate_limit import SimpleRateLimiter
 from .routers import (
@@ -16,8 +19,32 @@ from .routers import (
     vision,
 )
 from .security.api_key import require_api_key
+from .services.encoder import sbert_encoder
+from .services.index_registry import REGISTRIES, REGISTRY_CFG
+from .services.vision_pipeline import vision_executor, warmup_error, warmup_vision
+
+logger = logging.getLogger(__name__)
+
 
-app = FastAPI(title="SocialSense-SLM", version="0.1.0", dependencies=[Depends(require_api_key)])  # type: ignore
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pay model loading before the first request instead of during it.
+    # Failures are recorded and shown under /telemetry/encoder and /telemetry/vision.
+    sbert_encoder.warmup()
+    warmup_vision()
+    for name, error in (("encoder", sbert_encoder.warmup_error), ("vision", warmup_error())):
+        if error:
+            logger.warning("%s warmup failed: %s", name, error)
+    for registry in REGISTRIES.values():
+        registry.reload()
+        registry.start_watcher(float(REGISTRY_CFG["watch_interval_s"]))
+    yield
+    for registry in REGISTRIES.values():
+        registry.stop_watcher()
+    vision_executor.shutdown()
+
+
+app = FastAPI(title="SocialSense-SLM", version="0.1.0", dependencies=[Depends(require_api_key)], lifespan=lifespan)  # type: ignore
 
 app.add_middleware(SimpleRateLimiter, calls=120, per_seconds=60)
 app.include_router(chat.router, prefix="/chat", tags=["chat"])
@@ -34,6 +61,7 @@ app.include_router(features.router, prefix="/features", tags=["features"])
 app.include_router(explain.router, prefix="/explain", tags=["explain"])
 app.include_router(governance.router, prefix="/governance", tags=["governance"])
 
+
 @app.get("/")
 def root():
     return {"ok": True, "message": "SocialSense-SLM API is up"}
@@ -1,24 +1,129 @@
-from fastapi import APIRouter
-from .rag_helpers import search as ann_search, ensure_index
+import json
+import time
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..services.rerank import RERANK_CFG, chat_stages, reranker, trim_snippet
+from .rag_helpers import ann_params, parse_retriever, search as ann_search, ensure_index
 
 router = APIRouter()
 
+REFUSAL = "I don't have enough evidence in my knowledge base."
+
+
+def _rerank_params(body: dict) -> dict:
+    """Two-stage settings: ``rerank``, ``candidates`` and ``rerank_budget_ms``."""
+    try:
+        return {
+            "enabled": bool(body.get("rerank", RERANK_CFG["enabled"])),
+            "candidates": max(1, int(body.get("candidates", RERANK_CFG["candidates"]))),
+            "budget_ms": max(0.0, float(body.get("rerank_budget_ms", RERANK_CFG["budget_ms"]))),
+        }
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="candidates and rerank_budget_ms must be numbers.")
+
+
+def _parse_ask(body: dict) -> dict:
+    return {
+        "query": body.get("query", "").strip(),
+        "top_k": int(body.get("top_k", 5)),
+        "retriever": parse_retriever(body),
+        "ann": ann_params(body),
+        "rerank": _rerank_params(body),
+    }
+
+
+def _retrieve(req: dict, timings: dict):
+    """First-stage hits, reranked when asked; ``(hits, rerank_info)``."""
+    ensure_index()
+    rerank = req["rerank"]
+    fetch = max(req["top_k"], rerank["candidates"]) if rerank["enabled"] else req["top_k"]
+    with chat_stages.time("retrieve", timings):
+        hits = ann_search(req["query"], fetch, retriever=req["retriever"], **req["ann"])
+    if not (rerank["enabled"] and hits):
+        return hits, None
+    with chat_stages.time("rerank", timings):
+        return reranker.rerank(req["query"], hits, req["top_k"], rerank["budget_ms"])
+
+
+def _present(hit: dict, req: dict) -> dict:
+    if not req["rerank"]["enabled"]:
+        return hit
+    return {**hit, "text": trim_snippet(hit["text"], req["query"], RERANK_CFG["snippet_chars"])}
+
+
+def _confidence(hits: list) -> float:
+    # BM25 scores are unbounded; dense cosine and fused RRF are already <= 1.
+    return min(1.0, hits[0]["score"]) if hits else 0.0
+
 
 @router.post("/ask")
 def ask(body: dict):
-    query = body.get("query", "").strip()
-    if not query:
+    req = _parse_ask(body)
+    if not req["query"]:
         return {"answer": "", "citations": [], "confidence": 0.0, "refused": True}
-    top_k = int(body.get("top_k", 5))
-    ensure_index()
-    hits = ann_search(query, top_k)
+    timings = {}
+    with chat_stages.time("total", timings):
+        hits, rerank_info = _retrieve(req, timings)
+        hits = [_present(hit, req) for hit in hits]
     if not hits:
-        return {"answer": "I don't have enough evidence in my knowledge base.", "citations": [], "confidence": 0.0, "refused": True}
+        return {"answer": REFUSAL, "citations": [], "confidence": 0.0, "refused": True, "timings_ms": timings}
     answer = "\n\n".join(f"[{hit['title']}] {hit['text']}" for hit in hits)
     citations = [{"title": hit["title"], "score": hit["score"]} for hit in hits]
     return {
         "answer": answer,
         "citations": citations,
-        "confidence": hits[0]["score"],
+        "confidence": _confidence(hits),
         "refused": False,
+        "rerank": rerank_info,
+        "timings_ms": timings,
     }
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+@router.post("/ask_stream")
+async def ask_stream(body: dict, request: Request):
+    """``/ask`` as Server-Sent Events: ``meta``, one ``hit`` per citation, ``done``.
+
+    Retrieval runs in the threadpool before the stream opens, so a missing
+    index or bad retriever is still an HTTP error rather than a stream cut
+    off after a 200. Events are produced one at a time and only after the
+    server has accepted the previous one, so a slow reader holds back the
+    generator instead of a queue of events. The stream stops early when
+    the client disconnects.
+    """
+    req = _parse_ask(body)
+    start = time.perf_counter()
+    timings = {}
+    hits, rerank_info = [], None
+    if req["query"]:
+        hits, rerank_info = await run_in_threadpool(_retrieve, req, timings)
+
+    async def events():
+        try:
+            if await request.is_disconnected():
+                return
+            yield _sse("meta", {"retriever": req["retriever"], "count": len(hits), "rerank": rerank_info, "timings_ms": dict(timings)})
+            for hit in hits:
+                if await request.is_disconnected():
+                    return
+                yield _sse("hit", _present(hit, req))
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            chat_stages.tracker("stream_total").observe(ms)
+            timings["stream_total"] = round(ms, 3)
+        done = {"confidence": _confidence(hits), "refused": not hits, "timings_ms": timings}
+        if req["query"] and not hits:
+            done["message"] = REFUSAL
+        yield _sse("done", done)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
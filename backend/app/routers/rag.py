@@ -1,6 +1,15 @@
 from fastapi import APIRouter, HTTPException
 
-from ..services.rag_index import rag_index
+from ..services.index_registry import REGISTRIES
+from ..services.query_cache import query_cache
+from ..services.rag_index import INGEST_MODES, rag_index
+from .rag_helpers import (
+    RETRIEVERS,
+    ann_params,
+    batch_response,
+    parse_batch_queries,
+    search_batch as ann_search_batch,
+)
 
 router = APIRouter()
 
@@ -15,8 +24,19 @@ def ingest(body: dict):
     docs = body.get("docs")
     if not docs or not isinstance(docs, list):
         raise HTTPException(status_code=400, detail="Provide a list of docs to ingest.")
-    stored = rag_index.ingest(docs)
-    return {"ingested": len(stored)}
+    mode = body.get("mode", "replace")
+    if mode not in INGEST_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {list(INGEST_MODES)}.")
+    stored = rag_index.ingest(docs, mode=mode)
+    return {"ingested": len(stored), "mode": mode}
+
+
+@router.post("/delete")
+def delete(body: dict):
+    ids = body.get("ids")
+    if not ids or not isinstance(ids, list):
+        raise HTTPException(status_code=400, detail="Provide a list of doc ids to delete.")
+    return {"deleted": rag_index.delete(ids)}
 
 
 @router.post("/search")
@@ -25,5 +45,43 @@ def search(body: dict):
     if not query:
         raise HTTPException(status_code=400, detail="Query is required.")
     top_k = int(body.get("top_k", 5))
-    hits = rag_index.search(query, top_k)
+    hits = _tfidf_search([query], top_k)[0]
     return {"hits": hits, "count": len(hits)}
+
+
+def _tfidf_search(queries, top_k):
+    return query_cache.cached_batch(
+        "tfidf", rag_index.cache_id, queries, top_k, None, lambda misses: rag_index.search_batch(misses, top_k)
+    )
+
+
+@router.post("/search_batch")
+def search_batch(body: dict):
+    queries = parse_batch_queries(body)
+    top_k = int(body.get("top_k", 5))
+    retriever = body.get("retriever", "tfidf")
+    if retriever == "tfidf":
+        return batch_response(queries, lambda live: _tfidf_search(live, top_k))
+    # "svd" is the original name of the dense retriever.
+    mode = "dense" if retriever == "svd" else retriever
+    if mode in RETRIEVERS:
+        params = ann_params(body)
+        return batch_response(queries, lambda live: ann_search_batch(live, top_k, retriever=mode, **params))
+    raise HTTPException(status_code=400, detail=f"retriever must be one of {['tfidf', 'svd', *RETRIEVERS]}.")
+
+
+@router.get("/admin/status")
+def admin_status():
+    return {name: registry.status() for name, registry in REGISTRIES.items()}
+
+
+@router.post("/admin/reload")
+def admin_reload(body: dict):
+    """Load the ACTIVE version of one or all indexes in the background."""
+    name = body.get("index", "all")
+    if name != "all" and name not in REGISTRIES:
+        raise HTTPException(status_code=400, detail=f"index must be 'all' or one of {list(REGISTRIES)}.")
+    targets = REGISTRIES if name == "all" else {name: REGISTRIES[name]}
+    wait = bool(body.get("wait", False))
+    force = bool(body.get("force", False))
+    return {key: registry.reload(wait=wait, force=force) for key, registry in targets.items()}
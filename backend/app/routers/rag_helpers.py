@@ -1,69 +1,133 @@
-from pathlib import Path
-import json
-
-import joblib
 import numpy as np
+from fastapi import HTTPException
 
-STATE = {"vectorizer": None, "svd": None, "emb": None, "docs": [], "faiss": None}
+from ..services.ann import ann_search
+from ..services.index_registry import svd_registry
+from ..services.query_cache import query_cache
+from ..services.ranking import reciprocal_rank_fusion, top_k_indices
 
+MAX_BATCH_QUERIES = 1024
+SCORE_BLOCK = 256
+RETRIEVERS = ("dense", "bm25", "hybrid")
+# Each retriever contributes this many candidates to rank fusion.
+FUSION_DEPTH = 50
 
-def _safe_load(path):
-    try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except Exception:
-        return []
 
+def ann_params(body: dict) -> dict:
+    """Optional query-time ANN knobs from a request body."""
+    params = {}
+    for key in ("nprobe", "ef_search"):
+        if body.get(key) is not None:
+            try:
+                params[key] = max(1, int(body[key]))
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail=f"{key} must be an integer.")
+    return params
 
-def ensure_index():
-    base = Path("models/rag")
-    if STATE["vectorizer"] is not None:
-        return True
-    vec = base / "tfidf_vectorizer.joblib"
-    svd = base / "svd.joblib"
-    emb = base / "embeddings.npy"
-    docs = base / "docs.jsonl"
-    if not (vec.exists() and svd.exists() and emb.exists() and docs.exists()):
-        return False
-    STATE["vectorizer"] = joblib.load(vec)
-    STATE["svd"] = joblib.load(svd)
-    STATE["emb"] = np.load(emb)
-    STATE["docs"] = _safe_load(docs)
-    try:
-        import faiss
-
-        idx_path = base / "faiss.index"
-        if idx_path.exists():
-            STATE["faiss"] = faiss.read_index(str(idx_path))
-    except Exception:
-        STATE["faiss"] = None
-    return True
-
-
-def search(query, top_k=5):
-    if not ensure_index():
-        return []
-    vec = STATE["vectorizer"].transform([query])
-    proj = STATE["svd"].transform(vec)
-    normed = proj / (np.linalg.norm(proj, axis=1, keepdims=True) + 1e-8)
-    if STATE["faiss"] is not None:
-        D, I = STATE["faiss"].search(normed.astype("float32"), top_k)
-        sims = D[0].tolist()
-        idxs = I[0].tolist()
-    else:
-        sim = (STATE["emb"] @ normed.T).ravel()
-        idxs = np.argsort(-sim)[:top_k]
-        sims = [float(sim[i]) for i in idxs]
+
+def parse_retriever(body: dict, default: str = "dense") -> str:
+    retriever = body.get("retriever") or default
+    if retriever not in RETRIEVERS:
+        raise HTTPException(status_code=400, detail=f"retriever must be one of {list(RETRIEVERS)}.")
+    return retriever
+
+
+def parse_batch_queries(body: dict) -> list[str]:
+    queries = body.get("queries")
+    if not queries or not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+        raise HTTPException(status_code=400, detail="queries must be a non-empty list of strings.")
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per batch.")
+    return [q.strip() for q in queries]
+
+
+def batch_response(queries: list[str], search_fn) -> dict:
+    """Run ``search_fn`` once over the non-empty queries and shape the reply."""
+    live = [q for q in queries if q]
+    found = iter(search_fn(live) if live else [])
+    results = [next(found) if q else [] for q in queries]
+    return {
+        "results": [
+            {"query": q, "hits": hits, "count": len(hits)} for q, hits in zip(queries, results)
+        ],
+        "count": len(results),
+    }
+
+
+def rank_dense(emb, query_vecs, top_k, index=None, nprobe=None, ef_search=None):
+    """Top-k (scores, ids) for each row of ``query_vecs`` against ``emb``.
+
+    One ANN ``search`` call covers the whole batch when an index is
+    loaded (``nprobe``/``ef_search`` tune IVF/HNSW recall per call);
+    otherwise the batch is scored exactly with one matrix product per
+    ``SCORE_BLOCK`` queries.
+    """
+    query_vecs = np.ascontiguousarray(query_vecs, dtype="float32")
+    if index is not None:
+        D, I = ann_search(index, emb, query_vecs, top_k, nprobe, ef_search)
+        return D.tolist(), I.tolist()
+    scores, ids = [], []
+    for start in range(0, len(query_vecs), SCORE_BLOCK):
+        sim = query_vecs[start : start + SCORE_BLOCK] @ emb.T
+        idx = top_k_indices(sim, top_k)
+        scores.extend(np.take_along_axis(sim, idx, axis=1).tolist())
+        ids.extend(idx.tolist())
+    return scores, ids
+
+
+def format_hits(docs, scores, idxs):
     hits = []
     for rank, idx in enumerate(idxs, start=1):
-        if idx < 0 or idx >= len(STATE["docs"]):
+        if idx < 0 or idx >= len(docs):
             continue
-        doc = STATE["docs"][idx]
+        doc = docs[idx]
         hits.append(
             {
                 "rank": rank,
-                "score": sims[rank - 1] if rank - 1 < len(sims) else 0.0,
+                "score": float(scores[rank - 1]) if rank - 1 < len(scores) else 0.0,
                 "title": doc.get("title", f"doc_{idx}"),
                 "text": doc.get("text", "")[:512],
             }
         )
     return hits
+
+
+def ensure_index():
+    return svd_registry.current() is not None
+
+
+def search(query, top_k=5, nprobe=None, ef_search=None, retriever="dense"):
+    return search_batch([query], top_k, nprobe, ef_search, retriever)[0]
+
+
+def search_batch(queries, top_k=5, nprobe=None, ef_search=None, retriever="dense"):
+    snap = svd_registry.current()
+    if snap is None:
+        return [[] for _ in queries]
+    if not queries:
+        return []
+    if retriever != "dense" and snap.data["bm25"] is None:
+        raise HTTPException(status_code=404, detail="BM25 index missing; rebuild with scripts/rag/build_ann.py.")
+    params = {"nprobe": nprobe, "ef_search": ef_search, "retriever": retriever}
+    return query_cache.cached_batch(
+        "svd", snap.version, queries, top_k, params,
+        lambda misses: _search_snapshot(snap, misses, top_k, nprobe, ef_search, retriever),
+    )
+
+
+def _search_snapshot(snap, queries, top_k, nprobe, ef_search, retriever="dense"):
+    # One snapshot for the whole call, so a concurrent swap can't mix versions.
+    state = snap.data
+    if retriever == "bm25":
+        ranked = [state["bm25"].search(q, top_k)[:2] for q in queries]
+        return [format_hits(state["docs"], s.tolist(), i.tolist()) for s, i in ranked]
+    depth = max(top_k, FUSION_DEPTH) if retriever == "hybrid" else top_k
+    scores, ids = rank_dense(state["emb"], state["embed"](queries), depth, state["ann"], nprobe, ef_search)
+    if retriever == "dense":
+        return [format_hits(state["docs"], s, i) for s, i in zip(scores, ids)]
+    results = []
+    for query, dense_ids in zip(queries, ids):
+        _, sparse_ids, _ = state["bm25"].search(query, depth)
+        fused_ids, fused_scores = reciprocal_rank_fusion([dense_ids, sparse_ids.tolist()], top_k)
+        results.append(format_hits(state["docs"], fused_scores, fused_ids))
+    return results
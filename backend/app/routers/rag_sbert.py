@@ -1,71 +1,68 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, HTTPException
-from pathlib import Path
-import json
+from fastapi.concurrency import run_in_threadpool
 
-import joblib
-import numpy as np
+from ..services.encoder import sbert_batcher, sbert_encoder
+from ..services.index_registry import sbert_registry
+from ..services.query_cache import query_cache
+from .rag_helpers import ann_params, batch_response, format_hits, parse_batch_queries, rank_dense
 
 router = APIRouter(tags=["rag"])
 
-STATE = {"embedding": None, "docs": [], "index": None}
 
+def _search_vectors(snap, query_vecs, top_k, nprobe=None, ef_search=None):
+    state = snap.data
+    scores, ids = rank_dense(state["emb"], query_vecs, top_k, state["ann"], nprobe, ef_search)
+    return [format_hits(state["docs"], s, i) for s, i in zip(scores, ids)]
 
-def _load():
-    base = Path("models/rag_sbert")
-    emb_path = base / "embeddings.npy"
-    docs_path = base / "docs.jsonl"
-    if not emb_path.exists() or not docs_path.exists():
-        return False
-    STATE["embedding"] = np.load(emb_path)
-    STATE["docs"] = [json.loads(line) for line in docs_path.read_text(encoding="utf-8").splitlines() if line.strip()]
-    try:
-        import faiss
 
-        idx_path = base / "faiss.index"
-        if idx_path.exists():
-            STATE["index"] = faiss.read_index(str(idx_path))
-    except Exception:
-        STATE["index"] = None
-    return True
-
-
-def _ensure_loaded():
-    if STATE["embedding"] is not None:
-        return True
-    return _load()
+def _encode(queries):
+    return sbert_encoder.encode(queries)
 
 
 @router.post("/search")
-def search(body: dict):
+async def search(body: dict):
     query = str(body.get("query", "")).strip()
     top_k = int(body.get("top_k", 5))
     if not query:
         raise HTTPException(status_code=400, detail="query required")
-    if not _ensure_loaded():
+    snap = await run_in_threadpool(sbert_registry.current)
+    if snap is None:
         raise HTTPException(status_code=404, detail="SBERT index missing")
-    model = joblib.load(Path("models/rag_sbert") / "encoder.joblib")
-    query_vec = model.encode([query], convert_to_numpy=True)
-    if STATE["index"] is not None:
-        D, I = STATE["index"].search(query_vec.astype("float32"), top_k)
-        scores = D[0].tolist()
-        idxs = I[0].tolist()
-    else:
-        sims = STATE["embedding"] @ query_vec.T
-        sims = sims.ravel()
-        idxs = np.argsort(-sims)[:top_k]
-        scores = [float(sims[i]) for i in idxs]
-    hits = []
-    for rank, idx in enumerate(idxs, start=1):
-        if 0 <= idx < len(STATE["docs"]):
-            doc = STATE["docs"][idx]
-            hits.append(
-                {
-                    "rank": rank,
-                    "score": scores[rank - 1],
-                    "title": doc.get("title", f"doc_{idx}"),
-                    "text": doc.get("text", "")[:512],
-                }
-            )
+    if not sbert_encoder.available():
+        raise HTTPException(status_code=404, detail="SBERT encoder missing")
+    params = ann_params(body)
+    key = query_cache.key("sbert", snap.version, query, top_k, params)
+    # Cache lookups and stores can hit the shared SQLite tier, so keep them off the event loop.
+    hits = await run_in_threadpool(query_cache.get, key)
+    if hits is None:
+        # Concurrent searches share one encode call through the micro-batcher.
+        query_vec = await sbert_batcher.submit(query)
+
+        def search_and_store():
+            found = _search_vectors(snap, query_vec[None, :], top_k, **params)[0]
+            query_cache.set(key, "sbert", found)
+            return found
+
+        hits = await run_in_threadpool(search_and_store)
     return {"hits": hits}
+
+
+@router.post("/search_batch")
+def search_batch(body: dict):
+    queries = parse_batch_queries(body)
+    top_k = int(body.get("top_k", 5))
+    snap = sbert_registry.current()
+    if snap is None:
+        raise HTTPException(status_code=404, detail="SBERT index missing")
+    if not sbert_encoder.available():
+        raise HTTPException(status_code=404, detail="SBERT encoder missing")
+    params = ann_params(body)
+    return batch_response(
+        queries,
+        lambda live: query_cache.cached_batch(
+            "sbert", snap.version, live, top_k, params,
+            lambda misses: _search_vectors(snap, _encode(misses), top_k, **params),
+        ),
+    )
@@ -1,4 +1,43 @@
 from fastapi import APIRouter
-router=APIRouter()
-@router.get('/ping')
-def ping(): return {'router':'telemetry'}
+
+from ..services.encoder import sbert_batcher, sbert_encoder
+from ..services.face_detect import face_detector
+from ..services.query_cache import query_cache
+from ..services.rerank import chat_stages, reranker
+from ..services.video_stream import stream_slots, video_stages
+from ..services.vision_pipeline import model_stats, vision_batcher, vision_executor, vision_stages, warmup_error
+
+router = APIRouter()
+
+
+@router.get("/ping")
+def ping():
+    return {"router": "telemetry"}
+
+
+@router.get("/encoder")
+def encoder_stats():
+    return {**sbert_encoder.stats(), "batcher": sbert_batcher.stats()}
+
+
+@router.get("/query_cache")
+def query_cache_stats():
+    return query_cache.stats()
+
+
+@router.get("/chat")
+def chat_stats():
+    return {"stages": chat_stages.snapshot(), "rerank": reranker.stats()}
+
+
+@router.get("/vision")
+def vision_stats():
+    return {
+        "executor": vision_executor.stats(),
+        "batcher": vision_batcher.stats(),
+        "face_detector": face_detector.stats(),
+        "model": model_stats(),
+        "warmup_error": warmup_error(),
+        "stages": vision_stages.snapshot(),
+        "video": {"streams": stream_slots.stats(), "stages": video_stages.snapshot()},
+    }
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 import os
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 
-from ..services.rag_index import rag_index
+from ..services.rag_index import INGEST_MODES, rag_index
 
 router = APIRouter()
 
@@ -32,8 +32,11 @@ def tabular_hpo(body: dict):
 @router.post("/rag/build")
 def rag_build(body: dict):
     docs = body.get("docs", [])
+    mode = body.get("mode", "replace")
+    if mode not in INGEST_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {list(INGEST_MODES)}.")
     dry = _dry_run()
     if dry:
         return {"status": "dry-run", "ingested": 0}
-    stored = rag_index.ingest(docs or [])
+    stored = rag_index.ingest(docs or [], mode=mode)
     return {"status": "ok", "ingested": len(stored)}
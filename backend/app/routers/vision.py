@@ -1,61 +1,368 @@
-from pathlib import Path
+import asyncio
+import json
+import os
+import queue
+import shutil
+import tarfile
+import tempfile
+import time
+from collections import deque
+from typing import List, Optional
+from urllib.parse import quote
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
-import base64
 import numpy as np
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request, WebSocket
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
+from ..services.executor import ExecutorOverloaded
 from ..services.state import STATE
-from ..services.vision_infer import VisionONNXService
-from ..services.blur import detect_faces_bgr, blur_faces_bboxes
-
-try:
-    import cv2
-except ImportError:
-    cv2 = None
+from ..services.video_stream import (
+    VIDEO_CFG,
+    FramePipeline,
+    StreamsBusy,
+    anonymize_video,
+    detect_interval,
+    stream_slots,
+)
+from ..services.vision_pipeline import (
+    IMAGE_ENCODINGS,
+    VISION_BATCHER_CFG,
+    VISION_RESPONSE_CFG,
+    cv2,
+    iter_tar_images,
+    run_infer,
+    run_prepare,
+    vision_batcher,
+    vision_executor,
+    vision_stages,
+)
 
 router = APIRouter()
 
-# Lazy singletons
-_MODEL: VisionONNXService | None = None
+# Bulk requests back off this long when the executor is full instead of
+# failing, so interactive /infer traffic keeps priority.
+BULK_RETRY_S = 0.02
+
+RESPONSE_FORMATS = ("json",) + tuple(IMAGE_ENCODINGS)
+
+
+async def _infer_one(
+    raw: bytes, blur: bool, return_image: bool, wait_for_slot: bool = False, image_format: str = "json"
+) -> dict:
+    """One image through the executor (and the batcher when enabled)."""
+    batched = VISION_BATCHER_CFG["enabled"]
+    while True:
+        try:
+            resp = await vision_executor.run(
+                run_prepare if batched else run_infer, raw, blur, return_image, image_format
+            )
+            break
+        except ExecutorOverloaded:
+            if not wait_for_slot:
+                raise
+            await asyncio.sleep(BULK_RETRY_S)
+    if "error" in resp:
+        return resp
+    if batched:
+        start = time.perf_counter()
+        label, prob = await vision_batcher.submit(resp.pop("img"))
+        resp["timings_ms"]["infer"] = round((time.perf_counter() - start) * 1000, 3)
+        resp.update(pred=label, score=float(prob))
+    for stage, ms in resp["timings_ms"].items():
+        vision_stages.tracker(stage).observe(ms)
+    return resp
+
 
-def _get_model() -> VisionONNXService:
-    global _MODEL
-    if _MODEL is None:
-        onnx_path = Path("models/vision/resnet18/model.onnx")
-        labels_txt = Path("models/vision/resnet18/labels.txt")
-        _MODEL = VisionONNXService(str(onnx_path), str(labels_txt) if labels_txt.exists() else None)
-    return _MODEL
+def _max_upload_bytes() -> int:
+    return int(float(VISION_RESPONSE_CFG["max_upload_mb"]) * 1024 * 1024)
+
+
+async def _read_body(request: Request) -> bytearray:
+    """The request body in one buffer, sized up front from Content-Length when sent."""
+    limit = _max_upload_bytes()
+    try:
+        size = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length.")
+    if size < 0:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length.")
+    if size > limit:
+        raise HTTPException(status_code=413, detail="Upload too large.")
+    buf = bytearray(size)
+    pos = 0
+    async for chunk in request.stream():
+        end = pos + len(chunk)
+        if end > limit:
+            raise HTTPException(status_code=413, detail="Upload too large.")
+        buf[pos:end] = chunk
+        pos = end
+    del buf[pos:]
+    return buf
+
+
+def _image_response(resp: dict, fmt: str, consent_enabled: bool) -> Response:
+    """The blurred image as the body; the rest of the result in ``X-`` headers."""
+    faces = [[f["x1"], f["y1"], f["x2"], f["y2"]] for f in resp["faces"]]
+    headers = {
+        "X-Pred": quote(str(resp["pred"])),
+        "X-Score": f"{resp['score']:.6f}",
+        "X-Faces": json.dumps(faces, separators=(",", ":")),
+        "X-Timings-Ms": json.dumps(resp["timings_ms"], separators=(",", ":")),
+        "X-Consent-Enabled": str(consent_enabled).lower(),
+    }
+    return Response(resp["image_bytes"], media_type=IMAGE_ENCODINGS[fmt][2], headers=headers)
 
-def _b64_png(img_bgr: np.ndarray) -> str:
+
+async def _infer_response(raw, return_image: bool, response_format: str):
     if cv2 is None:
-        return ""
-    ok, buf = cv2.imencode(".png", img_bgr)
-    return base64.b64encode(buf).decode("ascii") if ok else ""
+        raise HTTPException(status_code=500, detail="opencv-python-headless is required")
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"response_format must be one of {list(RESPONSE_FORMATS)}")
+    binary = response_format != "json"
+    consent_enabled = STATE["consent_enabled"]
+    # Decode, detection and blur run on the bounded vision executor; the
+    # classifier runs there too, or in a shared batch when batching is on.
+    try:
+        resp = await _infer_one(raw, not consent_enabled, return_image or binary, image_format=response_format)
+    except ExecutorOverloaded:
+        raise HTTPException(status_code=503, detail="Vision workers are busy; retry shortly.", headers={"Retry-After": "1"})
+    if "error" in resp:
+        return JSONResponse({"error": resp["error"]}, status_code=400)
+    if binary:
+        return _image_response(resp, response_format, consent_enabled)
+    resp["consent_enabled"] = consent_enabled
+    return resp
+
 
 @router.post("/infer")
-async def infer(image: UploadFile = File(...), return_image: bool = Form(False)):
+async def infer(
+    image: UploadFile = File(...),
+    return_image: bool = Form(False),
+    response_format: str = Form("json"),
+):
+    """Classify one image, blurring faces unless consent is enabled.
+
+    ``response_format=json`` returns the result as JSON (with a base64 PNG
+    when ``return_image``); ``jpeg`` or ``webp`` return the blurred image
+    itself as the body, with ``X-Pred`` (percent-encoded), ``X-Score``,
+    ``X-Faces``, ``X-Timings-Ms`` and ``X-Consent-Enabled`` headers.
+    """
+    if image.size is not None and image.size > _max_upload_bytes():
+        raise HTTPException(status_code=413, detail="Upload too large.")
+    return await _infer_response(await image.read(), return_image, response_format)
+
+
+@router.post("/infer_raw")
+async def infer_raw(request: Request, return_image: bool = False, response_format: str = "json"):
+    """``/infer`` for a bare image body (e.g. ``Content-Type: image/jpeg``).
+
+    Options are query parameters. The body streams straight into one
+    buffer, skipping multipart parsing and the spooled temp file.
+    """
+    raw = await _read_body(request)
+    if not raw:
+        raise HTTPException(status_code=400, detail="Empty body.")
+    return await _infer_response(raw, return_image, response_format)
+
+
+async def _upload_items(images: List[UploadFile], shard: Optional[UploadFile]):
+    for upload in images:
+        yield upload.filename, await upload.read()
+    if shard is not None:
+        members = iter_tar_images(shard.file)
+        while True:
+            item = await run_in_threadpool(next, members, None)
+            if item is None:
+                return
+            yield item
+
+
+@router.post("/infer_batch")
+async def infer_batch(
+    request: Request,
+    images: List[UploadFile] = File(default=[]),
+    shard: Optional[UploadFile] = File(None),
+    return_image: bool = Form(False),
+):
+    """Classify many images: a multipart ``images`` list and/or a tar ``shard``.
+
+    Streams one NDJSON line per image, in input order. Up to
+    ``vision_batcher.bulk_window`` images are in flight at once, so
+    decoding overlaps classification and the shared batcher sees full
+    batches. The rest of the upload stays unread until the window frees.
+    """
+    if cv2 is None:
+        raise HTTPException(status_code=500, detail="opencv-python-headless is required")
+    if not images and shard is None:
+        raise HTTPException(status_code=400, detail="Provide images or a tar shard.")
+    blur = not STATE["consent_enabled"]
+    window = max(1, int(VISION_BATCHER_CFG["bulk_window"]))
+
+    async def run(name, raw):
+        try:
+            resp = await _infer_one(raw, blur, return_image, wait_for_slot=True)
+        except Exception as exc:
+            resp = {"error": str(exc) or type(exc).__name__}
+        resp.pop("img", None)
+        return {"name": name, **resp}
+
+    async def lines():
+        pending: deque = deque()
+        try:
+            async for name, raw in _upload_items(images, shard):
+                pending.append(asyncio.ensure_future(run(name, raw)))
+                while len(pending) >= window or (pending and pending[0].done()):
+                    yield json.dumps(await pending.popleft()) + "\n"
+                if await request.is_disconnected():
+                    return
+            while pending:
+                yield json.dumps(await pending.popleft()) + "\n"
+        except tarfile.TarError as exc:
+            yield json.dumps({"error": f"bad shard: {exc}"}) + "\n"
+        finally:
+            for task in pending:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/stream")
+async def stream(video: UploadFile = File(...), detect_every: Optional[int] = Form(None)):
+    """Blur faces in an uploaded video and return it re-encoded.
+
+    Detection runs every ``detect_every`` frames (``video_stream`` config
+    by default, at most ``max_detect_every``) with boxes interpolated in
+    between. Uploads over ``max_upload_mb`` are rejected. Frame counts and
+    throughput are returned in ``X-Frames``, ``X-Keyframes`` and
+    ``X-Frames-Per-Second``.
+    """
     if cv2 is None:
         raise HTTPException(status_code=500, detail="opencv-python-headless is required")
-    raw = await image.read()
-    arr = np.frombuffer(raw, dtype=np.uint8)
-    img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-    if img is None:
-        return JSONResponse({"error": "bad image"}, status_code=400)
-
-    boxes = detect_faces_bgr(img)
-    if not STATE["consent_enabled"]:
-        img = blur_faces_bboxes(img, boxes)
-
-    model = _get_model()
-    label, prob = model.infer_bgr(img)
-
-    resp = {
-        "pred": label,
-        "score": float(prob),
-        "faces": [{"x1":x1,"y1":y1,"x2":x2,"y2":y2} for (x1,y1,x2,y2) in boxes],
-        "consent_enabled": STATE["consent_enabled"]
+    if video.size is not None and video.size > float(VIDEO_CFG["max_upload_mb"]) * 1024 * 1024:
+        raise HTTPException(status_code=413, detail="Upload too large.")
+    try:
+        detect_every = detect_interval(detect_every)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    try:
+        stream_slots.acquire()
+    except StreamsBusy:
+        raise HTTPException(status_code=503, detail="Video workers are busy; retry shortly.", headers={"Retry-After": "5"})
+    tmp = tempfile.mkdtemp(prefix="vision-stream-")
+    src = os.path.join(tmp, "input" + os.path.splitext(video.filename or "")[1])
+    dst = os.path.join(tmp, "anonymized.mp4")
+    try:
+        with open(src, "wb") as f:
+            await run_in_threadpool(shutil.copyfileobj, video.file, f, 1 << 20)
+        stats = await run_in_threadpool(anonymize_video, src, dst, not STATE["consent_enabled"], detect_every)
+    except ValueError as exc:
+        shutil.rmtree(tmp, ignore_errors=True)
+        return JSONResponse({"error": str(exc)}, status_code=400)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    finally:
+        stream_slots.release()
+    headers = {
+        "X-Frames": str(stats["frames"]),
+        "X-Keyframes": str(stats["keyframes"]),
+        "X-Frames-Per-Second": str(stats["fps"]),
     }
-    if return_image:
-        resp["image_png_b64"] = _b64_png(img)
-    return resp
+    return FileResponse(
+        dst, media_type="video/mp4", headers=headers, background=BackgroundTask(shutil.rmtree, tmp, ignore_errors=True)
+    )
+
+
+@router.websocket("/stream/ws")
+async def stream_ws(ws: WebSocket, detect_every: Optional[int] = None):
+    """Live frames: each binary message is one encoded image, answered in order
+    with the blurred frame as JPEG. Boxes from the last keyframe are reused
+    until the next one (no lookahead). Send the text ``end`` to finish; the
+    final message is a JSON summary with ``fps``.
+    """
+    await ws.accept()
+    if cv2 is None:
+        await ws.close(code=1011)
+        return
+    try:
+        detect_every = detect_interval(detect_every)
+    except ValueError:
+        await ws.close(code=1008)  # policy violation
+        return
+    try:
+        stream_slots.acquire()
+    except StreamsBusy:
+        await ws.close(code=1013)  # try again later
+        return
+    loop = asyncio.get_running_loop()
+    inbox: queue.Queue = queue.Queue(VIDEO_CFG["queue_size"])
+    quality = [int(cv2.IMWRITE_JPEG_QUALITY), int(VIDEO_CFG["jpeg_quality"])]
+
+    def frames():
+        while True:
+            raw = inbox.get()
+            if raw is None:
+                return
+            img = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                raise ValueError("bad frame")
+            yield img
+
+    def sink(frame):
+        ok, buf = cv2.imencode(".jpg", frame, quality)
+        asyncio.run_coroutine_threadsafe(ws.send_bytes(buf.tobytes()), loop).result()
+
+    pipeline = FramePipeline(
+        detect_every=detect_every,
+        lookahead=False,
+        blur=not STATE["consent_enabled"],
+        pad_frac=VIDEO_CFG["pad_frac"],
+        queue_size=VIDEO_CFG["queue_size"],
+    )
+    job = asyncio.ensure_future(run_in_threadpool(pipeline.run, frames(), sink))
+
+    async def offer(item) -> bool:
+        # Full inbox = the pipeline is behind; stop reading the socket until it drains.
+        while not job.done():
+            try:
+                inbox.put_nowait(item)
+                return True
+            except queue.Full:
+                await asyncio.sleep(0.005)
+        return False
+
+    connected = True
+    try:
+        while True:
+            # Wait on the job too, so a failed frame is reported without more input.
+            receive = asyncio.ensure_future(ws.receive())
+            await asyncio.wait({receive, job}, return_when=asyncio.FIRST_COMPLETED)
+            if not receive.done():
+                receive.cancel()
+                break
+            msg = receive.result()
+            if msg["type"] == "websocket.disconnect":
+                connected = False
+                break
+            if msg.get("bytes") is not None:
+                if not await offer(msg["bytes"]):
+                    break
+            elif msg.get("text") == "end":
+                break
+        await offer(None)
+        try:
+            stats = await job
+        except Exception as exc:
+            if connected:
+                await ws.send_json({"error": str(exc) or type(exc).__name__})
+                await ws.close(code=1003)
+            return
+        if connected:
+            await ws.send_json(stats)
+            await ws.close()
+    finally:
+        if not job.done():
+            await offer(None)
+        stream_slots.release()
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from .ranking import top_k_indices
+
+try:
+    import faiss
+except ImportError:  # pragma: no cover
+    faiss = None
+
+INDEX_KINDS = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+ADD_BLOCK = 65536
+
+
+def default_nlist(n: int) -> int:
+    # ~4 * sqrt(n) lists, but keep >= 39 training points per centroid.
+    return int(max(1, min(4 * np.sqrt(n), n // 39)))
+
+
+def training_sample(emb: np.ndarray, train_size: int, seed: int = 42) -> np.ndarray:
+    n = len(emb)
+    if n <= train_size:
+        return np.ascontiguousarray(emb, dtype="float32")
+    rows = np.sort(np.random.default_rng(seed).choice(n, size=train_size, replace=False))
+    return np.ascontiguousarray(emb[rows], dtype="float32")
+
+
+class NumpyIVFIndex:
+    """Inverted-file index in pure NumPy, used when FAISS is not installed.
+
+    A spherical k-means quantizer splits the unit-norm embeddings into
+    ``nlist`` cells. A query scores only the rows in its ``nprobe`` closest
+    cells. Row vectors stay in the (memory-mapped) embedding matrix; the
+    index stores just centroids and the row ids of each cell.
+    """
+
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray, list_ids: np.ndarray, nprobe: int = 8):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.nprobe = nprobe
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def train(cls, sample: np.ndarray, nlist: int, iters: int = 20, seed: int = 42, nprobe: int = 8) -> "NumpyIVFIndex":
+        rng = np.random.default_rng(seed)
+        nlist = max(1, min(nlist, len(sample)))
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iters):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            empty = np.bincount(assign, minlength=nlist) == 0
+            # Re-seed empty cells so every list stays useful.
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            centroids = sums / (np.linalg.norm(sums, axis=1, keepdims=True) + 1e-8)
+        empty = np.zeros(1, dtype=np.int64)
+        return cls(centroids.astype("float32"), empty, np.empty(0, dtype=np.int64), nprobe)
+
+    def add(self, emb: np.ndarray) -> None:
+        assign = np.empty(len(emb), dtype=np.int64)
+        for start in range(0, len(emb), ADD_BLOCK):
+            block = np.asarray(emb[start : start + ADD_BLOCK], dtype="float32")
+            assign[start : start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        self.list_ids = np.argsort(assign, kind="stable").astype(np.int64)
+        counts = np.bincount(assign, minlength=self.nlist)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    def search(self, emb: np.ndarray, queries: np.ndarray, k: int, nprobe: int | None = None):
+        nprobe = max(1, min(nprobe or self.nprobe, self.nlist))
+        queries = np.asarray(queries, dtype="float32")
+        D = np.full((len(queries), k), -np.inf, dtype="float32")
+        I = np.full((len(queries), k), -1, dtype=np.int64)
+        cells = top_k_indices(queries @ self.centroids.T, nprobe)
+        for qi, (q, probe) in enumerate(zip(queries, cells)):
+            cand = np.concatenate(
+                [self.list_ids[self.list_offsets[c] : self.list_offsets[c + 1]] for c in probe]
+            )
+            if cand.size == 0:
+                continue
+            cand.sort()  # sequential reads from the mmap
+            scores = np.asarray(emb[cand], dtype="float32") @ q
+            best = top_k_indices(scores, k)
+            D[qi, : len(best)] = scores[best]
+            I[qi, : len(best)] = cand[best]
+        return D, I
+
+    def save(self, path: Path) -> None:
+        np.savez(
+            path,
+            centroids=self.centroids,
+            list_offsets=self.list_offsets,
+            list_ids=self.list_ids,
+            nprobe=np.int64(self.nprobe),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "NumpyIVFIndex":
+        data = np.load(path)
+        return cls(data["centroids"], data["list_offsets"], data["list_ids"], int(data["nprobe"]))
+
+
+def build_faiss_index(
+    emb: np.ndarray,
+    kind: str = "flat",
+    nlist: int | None = None,
+    pq_m: int = 16,
+    hnsw_m: int = 32,
+    train_size: int = 100_000,
+    nprobe: int = 8,
+    ef_search: int = 64,
+):
+    if faiss is None:
+        raise RuntimeError("faiss is required for FAISS indexes.")
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind: {kind}")
+    d = emb.shape[1]
+    metric = faiss.METRIC_INNER_PRODUCT
+    if kind == "flat":
+        index = faiss.IndexFlatIP(d)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(d, hnsw_m, metric)
+        index.hnsw.efConstruction = max(40, 2 * hnsw_m)
+        index.hnsw.efSearch = ef_search
+    else:
+        nlist = nlist or default_nlist(len(emb))
+        quantizer = faiss.IndexFlatIP(d)
+        if kind == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, d, nlist, metric)
+        else:
+            if d % pq_m:
+                raise ValueError(f"pq_m={pq_m} must divide the embedding dim {d}")
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, pq_m, 8, metric)
+        index.train(training_sample(emb, train_size))
+        index.nprobe = nprobe
+    _add_blocks(index, emb)
+    return index
+
+
+def _add_blocks(index, emb: np.ndarray) -> None:
+    for start in range(0, len(emb), ADD_BLOCK):
+        index.add(np.ascontiguousarray(emb[start : start + ADD_BLOCK], dtype="float32"))
+
+
+def write_ann_index(
+    emb: np.ndarray,
+    out_dir: Path,
+    kind: str = "flat",
+    nlist: int | None = None,
+    pq_m: int = 16,
+    hnsw_m: int = 32,
+    train_size: int = 100_000,
+    nprobe: int = 8,
+    ef_search: int = 64,
+    trained_from: Path | None = None,
+) -> str:
+    """Build the requested index next to ``embeddings.npy``; return what was written.
+
+    With FAISS installed this writes ``faiss.index``. Without it, IVF kinds
+    fall back to a ``NumpyIVFIndex`` in ``ivf.npz`` and ``flat`` writes
+    nothing (serving does an exact matmul over the embeddings).
+
+    ``trained_from`` names a directory holding an IVF index of the same
+    kind whose coarse quantizer (and PQ codebooks) are kept; only the
+    vectors are re-added.
+    """
+    trained = _trained_index(trained_from, kind, emb.shape[1], nprobe) if trained_from is not None else None
+    if trained is not None:
+        _remove_stale(out_dir)
+        if isinstance(trained, NumpyIVFIndex):
+            trained.add(emb)
+            trained.save(out_dir / "ivf.npz")
+            return "numpy:ivf_flat (reused training)"
+        _add_blocks(trained, emb)
+        faiss.write_index(trained, str(out_dir / "faiss.index"))
+        return f"faiss:{kind} (reused training)"
+    if faiss is not None:
+        index = build_faiss_index(emb, kind, nlist, pq_m, hnsw_m, train_size, nprobe, ef_search)
+        _remove_stale(out_dir)
+        faiss.write_index(index, str(out_dir / "faiss.index"))
+        return f"faiss:{kind}"
+    if kind == "flat":
+        _remove_stale(out_dir)
+        return "exact"
+    ivf = NumpyIVFIndex.train(
+        training_sample(emb, train_size), nlist or default_nlist(len(emb)), nprobe=nprobe
+    )
+    ivf.add(emb)
+    _remove_stale(out_dir)
+    ivf.save(out_dir / "ivf.npz")
+    return "numpy:ivf_flat"
+
+
+def _trained_index(src_dir: Path, kind: str, d: int, nprobe: int):
+    """The IVF index in ``src_dir`` emptied of its vectors, or None if unusable."""
+    if kind not in ("ivf_flat", "ivf_pq"):
+        return None
+    if faiss is not None:
+        path = src_dir / "faiss.index"
+        if not path.exists():
+            return None
+        # Read fully (not mmapped): reset() has to rewrite the inverted lists.
+        index = faiss.read_index(str(path))
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is None or index.d != d or isinstance(index, faiss.IndexIVFPQ) != (kind == "ivf_pq"):
+            return None
+        index.reset()
+        ivf.nprobe = nprobe
+        return index
+    path = src_dir / "ivf.npz"
+    if kind != "ivf_flat" or not path.exists():
+        return None
+    ivf = NumpyIVFIndex.load(path)
+    if ivf.centroids.shape[1] != d:
+        return None
+    ivf.nprobe = nprobe
+    return ivf
+
+
+def _remove_stale(out_dir: Path) -> None:
+    for name in ("faiss.index", "ivf.npz"):
+        (out_dir / name).unlink(missing_ok=True)
+
+
+def load_ann_index(base: Path):
+    """Load ``faiss.index`` (memory-mapped when supported) or ``ivf.npz``."""
+    idx_path = base / "faiss.index"
+    if faiss is not None and idx_path.exists():
+        flag = getattr(faiss, "IO_FLAG_MMAP", 0)
+        if flag:
+            try:
+                return faiss.read_index(str(idx_path), flag)
+            except Exception:
+                pass
+        return faiss.read_index(str(idx_path))
+    ivf_path = base / "ivf.npz"
+    if ivf_path.exists():
+        return NumpyIVFIndex.load(ivf_path)
+    return None
+
+
+def _search_params(index, nprobe: int | None, ef_search: int | None):
+    # Per-call parameter objects keep the shared index free of mutable
+    # knobs, so concurrent requests can use different settings.
+    if nprobe and faiss.try_extract_index_ivf(index) is not None:
+        return faiss.SearchParametersIVF(nprobe=int(nprobe))
+    if ef_search and hasattr(index, "hnsw"):
+        return faiss.SearchParametersHNSW(efSearch=int(ef_search))
+    return None
+
+
+def ann_search(index, emb, queries: np.ndarray, k: int, nprobe: int | None = None, ef_search: int | None = None):
+    """Top-k ``(D, I)`` from a FAISS index or a ``NumpyIVFIndex``."""
+    queries = np.ascontiguousarray(queries, dtype="float32")
+    if isinstance(index, NumpyIVFIndex):
+        return index.search(emb, queries, k, nprobe)
+    params = _search_params(index, nprobe, ef_search)
+    if params is None:
+        return index.search(queries, k)
+    return index.search(queries, k, params=params)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable, Sequence
+
+from .perf import LatencyTracker
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-item awaits into batched calls of ``fn``.
+
+    ``submit`` queues one item and waits for its result. A worker task
+    takes the first queued item, keeps collecting until ``max_batch`` items
+    are queued or ``max_wait_ms`` has passed, then runs ``fn(items)`` once on
+    a worker thread and hands ``results[i]`` back to the i-th caller. While
+    a batch runs, new arrivals queue up, so batches grow with load.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[list], Sequence[Any]],
+        max_batch: int = 32,
+        max_wait_ms: float = 5.0,
+    ) -> None:
+        self.fn = fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue: asyncio.Queue | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._worker: asyncio.Task | None = None
+        self.batches = 0
+        self.items = 0
+        self.queue_wait = LatencyTracker()
+        self.batch_latency = LatencyTracker()
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        return self._queue
+
+    async def submit(self, item: Any) -> Any:
+        queue = self._ensure_worker()
+        future = self._loop.create_future()
+        await queue.put((item, future, self._loop.time()))
+        return await future
+
+    async def _collect(self) -> list:
+        queue = self._queue
+        batch = [await queue.get()]
+        deadline = self._loop.time() + self.max_wait_s
+        while len(batch) < self.max_batch:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            batch = [entry for entry in batch if not entry[1].cancelled()]
+            if not batch:
+                continue
+            now = self._loop.time()
+            for _, _, queued_at in batch:
+                self.queue_wait.observe((now - queued_at) * 1000)
+            items = [entry[0] for entry in batch]
+            try:
+                with self.batch_latency.time():
+                    results = await asyncio.to_thread(self.fn, items)
+            except Exception as exc:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.items += len(items)
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait_s * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 3) if self.batches else None,
+            "queue_wait": self.queue_wait.snapshot(),
+            "batch": self.batch_latency.snapshot(),
+        }
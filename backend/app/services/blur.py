@@ -1,38 +1,135 @@
-from typing import List, Tuple
+from typing import List, Optional, Sequence, Tuple
 
 import numpy as np
 
+from .face_detect import face_detector
+from .settings import config_section
+
 try:
     import cv2
 except ImportError:  # pragma: no cover
     cv2 = None
 
+Box = Tuple[int, int, int, int]
+
+BLUR_METHODS = ("gaussian", "box", "pixelate")
+MAX_GAUSSIAN_KERNEL = 31
+
+BLUR_CFG = config_section(
+    "blur",
+    {
+        "method": "gaussian",
+        "kernel_frac": None,
+        "pixel_blocks": 8,
+        "merge": True,
+    },
+)
+
 
 def detect_faces_bgr(img_bgr: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """Face boxes from the configured detector (see ``face_detect``)."""
     if cv2 is None:
         return []
-    cascade_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-    face_cascade = cv2.CascadeClassifier(cascade_path)
-    gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(
-        gray, scaleFactor=1.2, minNeighbors=5, minSize=(32, 32)
-    )
-    boxes = []
-    for (x, y, w, h) in faces:
-        boxes.append((int(x), int(y), int(x + w), int(y + h)))
-    return boxes
+    return face_detector.detect(img_bgr)
+
+
+def _area(b: Box) -> int:
+    return max(0, b[2] - b[0]) * max(0, b[3] - b[1])
+
+
+def merge_boxes(boxes: Sequence[Box]) -> List[Box]:
+    """Union overlapping boxes where that doesn't add pixels to blur.
+
+    Two boxes merge only when their bounding box covers exactly their
+    union (its area equals both areas summed minus the overlap), so
+    duplicate, nested or edge-aligned detections are blurred once while
+    any overlap whose bounding box would pull in background stays as
+    separate boxes.
+    """
+    merged = [tuple(int(v) for v in b) for b in boxes]
+    changed = True
+    while changed and len(merged) > 1:
+        changed = False
+        out: List[Box] = []
+        for box in sorted(merged):
+            for i, other in enumerate(out):
+                if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                    union = (
+                        min(box[0], other[0]),
+                        min(box[1], other[1]),
+                        max(box[2], other[2]),
+                        max(box[3], other[3]),
+                    )
+                    overlap = (min(box[2], other[2]) - max(box[0], other[0])) * (
+                        min(box[3], other[3]) - max(box[1], other[1])
+                    )
+                    if _area(union) <= _area(box) + _area(other) - overlap:
+                        out[i] = union
+                        changed = True
+                        break
+            else:
+                out.append(box)
+        merged = out
+    return merged
+
+
+def _kernel(h: int, w: int, kernel_frac: Optional[float], default: int) -> int:
+    """Odd kernel size: ``kernel_frac`` of the ROI's shorter side, else ``default``."""
+    k = int(min(h, w) * kernel_frac) if kernel_frac else default
+    return max(3, k | 1)
+
+
+def _anonymize(roi: np.ndarray, method: str, kernel_frac: Optional[float], pixel_blocks: int) -> None:
+    """Blur ``roi`` in place (it's a view into the frame)."""
+    h, w = roi.shape[:2]
+    if method == "pixelate":
+        scale = max(1, pixel_blocks) / min(h, w)
+        small = cv2.resize(
+            roi, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA
+        )
+        cv2.resize(small, (w, h), dst=roi, interpolation=cv2.INTER_NEAREST)
+    elif method == "box":
+        k = _kernel(h, w, kernel_frac, 31)
+        cv2.blur(roi, (k, k), dst=roi)
+    else:
+        # Fixed 31x31 / sigma 25 unless the kernel scales with the face.
+        k = _kernel(h, w, kernel_frac, 31)
+        sigma = 0 if kernel_frac else 25
+        if k <= MAX_GAUSSIAN_KERNEL:
+            cv2.GaussianBlur(roi, (k, k), sigma, dst=roi)
+            return
+        # Gaussian cost grows with kernel area: blur a copy shrunk so the
+        # kernel fits MAX_GAUSSIAN_KERNEL, then scale it back into the ROI.
+        f = MAX_GAUSSIAN_KERNEL / k
+        small = cv2.resize(roi, (max(1, round(w * f)), max(1, round(h * f))), interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(small, (MAX_GAUSSIAN_KERNEL, MAX_GAUSSIAN_KERNEL), 0)
+        cv2.resize(small, (w, h), dst=roi, interpolation=cv2.INTER_LINEAR)
 
 
 def blur_faces_bboxes(
-    img_bgr: np.ndarray, bboxes: List[Tuple[int, int, int, int]]
+    img_bgr: np.ndarray,
+    bboxes: List[Tuple[int, int, int, int]],
+    method: Optional[str] = None,
+    inplace: bool = False,
 ) -> np.ndarray:
-    if cv2 is None:
+    """Anonymize each box of ``img_bgr`` with ``method`` (default from ``BLUR_CFG``).
+
+    With no boxes the input is returned as is. Otherwise the frame is
+    copied first unless ``inplace`` is set, for callers that own the
+    buffer; either way each ROI is filtered in place, so the only
+    full-frame work is that optional copy.
+    """
+    if cv2 is None or not len(bboxes):
         return img_bgr
-    out = img_bgr.copy()
-    for (x1, y1, x2, y2) in bboxes:
-        roi = out[y1:y2, x1:x2]
+    method = method or BLUR_CFG["method"]
+    if method not in BLUR_METHODS:
+        raise ValueError(f"Unknown blur method {method!r}; choose from {BLUR_METHODS}")
+    boxes = merge_boxes(bboxes) if BLUR_CFG["merge"] else bboxes
+    out = img_bgr if inplace else img_bgr.copy()
+    h, w = out.shape[:2]
+    for (x1, y1, x2, y2) in boxes:
+        roi = out[max(0, y1) : min(h, y2), max(0, x1) : min(w, x2)]
         if roi.size == 0:
             continue
-        roi = cv2.GaussianBlur(roi, (31, 31), 25)
-        out[y1:y2, x1:x2] = roi
+        _anonymize(roi, method, BLUR_CFG["kernel_frac"], int(BLUR_CFG["pixel_blocks"]))
     return out
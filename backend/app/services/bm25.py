@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+from .ranking import top_k_indices
+
+BM25_DIR = "bm25"
+TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+BUILD_BLOCK = 4096
+
+
+class BM25Index:
+    """Inverted index with precomputed BM25 impacts and MaxScore pruning.
+
+    Posting list ``t`` is ``doc_ids[offsets[t]:offsets[t + 1]]`` (ascending)
+    with ``impacts`` holding the full BM25 term score of each posting, so a
+    query score is a sum of gathered impacts. ``max_impact[t]`` bounds what
+    term ``t`` can add to any document.
+
+    ``search`` walks terms from the highest bound down. Once the k-th best
+    accumulated score is at least the sum of the bounds of the terms left,
+    no unseen document can reach the top k: the remaining (low-idf, long)
+    lists are then only probed for the surviving candidates with a binary
+    search instead of being scanned.
+    """
+
+    def __init__(
+        self,
+        terms: Sequence[str],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        impacts: np.ndarray,
+        max_impact: np.ndarray,
+        n_docs: int,
+        stop_words: Iterable[str] = (),
+    ) -> None:
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.impacts = impacts
+        self.max_impact = max_impact
+        self.n_docs = n_docs
+        self.token_re = re.compile(TOKEN_PATTERN)
+        self.stop_words = frozenset(stop_words)
+
+    @classmethod
+    def build(
+        cls,
+        texts: Iterable[str],
+        k1: float = 1.2,
+        b: float = 0.75,
+        stop_words: Iterable[str] = (),
+    ) -> "BM25Index":
+        stop = frozenset(stop_words)
+        token_re = re.compile(TOKEN_PATTERN)
+        vocab: dict[str, int] = {}
+        term_blocks, doc_blocks, tf_blocks = [], [], []
+        terms_buf: list[int] = []
+        docs_buf: list[int] = []
+        tfs_buf: list[int] = []
+        doc_len: list[int] = []
+        for doc_id, text in enumerate(texts):
+            counts: dict[int, int] = {}
+            n = 0
+            for token in token_re.findall(text.lower()):
+                if token in stop:
+                    continue
+                tid = vocab.setdefault(token, len(vocab))
+                counts[tid] = counts.get(tid, 0) + 1
+                n += 1
+            doc_len.append(n)
+            terms_buf.extend(counts)
+            docs_buf.extend([doc_id] * len(counts))
+            tfs_buf.extend(counts.values())
+            if len(terms_buf) >= BUILD_BLOCK:
+                term_blocks.append(np.asarray(terms_buf, dtype=np.int64))
+                doc_blocks.append(np.asarray(docs_buf, dtype=np.int64))
+                tf_blocks.append(np.asarray(tfs_buf, dtype=np.float32))
+                terms_buf, docs_buf, tfs_buf = [], [], []
+        term_blocks.append(np.asarray(terms_buf, dtype=np.int64))
+        doc_blocks.append(np.asarray(docs_buf, dtype=np.int64))
+        tf_blocks.append(np.asarray(tfs_buf, dtype=np.float32))
+        term_ids, doc_ids, tfs = (np.concatenate(x) for x in (term_blocks, doc_blocks, tf_blocks))
+
+        n_docs = len(doc_len)
+        lengths = np.asarray(doc_len, dtype=np.float32)
+        avgdl = float(lengths.mean()) if n_docs and lengths.mean() > 0 else 1.0
+        order = np.lexsort((doc_ids, term_ids))
+        term_ids, doc_ids, tfs = term_ids[order], doc_ids[order], tfs[order]
+        df = np.bincount(term_ids, minlength=len(vocab)).astype(np.float64)
+        offsets = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        norm = k1 * (1.0 - b + b * lengths[doc_ids] / avgdl)
+        impacts = (idf[term_ids] * tfs * (k1 + 1.0) / (tfs + norm)).astype(np.float32)
+        max_impact = np.zeros(len(vocab), dtype=np.float32)
+        np.maximum.at(max_impact, term_ids, impacts)
+        terms = [None] * len(vocab)
+        for term, i in vocab.items():
+            terms[i] = term
+        return cls(terms, offsets, doc_ids.astype(np.int32), impacts, max_impact, n_docs, stop)
+
+    def save(self, out_dir: Path) -> None:
+        path = out_dir / BM25_DIR
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "offsets.npy", self.offsets)
+        np.save(path / "doc_ids.npy", self.doc_ids)
+        np.save(path / "impacts.npy", self.impacts)
+        np.save(path / "max_impact.npy", self.max_impact)
+        terms = [None] * len(self.vocab)
+        for term, i in self.vocab.items():
+            terms[i] = term
+        meta = {"terms": terms, "n_docs": self.n_docs, "stop_words": sorted(self.stop_words)}
+        (path / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, base: Path) -> Optional["BM25Index"]:
+        path = base / BM25_DIR
+        if not (path / "meta.json").exists():
+            return None
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        return cls(
+            meta["terms"],
+            np.load(path / "offsets.npy"),
+            # Postings stay in the page cache; only probed ranges are touched.
+            np.load(path / "doc_ids.npy", mmap_mode="r"),
+            np.load(path / "impacts.npy", mmap_mode="r"),
+            np.load(path / "max_impact.npy"),
+            meta["n_docs"],
+            meta["stop_words"],
+        )
+
+    def query_terms(self, query: str) -> np.ndarray:
+        ids = {self.vocab[t] for t in self.token_re.findall(query.lower()) if t in self.vocab}
+        return np.fromiter(ids, dtype=np.int64, count=len(ids))
+
+    def search(self, query: str, k: int, prune: bool = True) -> tuple[np.ndarray, np.ndarray, int]:
+        """``(scores, doc_ids, postings_scored)`` of the top ``k`` docs, best first."""
+        terms = self.query_terms(query)
+        if terms.size == 0 or k <= 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64), 0
+        terms = terms[np.argsort(-self.max_impact[terms], kind="stable")]
+        # remaining[j]: the most terms j.. can still add to any document.
+        remaining = np.concatenate([np.cumsum(self.max_impact[terms][::-1])[::-1], [0.0]])
+        cand = np.empty(0, dtype=self.doc_ids.dtype)
+        scores = np.empty(0, dtype=np.float32)
+        scored = 0
+        theta = -np.inf
+        exhaustive = True
+        for j, t in enumerate(terms):
+            lo, hi = int(self.offsets[t]), int(self.offsets[t + 1])
+            docs = self.doc_ids[lo:hi]
+            if exhaustive:
+                scored += hi - lo
+                merged = np.union1d(cand, docs)
+                new_scores = np.zeros(len(merged), dtype=np.float32)
+                new_scores[np.searchsorted(merged, cand)] = scores
+                new_scores[np.searchsorted(merged, docs)] += self.impacts[lo:hi]
+                cand, scores = merged, new_scores
+                if prune and len(cand) >= k:
+                    theta = float(np.partition(scores, len(scores) - k)[len(scores) - k])
+                    exhaustive = theta < remaining[j + 1]
+                continue
+            # Only candidates that can still reach theta are worth probing.
+            keep = scores + remaining[j] >= theta
+            cand, scores = cand[keep], scores[keep]
+            pos = np.searchsorted(docs, cand)
+            inside = pos < len(docs)
+            hit = np.zeros(len(cand), dtype=bool)
+            hit[inside] = docs[pos[inside]] == cand[inside]
+            scores[hit] += self.impacts[lo:hi][pos[hit]]
+            scored += int(hit.sum())
+            if len(scores) >= k:
+                theta = max(theta, float(np.partition(scores, len(scores) - k)[len(scores) - k]))
+        best = top_k_indices(scores, k)
+        return scores[best], cand[best].astype(np.int64), scored
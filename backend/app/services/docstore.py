@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+import mmap
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+SCAN_BLOCK = 64 << 20
+
+
+def offsets_path(docs_path: Path) -> Path:
+    return docs_path.with_suffix(".offsets.npy")
+
+
+class DocStoreWriter:
+    """Append docs one at a time as JSON lines, tracking record offsets.
+
+    ``offsets[i]:offsets[i + 1]`` is the byte range of record ``i``, so a
+    reader can decode a single record without parsing the rest of the file.
+    The offsets sidecar is written on ``close``.
+    """
+
+    def __init__(self, docs_path: Path) -> None:
+        self.path = docs_path
+        self._file = docs_path.open("wb")
+        self._offsets = [0]
+
+    def add(self, doc: dict) -> None:
+        self._file.write(json.dumps(doc, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._offsets.append(self._file.tell())
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def close(self) -> None:
+        self._file.close()
+        np.save(offsets_path(self.path), np.asarray(self._offsets, dtype=np.int64))
+
+    def __enter__(self) -> "DocStoreWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def write_docstore(docs_path: Path, docs: Iterable[dict]) -> int:
+    """Write ``docs`` as JSON lines plus an int64 array of record offsets."""
+    with DocStoreWriter(docs_path) as writer:
+        for doc in docs:
+            writer.add(doc)
+    return len(writer)
+
+
+def _scan_offsets(buf, size: int) -> np.ndarray:
+    # Start of every non-empty line, then end-of-file. Trailing blank lines
+    # stay inside the preceding record, which json.loads tolerates.
+    starts = [np.zeros(1, dtype=np.int64)]
+    for pos in range(0, size, SCAN_BLOCK):
+        block = np.frombuffer(buf, dtype=np.uint8, count=min(SCAN_BLOCK, size - pos), offset=pos)
+        starts.append(np.flatnonzero(block == 0x0A).astype(np.int64) + pos + 1)
+    starts = np.concatenate(starts)
+    starts = starts[starts < size]
+    view = np.frombuffer(buf, dtype=np.uint8, count=size)
+    starts = starts[~np.isin(view[starts], (0x0A, 0x0D))]
+    return np.append(starts, size)
+
+
+class DocStore:
+    """Memory-mapped, read-only view over a ``docs.jsonl`` file.
+
+    Only the offsets array lives in the worker heap; record bytes stay in
+    the OS page cache (shared between workers) and are decoded on access.
+    Offsets come from the ``.offsets.npy`` sidecar written by
+    ``write_docstore`` and are rebuilt by scanning the file when missing or
+    stale.
+    """
+
+    def __init__(self, docs_path: Path) -> None:
+        self.path = docs_path
+        self._file = docs_path.open("rb")
+        size = docs_path.stat().st_size
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        sidecar = offsets_path(docs_path)
+        offsets = np.load(sidecar, mmap_mode="r") if sidecar.exists() else None
+        if offsets is None or len(offsets) == 0 or int(offsets[-1]) != size:
+            offsets = _scan_offsets(self._buf, size) if size else np.zeros(1, dtype=np.int64)
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> dict:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return json.loads(self._buf[start:end])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Union
+
+import joblib
+import numpy as np
+
+from .batching import MicroBatcher
+from .index_registry import active_dir
+from .perf import LatencyTracker
+from .settings import config_section
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class EncoderManager:
+    """Lazily loaded, process-wide sentence encoder.
+
+    The pickled encoder is loaded once and shared by every request thread
+    (``encode`` on a loaded SentenceTransformer is safe to call
+    concurrently). At most every ``check_interval_s`` seconds the artifact
+    is stat'ed; when its mtime or size changes the content hash is
+    recomputed and the encoder is reloaded only if the hash differs.
+    ``path`` may be a callable, re-evaluated on every check, so the encoder
+    follows the active index version.
+    """
+
+    def __init__(self, path: Union[Path, Callable[[], Path]], check_interval_s: float = 5.0) -> None:
+        self._path = path
+        self.check_interval_s = check_interval_s
+        self._model = None
+        self._signature: tuple[int, int] | None = None
+        self._sha256: str | None = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.load_count = 0
+        self.last_load_ms: float | None = None
+        self.encode_latency = LatencyTracker()
+        self.items_encoded = 0
+        self.warmup_error: str | None = None
+
+    @property
+    def path(self) -> Path:
+        return self._path() if callable(self._path) else self._path
+
+    def available(self) -> bool:
+        return self._model is not None or self.path.exists()
+
+    def _stat_signature(self) -> tuple[int, int] | None:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self, signature: tuple[int, int]) -> None:
+        start = time.perf_counter()
+        sha = _sha256(self.path)
+        if self._model is not None and sha == self._sha256:
+            self._signature = signature
+            return
+        self._model = joblib.load(self.path)
+        self._signature = signature
+        self._sha256 = sha
+        self.load_count += 1
+        self.last_load_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    def get(self):
+        now = time.monotonic()
+        if self._model is not None and now < self._next_check:
+            return self._model
+        with self._lock:
+            if self._model is None or now >= self._next_check:
+                signature = self._stat_signature()
+                if signature is None:
+                    if self._model is None:
+                        raise FileNotFoundError(self.path)
+                elif signature != self._signature:
+                    self._load(signature)
+                self._next_check = now + self.check_interval_s
+        return self._model
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        model = self.get()
+        with self.encode_latency.time():
+            vecs = model.encode(texts, convert_to_numpy=True)
+        self.items_encoded += len(texts)
+        return vecs
+
+    def warmup(self) -> bool:
+        """Load the encoder and run one encode so the first request is warm.
+
+        A failure is kept in ``warmup_error`` rather than raised, so the app
+        still starts; requests retry the load.
+        """
+        if not self.path.exists():
+            return False
+        try:
+            self.encode(["warmup"])
+        except Exception as exc:
+            self.warmup_error = repr(exc)
+            return False
+        self.warmup_error = None
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "path": str(self.path),
+            "loaded": self._model is not None,
+            "sha256": self._sha256,
+            "load_count": self.load_count,
+            "last_load_ms": self.last_load_ms,
+            "items_encoded": self.items_encoded,
+            "warmup_error": self.warmup_error,
+            "encode": self.encode_latency.snapshot(),
+        }
+
+
+SBERT_BASE = Path("models/rag_sbert")
+sbert_encoder = EncoderManager(lambda: (active_dir(SBERT_BASE) or SBERT_BASE) / "encoder.joblib")
+
+_BATCHER_CFG = config_section("sbert_batcher", {"max_batch": 32, "max_wait_ms": 5.0})
+sbert_batcher = MicroBatcher(
+    sbert_encoder.encode,
+    max_batch=_BATCHER_CFG["max_batch"],
+    max_wait_ms=_BATCHER_CFG["max_wait_ms"],
+)
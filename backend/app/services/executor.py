@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+from .perf import LatencyTracker
+
+EXECUTOR_KINDS = ("thread", "process")
+
+
+class ExecutorOverloaded(RuntimeError):
+    """Raised by ``BoundedExecutor.run`` when every slot is taken."""
+
+
+def _timed_call(fn: Callable, submitted_at: float, *args) -> tuple[Any, float]:
+    # time.monotonic is system-wide, so this also works in a pool process.
+    wait_ms = (time.monotonic() - submitted_at) * 1000
+    return fn(*args), wait_ms
+
+
+class BoundedExecutor:
+    """Thread or process pool with a hard cap on admitted work.
+
+    At most ``max_workers`` calls run and ``max_queue`` more wait; any
+    further ``run`` raises ``ExecutorOverloaded`` immediately instead of
+    queueing without bound. A slot is released when the work itself
+    finishes, not when the awaiting request goes away, so cancelled
+    requests can't push the pool past its cap. Process pools need
+    picklable, module-level callables.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 16, kind: str = "thread", name: str = "pool") -> None:
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"kind must be one of {EXECUTOR_KINDS}")
+        self.kind = kind
+        self.name = name
+        self.max_workers = max(1, int(max_workers))
+        self.capacity = self.max_workers + max(0, int(max_queue))
+        self._pool: Executor | None = None
+        self._lock = threading.Lock()
+        self.inflight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait = LatencyTracker()
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix=self.name)
+        return self._pool
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self.inflight -= 1
+            self.completed += 1
+
+    async def run(self, fn: Callable, *args) -> Any:
+        with self._lock:
+            if self.inflight >= self.capacity:
+                self.rejected += 1
+                raise ExecutorOverloaded(f"{self.name} executor is at capacity ({self.capacity})")
+            self.inflight += 1
+            pool = self._get_pool()
+        try:
+            future = pool.submit(partial(_timed_call, fn, time.monotonic()), *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        result, wait_ms = await asyncio.wrap_future(future)
+        self.queue_wait.observe(wait_ms)
+        return result
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "capacity": self.capacity,
+            "inflight": self.inflight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait": self.queue_wait.snapshot(),
+        }
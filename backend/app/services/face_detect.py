@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .settings import config_section
+
+try:
+    import cv2
+except ImportError:  # pragma: no cover
+    cv2 = None
+
+Box = Tuple[int, int, int, int]
+
+FACE_CFG = config_section(
+    "face_detector",
+    {
+        "backend": "haar",
+        "max_side": None,
+        "min_size": 32,
+        "yunet_model": "models/vision/face_detection_yunet.onnx",
+        "score_threshold": 0.7,
+        "nms_threshold": 0.3,
+    },
+)
+
+
+class FaceDetector(ABC):
+    """Interface: ``detect(img_bgr)`` → ``(x1, y1, x2, y2)`` boxes in image pixels.
+
+    Detectors that accept ``max_side`` run on a copy whose longest side is
+    at most ``max_side`` pixels and scale the boxes back up, trading the
+    smallest faces for speed on large images. Detector objects are
+    shared between threads; per-thread state lives in ``self._local``.
+    """
+
+    name = "base"
+
+    def __init__(self, max_side: Optional[int] = None) -> None:
+        self.max_side = int(max_side) if max_side else None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.instances = 0
+
+    def _scale(self, img: np.ndarray) -> tuple[np.ndarray, float]:
+        longest = max(img.shape[:2])
+        if not self.max_side or longest <= self.max_side:
+            return img, 1.0
+        scale = self.max_side / longest
+        size = (max(1, round(img.shape[1] * scale)), max(1, round(img.shape[0] * scale)))
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA), scale
+
+    def _thread_model(self):
+        model = getattr(self._local, "model", None)
+        if model is None:
+            model = self._local.model = self._create()
+            with self._lock:
+                self.instances += 1
+        return model
+
+    @abstractmethod
+    def _create(self):
+        """Build the per-thread model returned by ``_thread_model``."""
+
+    @abstractmethod
+    def detect(self, img_bgr: np.ndarray) -> List[Box]:
+        """Face boxes in ``img_bgr`` pixel coordinates."""
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "max_side": self.max_side, "instances": self.instances}
+
+
+def _unscale(boxes, scale: float, shape) -> List[Box]:
+    h, w = shape[:2]
+    out = []
+    for x, y, bw, bh in boxes:
+        x1, y1 = max(0, int(x / scale)), max(0, int(y / scale))
+        x2, y2 = min(w, int(round((x + bw) / scale))), min(h, int(round((y + bh) / scale)))
+        if x2 > x1 and y2 > y1:
+            out.append((x1, y1, x2, y2))
+    return out
+
+
+class HaarFaceDetector(FaceDetector):
+    """OpenCV Haar cascade, parsed once per thread (cascades aren't thread-safe)."""
+
+    name = "haar"
+
+    def __init__(
+        self,
+        cascade_path: Optional[str] = None,
+        scale_factor: float = 1.2,
+        min_neighbors: int = 5,
+        min_size: int = 32,
+        max_side: Optional[int] = None,
+    ) -> None:
+        super().__init__(max_side)
+        self.cascade_path = cascade_path
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+    def _create(self):
+        if not hasattr(cv2, "CascadeClassifier"):
+            raise RuntimeError("This OpenCV build has no CascadeClassifier (objdetect).")
+        path = self.cascade_path or cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+        cascade = cv2.CascadeClassifier(path)
+        if cascade.empty():
+            raise RuntimeError(f"Could not load Haar cascade: {path}")
+        return cascade
+
+    def detect(self, img_bgr: np.ndarray) -> List[Box]:
+        if cv2 is None:
+            return []
+        # Grayscale before downscaling: one channel to resize instead of three.
+        gray, scale = self._scale(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY))
+        min_size = max(1, round(self.min_size * scale))
+        faces = self._thread_model().detectMultiScale(
+            gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors, minSize=(min_size, min_size)
+        )
+        return _unscale(faces, scale, img_bgr.shape)
+
+
+class YuNetFaceDetector(FaceDetector):
+    """YuNet ONNX face detector through ``cv2.FaceDetectorYN``, one per thread."""
+
+    name = "yunet"
+
+    def __init__(
+        self,
+        model_path: str,
+        score_threshold: float = 0.7,
+        nms_threshold: float = 0.3,
+        max_side: Optional[int] = None,
+    ) -> None:
+        super().__init__(max_side)
+        if cv2 is None or not hasattr(cv2, "FaceDetectorYN"):
+            raise RuntimeError("opencv-python >= 4.5.4 is required for the YuNet face detector.")
+        if not Path(model_path).exists():
+            raise RuntimeError(f"YuNet model not found: {model_path}")
+        self.model_path = model_path
+        self.score_threshold = score_threshold
+        self.nms_threshold = nms_threshold
+
+    def _create(self):
+        return cv2.FaceDetectorYN.create(self.model_path, "", (320, 320), self.score_threshold, self.nms_threshold)
+
+    def detect(self, img_bgr: np.ndarray) -> List[Box]:
+        img, scale = self._scale(img_bgr)
+        model = self._thread_model()
+        model.setInputSize((img.shape[1], img.shape[0]))
+        _, faces = model.detect(img)
+        if faces is None:
+            return []
+        return _unscale(faces[:, :4], scale, img_bgr.shape)
+
+
+def make_face_detector(cfg: dict) -> FaceDetector:
+    """The configured backend; falls back to Haar when YuNet can't load."""
+    if cfg.get("backend") == "yunet":
+        try:
+            return YuNetFaceDetector(
+                cfg["yunet_model"], cfg["score_threshold"], cfg["nms_threshold"], cfg.get("max_side")
+            )
+        except RuntimeError:
+            pass
+    return HaarFaceDetector(min_size=cfg.get("min_size", 32), max_side=cfg.get("max_side"))
+
+
+face_detector = make_face_detector(FACE_CFG)
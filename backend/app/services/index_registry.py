@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import joblib
+import numpy as np
+
+from .ann import load_ann_index
+from .bm25 import BM25Index
+from .docstore import DocStore
+from .perf import rss_bytes
+from .query_embed import QueryEmbedder
+from .settings import config_section
+
+ACTIVE_FILE = "ACTIVE"
+
+
+def active_version(base: Path) -> Optional[str]:
+    """Version named by ``base/ACTIVE``; ``"legacy"`` for a flat, unversioned layout."""
+    pointer = base / ACTIVE_FILE
+    if pointer.exists():
+        name = pointer.read_text(encoding="utf-8").strip()
+        return name or None
+    if (base / "embeddings.npy").exists():
+        return "legacy"
+    return None
+
+
+def active_dir(base: Path) -> Optional[Path]:
+    version = active_version(base)
+    if version is None:
+        return None
+    return base if version == "legacy" else base / version
+
+
+def new_version_dir(base: Path) -> Path:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path, n = base / stamp, 1
+    while path.exists():
+        path, n = base / f"{stamp}-{n}", n + 1
+    path.mkdir(parents=True)
+    return path
+
+
+def publish_version(base: Path, version_dir: Path) -> str:
+    """Point ``base/ACTIVE`` at ``version_dir``; readers never see a partial write."""
+    tmp = base / f".{ACTIVE_FILE}.tmp"
+    tmp.write_text(version_dir.name, encoding="utf-8")
+    os.replace(tmp, base / ACTIVE_FILE)
+    return version_dir.name
+
+
+def prune_versions(base: Path, keep: int = 3) -> list[str]:
+    """Delete all but the newest ``keep`` version directories (never the active one)."""
+    active = active_version(base)
+    versions = sorted(p for p in base.iterdir() if p.is_dir() and (p / "embeddings.npy").exists())
+    removed = []
+    for path in versions[: max(0, len(versions) - keep)]:
+        if path.name != active:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path.name)
+    return removed
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """One loaded index version. Requests hold a reference for their whole duration."""
+
+    version: str
+    path: Path
+    data: Dict[str, Any]
+    load_ms: float
+    loaded_at: float
+    rss_delta_bytes: Optional[int]
+    files_bytes: int
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "path": str(self.path),
+            "load_ms": self.load_ms,
+            "loaded_at": self.loaded_at,
+            "rss_delta_bytes": self.rss_delta_bytes,
+            "files_bytes": self.files_bytes,
+        }
+
+
+class IndexRegistry:
+    """Serves the ``ACTIVE`` version under ``base`` and swaps in new ones.
+
+    ``loader(path)`` returns the artifacts of one version directory, or None
+    when they are incomplete. ``reload`` loads the target version on a
+    background thread and then replaces ``self._snapshot`` in a single
+    assignment; queries that already hold the previous snapshot finish on
+    it and it is freed once the last of them drops its reference.
+    """
+
+    def __init__(self, name: str, base: Path, loader: Callable[[Path], Optional[Dict[str, Any]]]) -> None:
+        self.name = name
+        self.base = base
+        self.loader = loader
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._lock = threading.Lock()
+        self._loading: Optional[threading.Thread] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.reload_count = 0
+        self.last_error: Optional[str] = None
+        self._swap_listeners: list[Callable[[IndexSnapshot], None]] = []
+
+    def add_swap_listener(self, fn: Callable[[IndexSnapshot], None]) -> None:
+        """Call ``fn(new_snapshot)`` after every swap (e.g. to drop cached results)."""
+        self._swap_listeners.append(fn)
+
+    def current(self) -> Optional[IndexSnapshot]:
+        snap = self._snapshot
+        if snap is None:
+            # Nothing loaded yet: wait for (or start) the single loader thread.
+            self.reload(wait=True)
+            snap = self._snapshot
+        return snap
+
+    def _load(self, version: str, path: Path) -> Optional[IndexSnapshot]:
+        before = rss_bytes()
+        start = time.perf_counter()
+        data = self.loader(path)
+        if data is None:
+            return None
+        load_ms = round((time.perf_counter() - start) * 1000, 3)
+        after = rss_bytes()
+        files = sum(p.stat().st_size for p in path.iterdir() if p.is_file())
+        delta = after - before if before is not None and after is not None else None
+        return IndexSnapshot(version, path, data, load_ms, time.time(), delta, files)
+
+    def _swap_to_active(self, force: bool = False) -> bool:
+        version = active_version(self.base)
+        if version is None:
+            return False
+        current = self._snapshot
+        if current is not None and current.version == version and not force:
+            return False
+        try:
+            snap = self._load(version, active_dir(self.base))
+        except Exception as exc:  # keep serving the previous version
+            self.last_error = f"{version}: {exc!r}"
+            return False
+        if snap is None:
+            return False
+        self._snapshot = snap
+        self.reload_count += 1
+        self.last_error = None
+        for fn in self._swap_listeners:
+            try:
+                fn(snap)
+            except Exception:
+                pass
+        return True
+
+    def reload(self, wait: bool = False, force: bool = False) -> dict:
+        """Load the active version in the background and swap it in."""
+        with self._lock:
+            if self._loading is None or not self._loading.is_alive():
+                self._loading = threading.Thread(
+                    target=self._swap_to_active, args=(force,), name=f"{self.name}-reload", daemon=True
+                )
+                self._loading.start()
+            loading = self._loading
+        if wait:
+            loading.join()
+        return self.status()
+
+    def start_watcher(self, interval_s: float) -> None:
+        """Poll ``ACTIVE`` every ``interval_s`` seconds and reload on change."""
+        if interval_s <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(interval_s):
+                snap = self._snapshot
+                version = active_version(self.base)
+                if version is not None and (snap is None or snap.version != version):
+                    self.reload()
+
+        self._watcher = threading.Thread(target=watch, name=f"{self.name}-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+
+    def status(self) -> dict:
+        snap = self._snapshot
+        loading = self._loading is not None and self._loading.is_alive()
+        return {
+            "name": self.name,
+            "base": str(self.base),
+            "active_on_disk": active_version(self.base),
+            "loaded": snap.info() if snap is not None else None,
+            "loading": loading,
+            "reload_count": self.reload_count,
+            "last_error": self.last_error,
+            "watching": self._watcher is not None and self._watcher.is_alive(),
+        }
+
+
+def _load_ann(path: Path):
+    try:
+        return load_ann_index(path)
+    except Exception:
+        return None
+
+
+def _sklearn_embedder(path: Path):
+    vec_path, svd_path = path / "tfidf_vectorizer.joblib", path / "svd.joblib"
+    if not (vec_path.exists() and svd_path.exists()):
+        return None
+    vectorizer = joblib.load(vec_path)
+    svd = joblib.load(svd_path)
+
+    def embed(queries):
+        proj = svd.transform(vectorizer.transform(list(queries)))
+        return proj / (np.linalg.norm(proj, axis=1, keepdims=True) + 1e-8)
+
+    return embed
+
+
+def load_svd_artifacts(path: Path) -> Optional[Dict[str, Any]]:
+    emb_path, docs_path = path / "embeddings.npy", path / "docs.jsonl"
+    if not (emb_path.exists() and docs_path.exists()):
+        return None
+    # The precomposed projection avoids unpickling (and importing) sklearn;
+    # versions built before it existed fall back to the fitted estimators.
+    embedder = QueryEmbedder.load(path)
+    embed = embedder.embed if embedder is not None else _sklearn_embedder(path)
+    if embed is None:
+        return None
+    return {
+        "embed": embed,
+        # Memory-mapped so every worker shares the same page-cache copy.
+        "emb": np.load(emb_path, mmap_mode="r"),
+        "docs": DocStore(docs_path),
+        "ann": _load_ann(path),
+        "bm25": BM25Index.load(path),
+    }
+
+
+def load_sbert_artifacts(path: Path) -> Optional[Dict[str, Any]]:
+    emb_path, docs_path = path / "embeddings.npy", path / "docs.jsonl"
+    if not (emb_path.exists() and docs_path.exists()):
+        return None
+    return {
+        "emb": np.load(emb_path, mmap_mode="r"),
+        "docs": DocStore(docs_path),
+        "ann": _load_ann(path),
+    }
+
+
+REGISTRY_CFG = config_section("index_registry", {"watch_interval_s": 0, "keep_versions": 3})
+
+svd_registry = IndexRegistry("svd", Path("models/rag"), load_svd_artifacts)
+sbert_registry = IndexRegistry("sbert", Path("models/rag_sbert"), load_sbert_artifacts)
+REGISTRIES = {"svd": svd_registry, "sbert": sbert_registry}
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import os
+import resource
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+
+import numpy as np
+
+
+def rss_bytes() -> int | None:
+    """Current resident set size of this process (peak RSS off Linux)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return None
+
+
+class LatencyTracker:
+    """Rolling window of latencies in milliseconds with running totals."""
+
+    def __init__(self, window: int = 2048) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        with self._lock:
+            self._samples.append(ms)
+            self.count += 1
+            self.total_ms += ms
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe((time.perf_counter() - start) * 1000)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = np.array(self._samples, dtype=np.float64)
+            count, total = self.count, self.total_ms
+        if samples.size == 0:
+            return {"count": count, "mean_ms": None, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {
+            "count": count,
+            "mean_ms": round(total / count, 3),
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+        }
+
+
+class StageTimers:
+    """Named ``LatencyTracker``s for the stages of a request pipeline."""
+
+    def __init__(self, window: int = 2048) -> None:
+        self.window = window
+        self._trackers: dict[str, LatencyTracker] = {}
+        self._lock = threading.Lock()
+
+    def tracker(self, stage: str) -> LatencyTracker:
+        with self._lock:
+            if stage not in self._trackers:
+                self._trackers[stage] = LatencyTracker(self.window)
+            return self._trackers[stage]
+
+    @contextmanager
+    def time(self, stage: str, timings: dict | None = None) -> Iterator[None]:
+        """Time the block into ``stage``; also record it in ``timings`` (ms)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            self.tracker(stage).observe(ms)
+            if timings is not None:
+                timings[stage] = round(ms, 3)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            trackers = dict(self._trackers)
+        return {stage: tracker.snapshot() for stage, tracker in trackers.items()}
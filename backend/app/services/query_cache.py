@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .index_registry import REGISTRIES
+from .settings import config_section
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class _SQLiteTier:
+    """Result store in a local SQLite file shared by every worker process."""
+
+    def __init__(self, path: Path, max_entries: int) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, ns TEXT, value TEXT, expires REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Any:
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, ns: str, value: Any, ttl_s: float) -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, ns, value, expires) VALUES (?, ?, ?, ?)",
+            (key, ns, json.dumps(value), time.time() + ttl_s),
+        )
+        self._writes += 1
+        if self._writes % 256 == 0:
+            self._trim(conn)
+
+    def _trim(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def invalidate(self, ns: Optional[str]) -> None:
+        if ns is None:
+            self._conn().execute("DELETE FROM cache")
+        else:
+            self._conn().execute("DELETE FROM cache WHERE ns = ?", (ns,))
+
+
+class QueryCache:
+    """Bounded LRU + TTL cache of search results.
+
+    Keys combine a namespace (which retriever), the index version, the
+    normalized query, ``top_k`` and any search knobs, so a swapped index
+    never serves stale hits; ``invalidate`` drops the dead entries right
+    away. With ``sqlite_path`` set, misses fall through to a SQLite file
+    that all workers on the host read and write, and local hits stay in
+    the per-process LRU.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl_s: float = 300.0,
+        sqlite_path: Optional[Path] = None,
+        shared_max_entries: int = 50_000,
+        enabled: bool = True,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, tuple[float, str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._shared = _SQLiteTier(sqlite_path, shared_max_entries) if sqlite_path else None
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(ns: str, version: Any, query: str, top_k: int, params: Optional[dict] = None) -> str:
+        return json.dumps([ns, str(version), normalize_query(query), int(top_k), params or {}], sort_keys=True)
+
+    def get(self, key: str) -> Any:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, _, value = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+        if self._shared is not None:
+            try:
+                value = self._shared.get(key)
+            except sqlite3.Error:
+                value = None
+            if value is not None:
+                ns = json.loads(key)[0]
+                self._put_local(key, ns, value, now)
+                with self._lock:
+                    self.shared_hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _put_local(self, key: str, ns: str, value: Any, now: float) -> None:
+        with self._lock:
+            self._entries[key] = (now + self.ttl_s, ns, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set(self, key: str, ns: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        self._put_local(key, ns, value, time.monotonic())
+        if self._shared is not None:
+            try:
+                self._shared.set(key, ns, value, self.ttl_s)
+            except sqlite3.Error:
+                pass
+
+    def invalidate(self, ns: Optional[str] = None) -> int:
+        """Drop every entry of ``ns`` (all namespaces when None)."""
+        with self._lock:
+            stale = [k for k, (_, entry_ns, _) in self._entries.items() if ns is None or entry_ns == ns]
+            for k in stale:
+                del self._entries[k]
+            self.invalidations += 1
+        if self._shared is not None:
+            try:
+                self._shared.invalidate(ns)
+            except sqlite3.Error:
+                pass
+        return len(stale)
+
+    def cached_batch(
+        self,
+        ns: str,
+        version: Any,
+        queries: Sequence[str],
+        top_k: int,
+        params: Optional[dict],
+        search_fn: Callable[[List[str]], List[Any]],
+    ) -> List[Any]:
+        """Results for ``queries``, running ``search_fn`` only on the misses."""
+        keys = [self.key(ns, version, q, top_k, params) for q in queries]
+        results: List[Any] = [self.get(k) for k in keys]
+        todo: Dict[str, str] = {}
+        for key, query, result in zip(keys, queries, results):
+            if result is None:
+                todo.setdefault(key, query)
+        if todo:
+            computed = dict(zip(todo, search_fn(list(todo.values()))))
+            for key, value in computed.items():
+                self.set(key, ns, value)
+            results = [computed[k] if r is None else r for k, r in zip(keys, results)]
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "shared": str(self._shared.path) if self._shared is not None else None,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_CFG = config_section(
+    "query_cache",
+    {"enabled": True, "max_entries": 2048, "ttl_s": 300, "sqlite_path": None, "shared_max_entries": 50_000},
+)
+query_cache = QueryCache(
+    max_entries=int(_CFG["max_entries"]),
+    ttl_s=float(_CFG["ttl_s"]),
+    sqlite_path=Path(_CFG["sqlite_path"]) if _CFG["sqlite_path"] else None,
+    shared_max_entries=int(_CFG["shared_max_entries"]),
+    enabled=bool(_CFG["enabled"]),
+)
+
+for _name, _registry in REGISTRIES.items():
+    _registry.add_swap_listener(lambda snap, ns=_name: query_cache.invalidate(ns))
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+PROJ_FILE = "query_proj.npy"
+VOCAB_FILE = "query_vocab.json"
+
+
+def write_query_projection(vectorizer, svd, out_dir: Path) -> bool:
+    """Export a fitted TfidfVectorizer + TruncatedSVD as one projection table.
+
+    Row ``i`` of ``query_proj.npy`` is ``idf[i] * svd.components_[:, i]``,
+    so a query embedding is the count-weighted sum of the rows of its
+    terms. The vectorizer's own L2 norm only rescales that sum and is
+    dropped by the final normalization. Returns False (nothing written)
+    for vectorizer settings the plain tokenizer can't reproduce.
+    """
+    if (
+        vectorizer.analyzer != "word"
+        or tuple(vectorizer.ngram_range) != (1, 1)
+        or vectorizer.tokenizer is not None
+        or vectorizer.preprocessor is not None
+        or vectorizer.strip_accents is not None
+        or not vectorizer.use_idf
+    ):
+        return False
+    terms = [None] * len(vectorizer.vocabulary_)
+    for term, i in vectorizer.vocabulary_.items():
+        terms[i] = term
+    proj = (svd.components_ * vectorizer.idf_[None, :]).T.astype("float32")
+    np.save(out_dir / PROJ_FILE, np.ascontiguousarray(proj))
+    meta = {
+        "terms": terms,
+        "token_pattern": vectorizer.token_pattern,
+        "lowercase": bool(vectorizer.lowercase),
+        "sublinear_tf": bool(vectorizer.sublinear_tf),
+    }
+    (out_dir / VOCAB_FILE).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    return True
+
+
+class QueryEmbedder:
+    """Query text → unit-norm SVD embedding without sklearn.
+
+    One regex tokenization and a gather-sum over the memory-mapped
+    projection rows of the query's terms replace ``vectorizer.transform``
+    followed by ``svd.transform``.
+    """
+
+    def __init__(self, proj: np.ndarray, terms: Sequence[str], token_pattern: str, lowercase: bool, sublinear_tf: bool) -> None:
+        self.proj = proj
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.token_re = re.compile(token_pattern)
+        self.lowercase = lowercase
+        self.sublinear_tf = sublinear_tf
+
+    @property
+    def dim(self) -> int:
+        return self.proj.shape[1]
+
+    @classmethod
+    def load(cls, base: Path) -> Optional["QueryEmbedder"]:
+        proj_path, vocab_path = base / PROJ_FILE, base / VOCAB_FILE
+        if not (proj_path.exists() and vocab_path.exists()):
+            return None
+        meta = json.loads(vocab_path.read_text(encoding="utf-8"))
+        return cls(
+            np.load(proj_path, mmap_mode="r"),
+            meta["terms"],
+            meta["token_pattern"],
+            meta["lowercase"],
+            meta["sublinear_tf"],
+        )
+
+    def embed(self, queries: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(queries), self.dim), dtype="float32")
+        vocab = self.vocab
+        for row, query in enumerate(queries):
+            text = query.lower() if self.lowercase else query
+            ids = [vocab[t] for t in self.token_re.findall(text) if t in vocab]
+            if not ids:
+                continue
+            ids, counts = np.unique(np.asarray(ids, dtype=np.int64), return_counts=True)
+            weights = counts.astype("float32")
+            if self.sublinear_tf:
+                weights = 1.0 + np.log(weights)
+            out[row] = weights @ self.proj[ids]
+        return out / (np.linalg.norm(out, axis=1, keepdims=True) + 1e-8)
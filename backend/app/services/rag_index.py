@@ -1,49 +1,230 @@
 from __future__ import annotations
 
 import json
+import threading
+import uuid
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable, List
 
 import numpy as np
 from joblib import load
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from .ranking import top_k_indices
+
+INGEST_MODES = ("replace", "append")
+QUERY_BLOCK = 64
+
+
+def _normalized_csr(matrix) -> sparse.csr_matrix:
+    # Rows are L2-normalized once here so a query is a single sparse
+    # mat-vec: dot products against unit rows are already cosines.
+    csr = sparse.csr_matrix(matrix, dtype=np.float32)
+    return normalize(csr, norm="l2", axis=1, copy=False)
+
+
+@dataclass
+class _Segment:
+    matrix: sparse.csr_matrix
+    docs: list[dict]
+    ids: np.ndarray
+    alive: np.ndarray
+
+    @classmethod
+    def build(cls, matrix, docs: list[dict]) -> "_Segment":
+        ids = np.array([str(doc.get("id", "")) for doc in docs])
+        return cls(_normalized_csr(matrix), docs, ids, np.ones(len(docs), dtype=bool))
 
 
 class RAGIndex:
-    def __init__(self) -> None:
-        self.docs: list[dict] = []
+    """In-memory TF-IDF index made of append-only segments.
+
+    ``replace`` ingests refit the vectorizer and start a single fresh
+    segment. ``append`` ingests reuse the fitted (frozen) vocabulary and
+    only vectorize the new batch, so their cost scales with the batch and
+    not the corpus; terms unseen at fit time are ignored until the next
+    ``replace``. Deletes mark rows dead (tombstones) and a background merge
+    folds segments together and drops dead rows once there are more than
+    ``max_segments`` of them.
+    """
+
+    def __init__(self, max_segments: int = 8) -> None:
         self.vectorizer: TfidfVectorizer | None = None
-        self.matrix = None
+        self.segments: list[_Segment] = []
+        self.max_segments = max_segments
+        self.version = 0
+        # Process-unique, so the version counter can't collide across workers or restarts.
+        self._instance_id = uuid.uuid4().hex
+        self._generation = 0
+        self._lock = threading.RLock()
+        self._merge_thread: threading.Thread | None = None
+
+    @property
+    def cache_id(self) -> str:
+        """Identity of the current index state for shared caches (``version`` is per-process)."""
+        return f"{self._instance_id}:{self.version}"
+
+    @property
+    def docs(self) -> list[dict]:
+        with self._lock:
+            segments = list(self.segments)
+        return [doc for seg in segments for doc, ok in zip(seg.docs, seg.alive) if ok]
+
+    @property
+    def matrix(self) -> sparse.csr_matrix | None:
+        """Rows of live documents, aligned with ``docs``."""
+        with self._lock:
+            parts = [(seg.matrix, seg.alive.copy()) for seg in self.segments]
+        if not parts:
+            return None
+        return sparse.vstack([matrix[alive] for matrix, alive in parts], format="csr")
 
-    def ingest(self, docs: Iterable[dict]) -> List[dict]:
+    def _reset(self, vectorizer: TfidfVectorizer | None, segments: list[_Segment]) -> None:
+        with self._lock:
+            self.vectorizer = vectorizer
+            self.segments = segments
+            self._generation += 1
+            self.version += 1
+
+    def ingest(self, docs: Iterable[dict], mode: str = "replace") -> List[dict]:
+        if mode not in INGEST_MODES:
+            raise ValueError(f"Unknown ingest mode: {mode}")
         clean_docs = [doc for doc in docs if doc.get("text")]
+        if mode == "append":
+            appended = self._append(clean_docs)
+            if appended is not None:
+                return appended
         if not clean_docs:
-            self.docs = []
-            self.vectorizer = None
-            self.matrix = None
+            if mode == "replace":
+                self._reset(None, [])
             return []
-        self.docs = clean_docs
-        self.vectorizer = TfidfVectorizer(stop_words="english")
+        vectorizer = TfidfVectorizer(stop_words="english")
         texts = [doc["text"] for doc in clean_docs]
-        self.matrix = self.vectorizer.fit_transform(texts)
-        return self.docs
+        segment = _Segment.build(vectorizer.fit_transform(texts), clean_docs)
+        self._reset(vectorizer, [segment])
+        return clean_docs
+
+    def _append(self, docs: list[dict]) -> List[dict] | None:
+        """Add ``docs`` as a new segment; ``None`` when there is no vocabulary yet.
+
+        The transform runs outside the lock. A ``replace`` that lands
+        meanwhile refits the vocabulary, so the batch is transformed again
+        against the new one rather than appended with stale columns.
+        """
+        while True:
+            with self._lock:
+                vectorizer, generation = self.vectorizer, self._generation
+            if vectorizer is None:
+                return None
+            if not docs:
+                return []
+            segment = _Segment.build(vectorizer.transform([doc["text"] for doc in docs]), docs)
+            with self._lock:
+                if self._generation == generation:
+                    self.segments.append(segment)
+                    self.version += 1
+                    break
+        if len(self.segments) > self.max_segments:
+            self.merge(background=True)
+        return docs
+
+    def delete(self, ids: Iterable) -> int:
+        wanted = np.array([str(i) for i in ids if str(i)])
+        if wanted.size == 0:
+            return 0
+        removed = 0
+        with self._lock:
+            for seg in self.segments:
+                hit = seg.alive & np.isin(seg.ids, wanted)
+                count = int(hit.sum())
+                if count:
+                    seg.alive[hit] = False
+                    removed += count
+            if removed:
+                self.version += 1
+        return removed
+
+    def merge(self, background: bool = False) -> None:
+        """Fold all current segments into one, dropping tombstoned rows."""
+        if background:
+            with self._lock:
+                if self._merge_thread is not None and self._merge_thread.is_alive():
+                    return
+                self._merge_thread = threading.Thread(target=self._merge, daemon=True)
+                self._merge_thread.start()
+            return
+        self._merge()
+
+    def _merge(self) -> None:
+        with self._lock:
+            segments = list(self.segments)
+            generation = self._generation
+            masks = [seg.alive.copy() for seg in segments]
+        if len(segments) <= 1 and all(mask.all() for mask in masks):
+            return
+        # The expensive part runs without the lock so searches and appends
+        # proceed against the old segments meanwhile.
+        matrix = sparse.vstack(
+            [seg.matrix[mask] for seg, mask in zip(segments, masks)], format="csr"
+        )
+        docs = [d for seg, mask in zip(segments, masks) for d, ok in zip(seg.docs, mask) if ok]
+        ids = np.concatenate([seg.ids[mask] for seg, mask in zip(segments, masks)])
+        with self._lock:
+            if self._generation != generation:
+                return
+            # Deletes that landed during the merge are carried over.
+            alive = np.concatenate([seg.alive[mask] for seg, mask in zip(segments, masks)])
+            merged = _Segment(matrix, docs, ids, alive)
+            self.segments = [merged] + self.segments[len(segments):]
+
+    @staticmethod
+    def _query_matrix(vectorizer: TfidfVectorizer, queries: list[str]) -> sparse.csr_matrix:
+        matrix = normalize(vectorizer.transform(queries), norm="l2", axis=1)
+        return sparse.csr_matrix(matrix, dtype=np.float32)
 
     def search(self, query: str, top_k: int = 5) -> List[dict]:
-        if not self.vectorizer or self.matrix is None or not self.docs:
-            return []
-        vector = self.vectorizer.transform([query])
-        matrix_array = self.matrix.toarray()
-        vector_array = vector.toarray()
-        denom = np.linalg.norm(matrix_array, axis=1) * np.linalg.norm(vector_array)
-        denom[denom == 0] = 1e-8
-        sim = (matrix_array @ vector_array.T).ravel() / denom
-        idx = np.argsort(-sim)[:top_k]
+        return self.search_batch([query], top_k)[0]
+
+    def search_batch(self, queries: list[str], top_k: int = 5) -> List[List[dict]]:
+        """Rank every query in one vectorizer call and one product per segment.
+
+        Queries are scored in blocks of ``QUERY_BLOCK`` so the dense
+        ``(block, n_docs)`` score matrix stays bounded for large batches.
+        """
+        with self._lock:
+            vectorizer = self.vectorizer
+            segments = list(self.segments)
+        if not vectorizer or not segments or not queries:
+            return [[] for _ in queries]
+        offsets = np.cumsum([0] + [len(seg.docs) for seg in segments])
+        q_all = self._query_matrix(vectorizer, list(queries))
+        results: List[List[dict]] = []
+        for start in range(0, q_all.shape[0], QUERY_BLOCK):
+            block = q_all[start : start + QUERY_BLOCK]
+            parts = []
+            for seg in segments:
+                part = (block @ seg.matrix.T).toarray()
+                part[:, ~seg.alive] = -np.inf
+                parts.append(part)
+            sim = np.concatenate(parts, axis=1)
+            for row, idx in zip(sim, top_k_indices(sim, top_k)):
+                results.append(self._hits(row, idx, segments, offsets))
+        return results
+
+    @staticmethod
+    def _hits(sim: np.ndarray, idx: np.ndarray, segments: list[_Segment], offsets: np.ndarray) -> List[dict]:
         hits = []
-        for rank, i in enumerate(idx, start=1):
-            doc = self.docs[int(i)]
+        for i in idx:
+            if not np.isfinite(sim[i]):
+                break
+            s = int(np.searchsorted(offsets, i, side="right")) - 1
+            doc = segments[s].docs[int(i - offsets[s])]
             hits.append(
                 {
-                    "rank": rank,
+                    "rank": len(hits) + 1,
                     "score": float(sim[i]),
                     "doc": doc,
                 }
@@ -56,13 +237,12 @@ class RAGIndex:
         docs_path = root / "docs.jsonl"
         if not (vectorizer_path.exists() and matrix_path.exists() and docs_path.exists()):
             return False
-        self.vectorizer = load(vectorizer_path)
-        self.matrix = load(matrix_path)
-        self.docs = [
+        docs = [
             json.loads(line)
             for line in docs_path.read_text(encoding="utf-8").splitlines()
             if line.strip()
         ]
+        self._reset(load(vectorizer_path), [_Segment.build(load(matrix_path), docs)])
         return True
 
 
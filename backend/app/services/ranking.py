@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` best scores along the last axis, best first.
+
+    Uses ``argpartition`` so selecting from ``n`` scores costs O(n + k log k)
+    instead of the O(n log n) of a full ``argsort``. Works on a 1-D score
+    vector or a 2-D ``(n_queries, n_docs)`` score matrix.
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[-1]
+    k = max(0, min(int(k), n))
+    if k == 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    if k < n:
+        part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        part = np.broadcast_to(np.arange(n), scores.shape).copy()
+    part_scores = np.take_along_axis(scores, part, axis=-1)
+    order = np.argsort(-part_scores, axis=-1, kind="stable")
+    return np.take_along_axis(part, order, axis=-1)
+
+
+def reciprocal_rank_fusion(rankings: list, top_k: int, k: int = 60) -> tuple[list[int], list[float]]:
+    """Fuse ranked id lists with RRF: ``sum(1 / (k + rank))`` per id.
+
+    Scores are divided by the best possible sum (rank 1 in every list), so
+    a document ranked first by every retriever scores 1.0. Returns
+    ``(ids, scores)`` best first.
+    """
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            if doc_id < 0:
+                continue
+            fused[int(doc_id)] = fused.get(int(doc_id), 0.0) + 1.0 / (k + rank)
+    best = max(len(rankings), 1) / (k + 1)
+    ordered = sorted(fused.items(), key=lambda item: -item[1])[:top_k]
+    return [doc_id for doc_id, _ in ordered], [score / best for _, score in ordered]
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .perf import StageTimers
+from .settings import config_section
+
+try:
+    import onnxruntime as ort
+except ImportError:  # pragma: no cover
+    ort = None
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:  # pragma: no cover
+    Tokenizer = None
+
+TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+RERANK_CFG = config_section(
+    "rerank",
+    {
+        "enabled": False,
+        "candidates": 30,
+        "budget_ms": 40.0,
+        "batch_size": 16,
+        "snippet_chars": 320,
+        "cross_encoder": None,
+        "tokenizer": None,
+        "max_length": 256,
+        "intra_op_threads": 1,
+    },
+)
+
+
+class ProximityScorer:
+    """Query-term coverage plus how tightly the matched terms cluster.
+
+    A passage scores ``coverage + coverage * n_matched / shortest_span``:
+    the fraction of distinct query terms it contains, boosted when they
+    occur close together (the span is the shortest token window holding
+    every matched term). Pure Python over the candidate texts only.
+    """
+
+    name = "proximity"
+
+    def score(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        terms = set(TOKEN_RE.findall(query.lower()))
+        out = np.zeros(len(texts), dtype=np.float32)
+        if not terms:
+            return out
+        for row, text in enumerate(texts):
+            positions = [(i, tok) for i, tok in enumerate(TOKEN_RE.findall(text.lower())) if tok in terms]
+            matched = len({tok for _, tok in positions})
+            if not matched:
+                continue
+            coverage = matched / len(terms)
+            out[row] = coverage + coverage * matched / _shortest_span(positions, matched)
+        return out
+
+
+def _shortest_span(positions: list, matched: int) -> int:
+    """Length of the shortest window of ``positions`` holding ``matched`` distinct terms."""
+    counts: dict[str, int] = {}
+    best = positions[-1][0] - positions[0][0] + 1
+    left = 0
+    for pos, tok in positions:
+        counts[tok] = counts.get(tok, 0) + 1
+        while len(counts) == matched:
+            best = min(best, pos - positions[left][0] + 1)
+            first = positions[left][1]
+            counts[first] -= 1
+            if not counts[first]:
+                del counts[first]
+            left += 1
+    return best
+
+
+class CrossEncoderScorer:
+    """Small cross-encoder exported to ONNX, scored in padded batches.
+
+    Expects a ``tokenizer.json`` (Hugging Face ``tokenizers``) and a model
+    whose first output holds one relevance logit per (query, passage) pair.
+    Only the inputs the graph declares (``input_ids``, ``attention_mask``,
+    ``token_type_ids``) are fed.
+    """
+
+    name = "cross_encoder"
+
+    def __init__(self, model_path: str, tokenizer_path: str, max_length: int = 256, intra_op_threads: int = 1) -> None:
+        if ort is None:
+            raise RuntimeError("onnxruntime is required for the cross-encoder reranker.")
+        if Tokenizer is None:
+            raise RuntimeError("tokenizers is required for the cross-encoder reranker.")
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = intra_op_threads
+        self.sess = ort.InferenceSession(model_path, opts, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.sess.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+    def score(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        encoded = self.tokenizer.encode_batch([(query, text) for text in texts])
+        feeds = {
+            "input_ids": np.array([e.ids for e in encoded], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encoded], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encoded], dtype=np.int64),
+        }
+        logits = self.sess.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+        return np.asarray(logits, dtype=np.float32).reshape(len(texts), -1)[:, 0]
+
+
+def trim_snippet(text: str, query: str, chars: int) -> str:
+    """The ``chars``-long window of ``text`` holding the most query terms."""
+    if len(text) <= chars:
+        return text
+    terms = set(TOKEN_RE.findall(query.lower()))
+    starts = [m.start() for m in TOKEN_RE.finditer(text.lower()) if m.group() in terms]
+    if not starts:
+        return text[:chars].rstrip() + "…"
+    best_start, best_count, right = starts[0], 0, 0
+    for left, start in enumerate(starts):
+        while right < len(starts) and starts[right] < start + chars:
+            right += 1
+        if right - left > best_count:
+            best_start, best_count = start, right - left
+    # Open the window at a word boundary a little before the first match.
+    begin = max(0, min(best_start - chars // 8, len(text) - chars))
+    if begin:
+        space = text.rfind(" ", 0, begin + 1)
+        begin = space + 1 if space >= 0 and begin - space < 32 else begin
+    snippet = text[begin : begin + chars].strip()
+    return ("…" if begin else "") + snippet + ("…" if begin + chars < len(text) else "")
+
+
+class Reranker:
+    """Second-stage reordering of first-stage hits under a time budget.
+
+    Candidates are scored in batches of ``batch_size``; if the budget runs
+    out before every candidate is scored, the first-stage order is kept.
+    A slow scorer therefore costs at most ``budget_ms`` plus one batch.
+    """
+
+    def __init__(self, scorer, budget_ms: float = 40.0, batch_size: int = 16) -> None:
+        self.scorer = scorer
+        self.budget_ms = budget_ms
+        self.batch_size = max(1, int(batch_size))
+        self._lock = threading.Lock()
+        self.reranked = 0
+        self.budget_exceeded = 0
+
+    def rerank(self, query: str, hits: list[dict], top_k: int, budget_ms: Optional[float] = None) -> tuple[list[dict], dict]:
+        budget = self.budget_ms if budget_ms is None else budget_ms
+        deadline = time.perf_counter() + budget / 1000.0
+        scores = np.empty(len(hits), dtype=np.float32)
+        done = True
+        for lo in range(0, len(hits), self.batch_size):
+            if time.perf_counter() > deadline:
+                done = False
+                break
+            texts = [hit["text"] for hit in hits[lo : lo + self.batch_size]]
+            scores[lo : lo + len(texts)] = self.scorer.score(query, texts)
+        with self._lock:
+            if done:
+                self.reranked += 1
+            else:
+                self.budget_exceeded += 1
+        if not done:
+            return hits[:top_k], {"scorer": self.scorer.name, "applied": False, "reason": "budget_exceeded"}
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        ranked = []
+        for rank, i in enumerate(order, start=1):
+            ranked.append({**hits[i], "rank": rank, "first_stage_rank": hits[i]["rank"], "rerank_score": float(scores[i])})
+        return ranked, {"scorer": self.scorer.name, "applied": True}
+
+    def stats(self) -> dict:
+        return {
+            "scorer": self.scorer.name,
+            "budget_ms": self.budget_ms,
+            "reranked": self.reranked,
+            "budget_exceeded": self.budget_exceeded,
+        }
+
+
+def _make_scorer(cfg: dict):
+    model, tokenizer = cfg.get("cross_encoder"), cfg.get("tokenizer")
+    if model and tokenizer and Path(model).exists() and Path(tokenizer).exists():
+        try:
+            return CrossEncoderScorer(model, tokenizer, cfg["max_length"], cfg["intra_op_threads"])
+        except RuntimeError:
+            pass
+    return ProximityScorer()
+
+
+reranker = Reranker(_make_scorer(RERANK_CFG), RERANK_CFG["budget_ms"], RERANK_CFG["batch_size"])
+
+# Per-stage latency of /chat/ask (retrieve, rerank, total).
+chat_stages = StageTimers()
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
+
+try:  # Optional at runtime; without it every section falls back to defaults
+    import yaml  # type: ignore
+except Exception:  # pragma: no cover
+    yaml = None
+
+ROOT = Path(__file__).resolve().parents[3]
+CONFIG_DIR = ROOT / "configs" / "app"
+
+
+def _config_path() -> Path | None:
+    override = os.environ.get("APP_CONFIG")
+    candidates = [Path(override)] if override else []
+    candidates += [CONFIG_DIR / "app.yml", CONFIG_DIR / "app.example.yml"]
+    for path in candidates:
+        if path.exists():
+            return path
+    return None
+
+
+@lru_cache(maxsize=1)
+def load_app_config() -> Dict[str, Any]:
+    path = _config_path()
+    if path is None or yaml is None:
+        return {}
+    try:
+        return yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+    except Exception:
+        return {}
+
+
+def config_section(name: str, defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """``defaults`` overlaid with the ``name`` mapping from configs/app."""
+    merged = dict(defaults)
+    section = load_app_config().get(name)
+    if isinstance(section, dict):
+        merged.update(section)
+    return merged
@@ -0,0 +1,359 @@
+"""Face anonymization for videos and frame streams.
+
+Frames flow through four stages on their own threads (decode → detect →
+blur → encode), joined by bounded queues so a slow stage applies
+backpressure instead of buffering the whole video. Face detection runs
+only on keyframes (every ``detect_every`` frames); frames in between get
+boxes interpolated between the surrounding keyframes, or the last
+keyframe's boxes held when there is no lookahead (live streams).
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .blur import Box, blur_faces_bboxes, detect_faces_bgr
+from .perf import StageTimers
+from .settings import config_section
+
+try:
+    import cv2
+except ImportError:  # pragma: no cover
+    cv2 = None
+
+VIDEO_CFG = config_section(
+    "video_stream",
+    {
+        "detect_every": 5,
+        "max_detect_every": 8,
+        "pad_frac": 0.1,
+        "match_iou": 0.1,
+        "queue_size": 8,
+        "max_streams": 2,
+        "max_frames": 18000,
+        "codec": "mp4v",
+        "jpeg_quality": 85,
+        "max_upload_mb": 500,
+    },
+)
+
+video_stages = StageTimers()
+
+_END = object()
+_POLL_S = 0.1
+
+
+class StreamsBusy(RuntimeError):
+    """Every stream slot is taken."""
+
+
+class StreamSlots:
+    """Caps concurrent video jobs; each one holds four threads for its duration."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = max(1, int(limit))
+        self._sem = threading.BoundedSemaphore(self.limit)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.rejected = 0
+
+    def acquire(self) -> None:
+        if not self._sem.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise StreamsBusy(f"{self.limit} video streams already running")
+        with self._lock:
+            self.active += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self.active -= 1
+        self._sem.release()
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "active": self.active, "rejected": self.rejected}
+
+
+stream_slots = StreamSlots(VIDEO_CFG["max_streams"])
+
+
+def detect_interval(requested: Optional[int] = None) -> int:
+    """``requested`` keyframe interval (config default when None), checked
+    against ``max_detect_every``.
+
+    With lookahead every frame between two keyframes is held decoded until
+    the second one is detected, so the interval bounds a stream's memory.
+    """
+    value = int(VIDEO_CFG["detect_every"] if requested is None else requested)
+    limit = int(VIDEO_CFG["max_detect_every"])
+    if not 1 <= value <= limit:
+        raise ValueError(f"detect_every must be between 1 and {limit}")
+    return value
+
+
+def _iou(a: Box, b: Box) -> float:
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def interpolate_boxes(prev: Sequence[Box], nxt: Sequence[Box], t: float, match_iou: float = 0.1) -> List[Box]:
+    """Boxes at fraction ``t`` between two keyframes.
+
+    Boxes are paired greedily by IoU and their corners interpolated;
+    unpaired boxes from either keyframe are kept as they are, so a face
+    that appears or leaves between keyframes is blurred across the gap.
+    """
+    pairs = sorted(
+        ((_iou(a, b), i, j) for i, a in enumerate(prev) for j, b in enumerate(nxt)),
+        reverse=True,
+    )
+    used_prev, used_next, out = set(), set(), []
+    for score, i, j in pairs:
+        if score < match_iou:
+            break
+        if i in used_prev or j in used_next:
+            continue
+        used_prev.add(i)
+        used_next.add(j)
+        out.append(tuple(int(round(a + (b - a) * t)) for a, b in zip(prev[i], nxt[j])))
+    out += [tuple(b) for i, b in enumerate(prev) if i not in used_prev]
+    out += [tuple(b) for j, b in enumerate(nxt) if j not in used_next]
+    return out
+
+
+def pad_boxes(boxes: Sequence[Box], pad_frac: float, shape) -> List[Box]:
+    """Grow boxes by ``pad_frac`` of their size on each side, clipped to the frame."""
+    h, w = shape[:2]
+    out = []
+    for x1, y1, x2, y2 in boxes:
+        dx, dy = int((x2 - x1) * pad_frac), int((y2 - y1) * pad_frac)
+        out.append((max(0, x1 - dx), max(0, y1 - dy), min(w, x2 + dx), min(h, y2 + dy)))
+    return out
+
+
+class FramePipeline:
+    """decode → detect → blur → encode over a frame source, one thread per stage.
+
+    ``run(frames, sink)`` pulls BGR frames from the ``frames`` iterable
+    (decoding happens as it is iterated, on the decode thread), and hands
+    each processed frame to ``sink`` on the encode thread, in order.
+    ``lookahead`` interpolates boxes between keyframes, which delays
+    output by up to ``detect_every`` frames; without it the last
+    keyframe's boxes are reused.
+    """
+
+    def __init__(
+        self,
+        detect_every: int = 5,
+        lookahead: bool = True,
+        blur: bool = True,
+        pad_frac: float = 0.1,
+        match_iou: float = 0.1,
+        queue_size: int = 8,
+        detect: Optional[Callable[[np.ndarray], List[Box]]] = None,
+    ) -> None:
+        self.detect_every = max(1, int(detect_every))
+        self.lookahead = lookahead
+        self.blur = blur
+        self.pad_frac = pad_frac
+        self.match_iou = match_iou
+        self.queue_size = max(1, int(queue_size))
+        self.detect = detect or detect_faces_bgr
+        self.frames = 0
+        self.keyframes = 0
+        self.busy_ms = {"decode": 0.0, "detect": 0.0, "blur": 0.0, "encode": 0.0}
+
+    def _time(self, stage: str, start: float) -> None:
+        ms = (time.perf_counter() - start) * 1000
+        self.busy_ms[stage] += ms
+        video_stages.tracker(stage).observe(ms)
+
+    def _decode(self, frames: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        it = iter(frames)
+        while True:
+            start = time.perf_counter()
+            frame = next(it, None)
+            if frame is None:
+                return
+            self._time("decode", start)
+            yield frame
+
+    def _keyframe(self, frame: np.ndarray) -> List[Box]:
+        start = time.perf_counter()
+        boxes = list(self.detect(frame)) if self.blur else []
+        self._time("detect", start)
+        self.keyframes += 1
+        return boxes
+
+    def _detect(self, frames: Iterator[np.ndarray]) -> Iterator[tuple]:
+        last: Optional[List[Box]] = None
+        gap: list = []
+        for i, frame in enumerate(frames):
+            if i % self.detect_every == 0:
+                boxes = self._keyframe(frame)
+                yield from self._fill(gap, last, boxes)
+                gap = []
+                last = boxes
+                yield frame, boxes
+            elif self.lookahead:
+                gap.append(frame)
+            else:
+                yield frame, last
+        if gap:
+            # Treat the final frame as a keyframe so the tail interpolates too.
+            boxes = self._keyframe(gap[-1])
+            yield from self._fill(gap[:-1], last, boxes)
+            yield gap[-1], boxes
+
+    def _fill(self, gap: list, prev: Optional[List[Box]], nxt: List[Box]) -> Iterator[tuple]:
+        for k, frame in enumerate(gap, start=1):
+            t = k / (len(gap) + 1)
+            yield frame, interpolate_boxes(prev or [], nxt, t, self.match_iou)
+
+    def _blur(self, items: Iterator[tuple]) -> Iterator[np.ndarray]:
+        for frame, boxes in items:
+            start = time.perf_counter()
+            if self.blur and boxes:
+                frame = blur_faces_bboxes(frame, pad_boxes(boxes, self.pad_frac, frame.shape), inplace=True)
+            self._time("blur", start)
+            yield frame
+
+    def _encode(self, frames: Iterator[np.ndarray], sink: Callable[[np.ndarray], None]) -> Iterator[None]:
+        for frame in frames:
+            start = time.perf_counter()
+            sink(frame)
+            self._time("encode", start)
+            self.frames += 1
+            yield None
+
+    def run(self, frames: Iterable[np.ndarray], sink: Callable[[np.ndarray], None]) -> dict:
+        stop = threading.Event()
+        errors: list = []
+
+        def put(q: queue.Queue, item) -> bool:
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=_POLL_S)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def drain(q: queue.Queue) -> Iterator:
+            while not stop.is_set():
+                try:
+                    item = q.get(timeout=_POLL_S)
+                except queue.Empty:
+                    continue
+                if item is _END:
+                    return
+                yield item
+
+        def worker(produce: Callable[[], Iterator], out: Optional[queue.Queue]) -> None:
+            try:
+                for item in produce():
+                    if out is not None and not put(out, item):
+                        return
+            except BaseException as exc:  # surfaced by run()
+                errors.append(exc)
+                stop.set()
+            finally:
+                if out is not None:
+                    put(out, _END)
+
+        q_frames, q_boxes, q_blurred = (queue.Queue(self.queue_size) for _ in range(3))
+        stages = [
+            (lambda: self._decode(frames), q_frames),
+            (lambda: self._detect(drain(q_frames)), q_boxes),
+            (lambda: self._blur(drain(q_boxes)), q_blurred),
+            (lambda: self._encode(drain(q_blurred), sink), None),
+        ]
+        threads = [
+            threading.Thread(target=worker, args=stage, name=f"video-{name}", daemon=True)
+            for stage, name in zip(stages, self.busy_ms)
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        try:
+            for t in threads:
+                t.join()
+        finally:
+            stop.set()
+        wall_s = time.perf_counter() - start
+        if errors:
+            raise errors[0]
+        video_stages.tracker("job_fps").observe(self.frames / wall_s if wall_s > 0 else 0.0)
+        return {
+            "frames": self.frames,
+            "keyframes": self.keyframes,
+            "wall_s": round(wall_s, 3),
+            "fps": round(self.frames / wall_s, 2) if wall_s > 0 else 0.0,
+            "busy_ms": {k: round(v, 1) for k, v in self.busy_ms.items()},
+        }
+
+
+def read_video(path: str, max_frames: int) -> Iterator[np.ndarray]:
+    """BGR frames from a video file; raises ValueError if it can't be opened."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError("could not open video")
+    try:
+        for _ in range(max_frames):
+            ok, frame = cap.read()
+            if not ok:
+                return
+            yield frame
+    finally:
+        cap.release()
+
+
+def video_fps(path: str, default: float = 25.0) -> float:
+    cap = cv2.VideoCapture(path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) if cap.isOpened() else 0.0
+    finally:
+        cap.release()
+    return fps if fps and fps > 0 else default
+
+
+def anonymize_video(src: str, dst: str, blur: bool = True, detect_every: Optional[int] = None) -> dict:
+    """Blur faces in the video at ``src`` and write it to ``dst`` (``VIDEO_CFG["codec"]``)."""
+    if cv2 is None:
+        raise RuntimeError("opencv-python is required for video anonymization.")
+    detect_every = detect_interval(detect_every)
+    fps = video_fps(src)
+    writer: list = []
+
+    def sink(frame: np.ndarray) -> None:
+        if not writer:
+            h, w = frame.shape[:2]
+            out = cv2.VideoWriter(dst, cv2.VideoWriter_fourcc(*VIDEO_CFG["codec"]), fps, (w, h))
+            if not out.isOpened():
+                raise RuntimeError(f"could not open a {VIDEO_CFG['codec']} writer")
+            writer.append(out)
+        writer[0].write(frame)
+
+    pipeline = FramePipeline(
+        detect_every=detect_every,
+        lookahead=True,
+        blur=blur,
+        pad_frac=VIDEO_CFG["pad_frac"],
+        match_iou=VIDEO_CFG["match_iou"],
+        queue_size=VIDEO_CFG["queue_size"],
+    )
+    try:
+        stats = pipeline.run(read_video(src, int(VIDEO_CFG["max_frames"])), sink)
+    finally:
+        if writer:
+            writer[0].release()
+    if not stats["frames"]:
+        raise ValueError("no decodable frames")
+    return {**stats, "video_fps": fps}
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Sequence, Tuple
 
 import json
+import threading
+import time
 import numpy as np
 
 try:
@@ -20,18 +22,101 @@ IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
 IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
 
 
-def _preprocess_bgr(img_bgr: np.ndarray, size=(224, 224)) -> np.ndarray:
+# Files written next to model.onnx by scripts/vision/quantize_vision_onnx.py.
+VARIANT_FILES = {
+    "fp32": "model.onnx",
+    "int8_static": "model.int8.onnx",
+    "int8_dynamic": "model.int8_dynamic.onnx",
+    "fp16": "model.fp16.onnx",
+}
+
+SESSION_DEFAULTS = {
+    "providers": ["CPUExecutionProvider"],
+    "intra_op_threads": 0,
+    "inter_op_threads": 0,
+    "execution_mode": "sequential",
+    "graph_optimization": "all",
+    "optimized_model_path": None,
+    "enable_cpu_mem_arena": True,
+    "enable_mem_pattern": True,
+    "allow_spinning": True,
+}
+
+
+def create_session(model_path: str, cfg: dict | None = None):
+    """``InferenceSession`` built from a ``vision_session``-style dict.
+
+    Thread counts of 0 keep onnxruntime's default (one per core). With
+    ``optimized_model_path`` set, the first load writes the optimized
+    graph there and later loads read it back with optimization disabled,
+    skipping the rewrite at startup. The file is rebuilt when the source
+    model is newer. Returns ``(session, source)`` where source is
+    ``"model"`` or ``"optimized"``.
+    """
+    if ort is None:
+        raise RuntimeError("onnxruntime is required for vision inference.")
+    cfg = {**SESSION_DEFAULTS, **(cfg or {})}
+    levels = {
+        "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = int(cfg["intra_op_threads"])
+    opts.inter_op_num_threads = int(cfg["inter_op_threads"])
+    opts.execution_mode = (
+        ort.ExecutionMode.ORT_PARALLEL if cfg["execution_mode"] == "parallel" else ort.ExecutionMode.ORT_SEQUENTIAL
+    )
+    opts.graph_optimization_level = levels[cfg["graph_optimization"]]
+    opts.enable_cpu_mem_arena = bool(cfg["enable_cpu_mem_arena"])
+    opts.enable_mem_pattern = bool(cfg["enable_mem_pattern"])
+    # Spinning idle intra-op threads burns cores other workers could use.
+    opts.add_session_config_entry("session.intra_op.allow_spinning", "1" if cfg["allow_spinning"] else "0")
+    source = "model"
+    cached = Path(cfg["optimized_model_path"]) if cfg["optimized_model_path"] else None
+    if cached is not None and cached.exists() and cached.stat().st_mtime >= Path(model_path).stat().st_mtime:
+        model_path, source = str(cached), "optimized"
+        opts.graph_optimization_level = levels["disable"]
+    elif cached is not None:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        opts.optimized_model_filepath = str(cached)
+    return ort.InferenceSession(model_path, opts, providers=list(cfg["providers"])), source
+
+
+# (x / 255 - mean) / std folded into one multiply-add per channel.
+_SCALE = (1.0 / (255.0 * IMAGENET_STD)).astype(np.float32)
+_BIAS = (-IMAGENET_MEAN / IMAGENET_STD).astype(np.float32)
+
+
+def preprocess_scratch(hw: Tuple[int, int]) -> tuple[np.ndarray, list[np.ndarray]]:
+    """uint8 work buffers for ``_preprocess_into``: the resized HWC image and its planes."""
+    h, w = hw
+    planes = np.empty((3, h, w), dtype=np.uint8)
+    return np.empty((h, w, 3), dtype=np.uint8), [planes[0], planes[1], planes[2]]
+
+
+def _preprocess_into(img_bgr: np.ndarray, out: np.ndarray, scratch=None) -> None:
+    """Write the normalized RGB CHW tensor for ``img_bgr`` into ``out`` (3, H, W).
+
+    Resizes on uint8, splits into contiguous planes and writes each plane
+    into ``out`` followed by one in-place scale-and-bias; BGR -> RGB is only
+    the plane order. With ``scratch`` from ``preprocess_scratch`` the call
+    allocates nothing.
+    """
     if cv2 is None:
         raise RuntimeError("opencv-python is required for image preprocessing.")
-    img = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-    img = (
-        cv2.resize(img, size, interpolation=cv2.INTER_LINEAR)
-        .astype(np.float32)
-        / 255.0
-    )
-    img = (img - IMAGENET_MEAN) / IMAGENET_STD
-    x = np.transpose(img, (2, 0, 1))[None, ...]
-    return x.astype(np.float32)
+    h, w = out.shape[1:]
+    resized, planes = scratch if scratch is not None else preprocess_scratch((h, w))
+    if img_bgr.shape[:2] != (h, w):
+        img_bgr = cv2.resize(img_bgr, (w, h), dst=resized, interpolation=cv2.INTER_LINEAR)
+    cv2.split(img_bgr, planes)
+    for c in range(3):
+        # Cast-copy then in-place ops: a mixed-dtype ufunc would allocate a cast buffer.
+        dst = out[c]
+        np.copyto(dst, planes[2 - c])
+        dst *= _SCALE[c]
+        dst += _BIAS[c]
 
 
 def _softmax(x: np.ndarray) -> np.ndarray:
@@ -41,14 +126,26 @@ def _softmax(x: np.ndarray) -> np.ndarray:
 
 
 class VisionONNXService:
-    def __init__(self, model_path: str, labels_path: str | None = None):
+    def __init__(self, model_path: str, labels_path: str | None = None, session_cfg: dict | None = None):
         if ort is None:
             raise RuntimeError("onnxruntime is required for vision inference.")
         if cv2 is None:
             raise RuntimeError("opencv-python is required for vision inference.")
-        providers = ["CPUExecutionProvider"]
-        self.sess = ort.InferenceSession(model_path, providers=providers)
-        self.input_name = self.sess.get_inputs()[0].name
+        self.model_path = model_path
+        start = time.perf_counter()
+        self.sess, self.session_source = create_session(model_path, session_cfg)
+        self.load_ms = round((time.perf_counter() - start) * 1000, 3)
+        self.warmup_ms: dict[int, float] = {}
+        model_input = self.sess.get_inputs()[0]
+        self.input_name = model_input.name
+        shape = model_input.shape
+        # Exports with a symbolic batch axis accept any N; a fixed axis
+        # (older exports) gets one image per run.
+        self.fixed_batch = shape[0] if isinstance(shape[0], int) else None
+        self.input_hw = (
+            (shape[2], shape[3]) if len(shape) == 4 and all(isinstance(d, int) for d in shape[2:]) else (224, 224)
+        )
+        self._local = threading.local()
         self.labels: list[str] | None = None
         if labels_path and Path(labels_path).exists():
             try:
@@ -67,15 +164,63 @@ class VisionONNXService:
             except Exception:
                 self.labels = None
 
-    def infer_bgr(self, img_bgr: np.ndarray) -> tuple[str, float]:
-        x = _preprocess_bgr(img_bgr)
-        logits = self.sess.run(None, {self.input_name: x})[0]
-        probs = _softmax(logits)
-        c = int(np.argmax(probs[0]))
-        p = float(probs[0, c])
-        label = (
+    def _label(self, c: int) -> str:
+        return (
             self.labels[c]
             if (self.labels and 0 <= c < len(self.labels))
             else f"class_{c}"
         )
-        return label, p
+
+    def _buffer(self, n: int) -> np.ndarray:
+        """Per-thread NCHW input buffer with room for ``n`` images, reused across runs."""
+        buf = getattr(self._local, "buf", None)
+        if buf is None or buf.shape[0] < n:
+            cap = max(n, 2 * buf.shape[0] if buf is not None else 1)
+            buf = np.empty((cap, 3) + tuple(self.input_hw), dtype=np.float32)
+            self._local.buf = buf
+        return buf[:n]
+
+    def _scratch(self):
+        scratch = getattr(self._local, "scratch", None)
+        if scratch is None:
+            scratch = self._local.scratch = preprocess_scratch(self.input_hw)
+        return scratch
+
+    def infer_batch_bgr(self, imgs: Sequence[np.ndarray]) -> list[tuple[str, float]]:
+        """Classify ``imgs`` with one ``run`` call; ``(label, prob)`` per image."""
+        if not imgs:
+            return []
+        if self.fixed_batch == 1 and len(imgs) > 1:
+            return [pred for img in imgs for pred in self.infer_batch_bgr([img])]
+        x = self._buffer(len(imgs))
+        scratch = self._scratch()
+        for i, img in enumerate(imgs):
+            _preprocess_into(img, x[i], scratch)
+        probs = _softmax(self.sess.run(None, {self.input_name: x})[0])
+        best = probs.argmax(axis=1)
+        return [(self._label(int(c)), float(probs[i, c])) for i, c in enumerate(best)]
+
+    def infer_bgr(self, img_bgr: np.ndarray) -> tuple[str, float]:
+        return self.infer_batch_bgr([img_bgr])[0]
+
+    def warmup(self, batch_sizes: Sequence[int] = (1,)) -> dict[int, float]:
+        """Run blank batches so first requests skip kernel selection and arena growth."""
+        h, w = self.input_hw
+        blank = np.zeros((h, w, 3), dtype=np.uint8)
+        for n in batch_sizes:
+            n = 1 if self.fixed_batch == 1 else int(n)
+            start = time.perf_counter()
+            self.infer_batch_bgr([blank] * n)
+            self.warmup_ms[n] = round((time.perf_counter() - start) * 1000, 3)
+        return self.warmup_ms
+
+    def stats(self) -> dict:
+        return {
+            "model_path": self.model_path,
+            "providers": self.sess.get_providers(),
+            "session_source": self.session_source,
+            "load_ms": self.load_ms,
+            "warmup_ms": self.warmup_ms,
+            "input_hw": list(self.input_hw),
+            "fixed_batch": self.fixed_batch,
+        }
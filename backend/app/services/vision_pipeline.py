@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import base64
+import os
+import tarfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+import numpy as np
+
+from .batching import MicroBatcher
+from .blur import blur_faces_bboxes, detect_faces_bgr
+from .executor import BoundedExecutor
+from .perf import StageTimers
+from .settings import config_section
+from .vision_infer import SESSION_DEFAULTS, VARIANT_FILES, VisionONNXService
+
+try:
+    import cv2
+except ImportError:  # pragma: no cover
+    cv2 = None
+
+MODEL_PATH = Path("models/vision/resnet18/model.onnx")
+LABELS_PATH = Path("models/vision/resnet18/labels.txt")
+# Same extensions scripts/data/make_image_shards.py packs into shards.
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".gif"}
+
+VISION_SESSION_CFG = config_section("vision_session", SESSION_DEFAULTS)
+VISION_MODEL_CFG = config_section("vision_model", {"variant": "fp32"})
+
+
+def model_path() -> Path:
+    """The configured variant's file; FP32 when that variant hasn't been built."""
+    variant = MODEL_PATH.with_name(VARIANT_FILES.get(VISION_MODEL_CFG["variant"], MODEL_PATH.name))
+    return variant if variant.exists() else MODEL_PATH
+
+
+# Lazy per-process singleton: pool processes each load their own session.
+_MODEL: VisionONNXService | None = None
+_WARMUP_ERROR: str | None = None
+
+
+def get_model() -> VisionONNXService:
+    global _MODEL
+    if _MODEL is None:
+        _MODEL = VisionONNXService(
+            str(model_path()), str(LABELS_PATH) if LABELS_PATH.exists() else None, VISION_SESSION_CFG
+        )
+    return _MODEL
+
+
+def model_stats() -> dict | None:
+    return _MODEL.stats() if _MODEL is not None else None
+
+
+def warmup_error() -> str | None:
+    return _WARMUP_ERROR
+
+
+def warmup_vision() -> bool:
+    """Load the classifier and run the batch sizes the batcher will use.
+
+    A failure is kept for ``warmup_error()`` rather than raised, so the app
+    still starts; requests retry the load.
+    """
+    global _WARMUP_ERROR
+    if not model_path().exists():
+        return False
+    sizes = {1, int(VISION_BATCHER_CFG["max_batch"])} if VISION_BATCHER_CFG["enabled"] else {1}
+    try:
+        get_model().warmup(sorted(sizes))
+    except Exception as exc:
+        _WARMUP_ERROR = repr(exc)
+        return False
+    _WARMUP_ERROR = None
+    return True
+
+
+def b64_png(img_bgr: np.ndarray) -> str:
+    if cv2 is None:
+        return ""
+    ok, buf = cv2.imencode(".png", img_bgr)
+    return base64.b64encode(buf).decode("ascii") if ok else ""
+
+
+# Binary response bodies: format -> (cv2 extension, quality flag, media type).
+IMAGE_ENCODINGS = {
+    "jpeg": (".jpg", "IMWRITE_JPEG_QUALITY", "image/jpeg"),
+    "webp": (".webp", "IMWRITE_WEBP_QUALITY", "image/webp"),
+}
+VISION_RESPONSE_CFG = config_section(
+    "vision_response",
+    {"jpeg_quality": 85, "webp_quality": 80, "max_upload_mb": 25},
+)
+
+
+def encode_image(img_bgr: np.ndarray, fmt: str) -> bytes:
+    """``img_bgr`` as ``fmt`` (a key of ``IMAGE_ENCODINGS``) at the configured quality."""
+    ext, flag, _ = IMAGE_ENCODINGS[fmt]
+    ok, buf = cv2.imencode(ext, img_bgr, [int(getattr(cv2, flag)), int(VISION_RESPONSE_CFG[f"{fmt}_quality"])])
+    if not ok:
+        raise RuntimeError(f"could not encode {fmt}")
+    return buf.tobytes()
+
+
+@contextmanager
+def _stage(timings: dict, name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round((time.perf_counter() - start) * 1000, 3)
+
+
+def run_prepare(raw: bytes, blur: bool, return_image: bool, image_format: str = "json") -> dict:
+    """decode → detect → blur (→ encode) for one upload, without classifying.
+
+    Runs on the vision executor, so it only takes plain arguments and
+    returns a plain dict: ``{"error": ...}`` for an undecodable image,
+    otherwise the partial response, the image to classify under
+    ``"img"`` and ``timings_ms`` per stage. ``return_image`` adds the
+    blurred image as base64 PNG, or as ``"image_bytes"`` when
+    ``image_format`` is one of ``IMAGE_ENCODINGS``.
+    """
+    timings: dict = {}
+    with _stage(timings, "decode"):
+        img = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return {"error": "bad image"}
+    with _stage(timings, "detect"):
+        boxes = detect_faces_bgr(img)
+    if blur:
+        with _stage(timings, "blur"):
+            # The decoded frame is ours, so blur it without a full-frame copy.
+            img = blur_faces_bboxes(img, boxes, inplace=True)
+    resp = {
+        "img": img,
+        "faces": [{"x1": x1, "y1": y1, "x2": x2, "y2": y2} for (x1, y1, x2, y2) in boxes],
+        "timings_ms": timings,
+    }
+    if return_image:
+        with _stage(timings, "encode"):
+            if image_format in IMAGE_ENCODINGS:
+                resp["image_bytes"] = encode_image(img, image_format)
+            else:
+                resp["image_png_b64"] = b64_png(img)
+    return resp
+
+
+def run_infer(raw: bytes, blur: bool, return_image: bool, image_format: str = "json") -> dict:
+    """``run_prepare`` plus classification of that one image (unbatched path)."""
+    resp = run_prepare(raw, blur, return_image, image_format)
+    if "error" in resp:
+        return resp
+    img = resp.pop("img")
+    with _stage(resp["timings_ms"], "infer"):
+        label, prob = get_model().infer_bgr(img)
+    resp.update(pred=label, score=float(prob))
+    return resp
+
+
+def iter_tar_images(fileobj: BinaryIO) -> Iterator[tuple[str, bytes]]:
+    """``(member name, bytes)`` for each image in a tar shard, in archive order.
+
+    Opens the archive in streaming mode (``r|*``), so only one member is
+    held in memory at a time and the upload never needs to be seekable.
+    """
+    with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+        for member in tf:
+            if member.isfile() and Path(member.name).suffix.lower() in IMAGE_EXTS:
+                yield member.name, tf.extractfile(member).read()
+
+
+def classify_batch(imgs: list) -> list:
+    return get_model().infer_batch_bgr(imgs)
+
+
+_EXECUTOR_CFG = config_section(
+    "vision_executor",
+    {"kind": "thread", "max_workers": min(4, os.cpu_count() or 1), "max_queue": 16},
+)
+vision_executor = BoundedExecutor(
+    _EXECUTOR_CFG["max_workers"],
+    _EXECUTOR_CFG["max_queue"],
+    kind=_EXECUTOR_CFG["kind"],
+    name="vision",
+)
+vision_stages = StageTimers()
+
+# Concurrent requests share one ONNX run: prepared images are stacked
+# into the model's NCHW buffer up to max_batch or max_wait_ms.
+VISION_BATCHER_CFG = config_section(
+    "vision_batcher",
+    {"enabled": True, "max_batch": 16, "max_wait_ms": 4.0, "bulk_window": 32},
+)
+vision_batcher = MicroBatcher(
+    classify_batch,
+    max_batch=VISION_BATCHER_CFG["max_batch"],
+    max_wait_ms=VISION_BATCHER_CFG["max_wait_ms"],
+)
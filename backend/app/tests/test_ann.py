@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import numpy as np
+
+from backend.app.services.ann import NumpyIVFIndex, load_ann_index, write_ann_index
+from backend.app.services.ranking import top_k_indices
+
+
+def _unit(rng, n, d):
+    x = rng.standard_normal((n, d)).astype("float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def test_numpy_ivf_full_probe_is_exact(tmp_path):
+    rng = np.random.default_rng(0)
+    emb = _unit(rng, 2000, 16)
+    queries = _unit(rng, 20, 16)
+    ivf = NumpyIVFIndex.train(emb, nlist=16, nprobe=2)
+    ivf.add(emb)
+    ivf.save(tmp_path / "ivf.npz")
+    loaded = NumpyIVFIndex.load(tmp_path / "ivf.npz")
+    assert loaded.nprobe == 2 and loaded.list_offsets[-1] == len(emb)
+
+    D, I = loaded.search(emb, queries, 5, nprobe=16)
+    assert np.array_equal(I, top_k_indices(queries @ emb.T, 5))
+
+    _, I_partial = loaded.search(emb, queries, 5)
+    assert I_partial.shape == (20, 5)
+
+
+def test_write_ann_index_reuses_trained_quantizer(tmp_path):
+    rng = np.random.default_rng(1)
+    emb = _unit(rng, 1000, 16)
+    old, new = tmp_path / "v1", tmp_path / "v2"
+    old.mkdir()
+    new.mkdir()
+    write_ann_index(emb, old, kind="ivf_flat", nlist=8)
+    before = load_ann_index(old)
+
+    grown = np.concatenate([emb, _unit(rng, 200, 16)])
+    built = write_ann_index(grown, new, kind="ivf_flat", nlist=8, trained_from=old)
+    after = load_ann_index(new)
+    assert built.endswith("(reused training)")
+    size = after.ntotal if hasattr(after, "ntotal") else int(after.list_offsets[-1])
+    assert size == len(grown)
+    if isinstance(after, NumpyIVFIndex):
+        assert np.array_equal(before.centroids, after.centroids)
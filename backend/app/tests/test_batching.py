@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from backend.app.services.batching import MicroBatcher
+
+
+def test_micro_batcher_coalesces_concurrent_submits():
+    calls = []
+
+    def double(items):
+        calls.append(list(items))
+        return [x * 2 for x in items]
+
+    async def run():
+        batcher = MicroBatcher(double, max_batch=4, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(run())
+    assert results == [i * 2 for i in range(10)]
+    assert all(len(batch) <= 4 for batch in calls)
+    assert len(calls) < 10
+    assert stats["items"] == 10
+
+
+def test_micro_batcher_propagates_errors():
+    def boom(items):
+        raise ValueError("bad batch")
+
+    async def run():
+        batcher = MicroBatcher(boom, max_batch=2, max_wait_ms=1)
+        await batcher.submit("x")
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
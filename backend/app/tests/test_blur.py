@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.app.services.blur import BLUR_METHODS, blur_faces_bboxes, cv2, merge_boxes
+
+
+def _frame():
+    return np.random.default_rng(0).integers(0, 256, size=(120, 160, 3), dtype=np.uint8)
+
+
+def test_merge_boxes_unions_heavy_overlaps_only():
+    dupes = [(0, 0, 20, 20), (50, 50, 60, 60), (10, 0, 30, 20), (0, 0, 10, 20), (0, 0, 20, 20)]
+    assert merge_boxes(dupes) == [(0, 0, 30, 20), (50, 50, 60, 60)]
+    # Offset near-duplicates: the bounding box would blur one extra pixel.
+    offset = [(0, 0, 20, 20), (2, 1, 21, 20)]
+    assert merge_boxes(offset) == offset
+    diagonal = [(0, 0, 10, 10), (8, 8, 20, 20)]
+    assert merge_boxes(diagonal) == diagonal
+    assert merge_boxes([]) == []
+
+
+def test_no_boxes_returns_input_untouched():
+    img = _frame()
+    assert blur_faces_bboxes(img, []) is img
+
+
+@pytest.mark.parametrize("method", BLUR_METHODS)
+def test_only_boxes_change(method):
+    img = _frame()
+    before = img.copy()
+    out = blur_faces_bboxes(img, [(10, 20, 60, 80), (-5, 100, 30, 200)], method=method)
+    np.testing.assert_array_equal(img, before)  # copy by default
+    mask = np.zeros(img.shape[:2], dtype=bool)
+    mask[20:80, 10:60] = True
+    mask[100:, :30] = True
+    np.testing.assert_array_equal(out[~mask], before[~mask])
+    assert (out[20:80, 10:60] != before[20:80, 10:60]).any()
+
+
+def test_inplace_and_legacy_gaussian():
+    img = _frame()
+    expected = img.copy()
+    expected[20:80, 10:60] = cv2.GaussianBlur(expected[20:80, 10:60], (31, 31), 25)
+    out = blur_faces_bboxes(img, [(10, 20, 60, 80)], method="gaussian", inplace=True)
+    assert out is img
+    np.testing.assert_array_equal(out, expected)
+
+
+def test_large_scaled_gaussian_stays_in_roi(monkeypatch):
+    from backend.app.services import blur
+
+    monkeypatch.setitem(blur.BLUR_CFG, "kernel_frac", 0.9)
+    img = _frame()
+    before = img.copy()
+    out = blur_faces_bboxes(img, [(10, 10, 150, 110)], method="gaussian")
+    assert out[10:110, 10:150].std() < before[10:110, 10:150].std() / 4
+    np.testing.assert_array_equal(out[:10], before[:10])
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        blur_faces_bboxes(_frame(), [(0, 0, 5, 5)], method="swirl")
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import numpy as np
+
+from backend.app.services.bm25 import BM25Index
+from backend.app.services.ranking import reciprocal_rank_fusion
+
+
+def _corpus(n_docs=400, vocab=300, seed=0):
+    # Zipf-like term frequencies so common terms have long posting lists.
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, vocab + 1)
+    weights /= weights.sum()
+    ids = rng.choice(vocab, size=(n_docs, 40), p=weights)
+    return [" ".join(f"w{i}" for i in row[: rng.integers(5, 40)]) for row in ids]
+
+
+def test_pruned_search_matches_exhaustive():
+    index = BM25Index.build(_corpus())
+    rng = np.random.default_rng(1)
+    pruned_total = exhaustive_total = 0
+    for _ in range(50):
+        query = " ".join(f"w{i}" for i in rng.integers(0, 60, size=rng.integers(1, 6)))
+        s1, d1, n1 = index.search(query, 10)
+        s2, d2, n2 = index.search(query, 10, prune=False)
+        # Ties may come back in a different order; the scores must not.
+        np.testing.assert_allclose(s1, s2, rtol=1e-5)
+        assert n1 <= n2
+        pruned_total, exhaustive_total = pruned_total + n1, exhaustive_total + n2
+    assert pruned_total < exhaustive_total
+
+
+def test_stop_words_and_roundtrip(tmp_path):
+    texts = ["the solar panel", "the wind turbine", "solar and wind storage"]
+    index = BM25Index.build(texts, stop_words={"the", "and"})
+    assert index.query_terms("the and").size == 0
+    index.save(tmp_path)
+    loaded = BM25Index.load(tmp_path)
+    scores, ids, _ = loaded.search("solar wind", 3)
+    assert ids[0] == 2
+    np.testing.assert_allclose(scores, index.search("solar wind", 3)[0])
+    assert BM25Index.load(tmp_path / "missing") is None
+
+
+def test_reciprocal_rank_fusion():
+    ids, scores = reciprocal_rank_fusion([[3, 1, 2], [3, 2, -1]], top_k=2)
+    assert ids == [3, 2]
+    assert scores[0] == 1.0
+    assert 0 < scores[1] < 1
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from backend.app.services.docstore import DocStore, DocStoreWriter, offsets_path, write_docstore
+
+
+def test_docstore_roundtrip(tmp_path):
+    docs = [{"title": f"t{i}", "text": "héllo " * i} for i in range(5)]
+    path = tmp_path / "docs.jsonl"
+    assert write_docstore(path, docs) == 5
+    store = DocStore(path)
+    assert len(store) == 5
+    assert store[3] == docs[3]
+    assert store[-1] == docs[-1]
+    assert list(store) == docs
+
+
+def test_docstore_rebuilds_offsets_without_sidecar(tmp_path):
+    path = tmp_path / "docs.jsonl"
+    path.write_text('{"title": "a"}\n\n{"title": "b"}\n{"title": "c"}', encoding="utf-8")
+    assert not offsets_path(path).exists()
+    store = DocStore(path)
+    assert [doc["title"] for doc in store] == ["a", "b", "c"]
+
+
+def test_docstore_writer_streams_records(tmp_path):
+    path = tmp_path / "docs.jsonl"
+    with DocStoreWriter(path) as writer:
+        for i in range(3):
+            writer.add({"title": f"t{i}", "chunk": i})
+        assert len(writer) == 3
+    assert offsets_path(path).exists()
+    assert [doc["chunk"] for doc in DocStore(path)] == [0, 1, 2]
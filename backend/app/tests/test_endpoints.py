@@ -1,6 +1,8 @@
 import sys
 from pathlib import Path
 
+import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 
 ROOT = Path(__file__).resolve().parents[2]
@@ -45,3 +47,90 @@ def test_explain_tabular_not_ready():
     response = client.get("/explain/tabular")
     assert response.status_code == 404
     assert "Tabular model not available" in response.json()["detail"]
+
+
+def test_chat_ask_stream_events():
+    response = client.post("/chat/ask_stream", json={"query": "fox", "top_k": 2})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [line.split(": ", 1)[1] for line in response.text.splitlines() if line.startswith("event: ")]
+    assert events[0] == "meta" and events[-1] == "done"
+    assert all(event == "hit" for event in events[1:-1])
+    bad = client.post("/chat/ask_stream", json={"query": "fox", "retriever": "nope"})
+    assert bad.status_code == 400
+
+
+def test_chat_ask_stream_retrieval_error_keeps_status(monkeypatch):
+    from backend.app.routers import chat
+
+    def missing(*args, **kwargs):
+        raise HTTPException(status_code=404, detail="BM25 index missing")
+
+    monkeypatch.setattr(chat, "ann_search", missing)
+    response = client.post("/chat/ask_stream", json={"query": "fox", "retriever": "bm25"})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "BM25 index missing"
+
+
+def test_vision_stream_video_and_websocket(tmp_path, monkeypatch):
+    import cv2
+    import numpy as np
+
+    from backend.app.services import video_stream
+
+    monkeypatch.setattr(video_stream, "detect_faces_bgr", lambda frame: [(8, 8, 40, 40)])
+    path = tmp_path / "clip.mp4"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 10, (64, 48))
+    for i in range(12):
+        writer.write(np.full((48, 64, 3), i * 10, dtype=np.uint8))
+    writer.release()
+
+    with path.open("rb") as f:
+        response = client.post("/vision/stream", files={"video": ("clip.mp4", f, "video/mp4")}, data={"detect_every": "4"})
+    assert response.status_code == 200
+    assert response.headers["x-frames"] == "12"
+    assert response.headers["x-keyframes"] == "4"  # 0, 4, 8 and the last frame
+    assert float(response.headers["x-frames-per-second"]) > 0
+    assert client.post("/vision/stream", files={"video": ("x.mp4", b"nope", "video/mp4")}).status_code == 400
+    with path.open("rb") as f:
+        too_sparse = client.post("/vision/stream", files={"video": ("clip.mp4", f, "video/mp4")}, data={"detect_every": "100000"})
+    assert too_sparse.status_code == 400
+    monkeypatch.setitem(video_stream.VIDEO_CFG, "max_upload_mb", 0.001)
+    with path.open("rb") as f:
+        assert client.post("/vision/stream", files={"video": ("clip.mp4", f, "video/mp4")}).status_code == 413
+
+    frame = cv2.imencode(".png", np.zeros((48, 64, 3), dtype=np.uint8))[1].tobytes()
+    with client.websocket_connect("/vision/stream/ws?detect_every=2") as ws:
+        for _ in range(3):
+            ws.send_bytes(frame)
+        assert all(ws.receive_bytes()[:2] == b"\xff\xd8" for _ in range(3))
+        ws.send_text("end")
+        assert ws.receive_json()["frames"] == 3
+
+
+def test_warmup_failures_show_in_telemetry(monkeypatch, tmp_path):
+    from backend.app.services import vision_pipeline
+    from backend.app.services.encoder import sbert_encoder
+
+    broken = tmp_path / "model.onnx"
+    broken.write_bytes(b"not a model")
+    monkeypatch.setattr(sbert_encoder, "_path", broken)
+    monkeypatch.setattr(sbert_encoder, "warmup_error", None)
+    monkeypatch.setattr(vision_pipeline, "MODEL_PATH", broken)
+    monkeypatch.setattr(vision_pipeline, "_WARMUP_ERROR", None)
+
+    def fail():
+        raise RuntimeError("bad onnx")
+
+    monkeypatch.setattr(vision_pipeline, "get_model", fail)
+    assert sbert_encoder.warmup() is False
+    assert vision_pipeline.warmup_vision() is False
+    assert client.get("/telemetry/encoder").json()["warmup_error"]
+    assert "bad onnx" in client.get("/telemetry/vision").json()["warmup_error"]
+
+
+@pytest.mark.parametrize("content_length", ["abc", "-5"])
+def test_infer_raw_rejects_bad_content_length(content_length):
+    response = client.post("/vision/infer_raw", content=b"\x89PNG", headers={"content-length": content_length})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid Content-Length."
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from backend.app.services.executor import BoundedExecutor, ExecutorOverloaded
+
+
+def test_rejects_beyond_capacity_and_recovers():
+    executor = BoundedExecutor(max_workers=1, max_queue=1, name="test")
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(executor.run(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(ExecutorOverloaded):
+            await executor.run(sum, [1, 2])
+        release.set()
+        assert await asyncio.gather(*running) == [True, True]
+        return await executor.run(sum, [1, 2])
+
+    try:
+        assert asyncio.run(scenario()) == 3
+    finally:
+        executor.shutdown()
+    stats = executor.stats()
+    assert stats["rejected"] == 1 and stats["completed"] == 3 and stats["inflight"] == 0
+
+
+def test_cancelled_request_keeps_slot_until_work_finishes():
+    executor = BoundedExecutor(max_workers=1, max_queue=0, name="test")
+    release = threading.Event()
+
+    async def scenario():
+        task = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.sleep(0.01)
+        # The worker thread is still busy, so the slot is still taken.
+        with pytest.raises(ExecutorOverloaded):
+            await executor.run(sum, [1])
+        release.set()
+        await asyncio.sleep(0.05)
+        return await executor.run(sum, [1])
+
+    try:
+        assert asyncio.run(scenario()) == 1
+    finally:
+        executor.shutdown()
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        BoundedExecutor(kind="fiber")
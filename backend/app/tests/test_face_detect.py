@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+import pytest
+
+from backend.app.services.face_detect import FaceDetector, _unscale
+
+
+class _CornerDetector(FaceDetector):
+    """Reports a box over the top-left quarter of whatever it is given."""
+
+    name = "corner"
+
+    def _create(self):
+        return object()
+
+    def detect(self, img_bgr):
+        self._thread_model()
+        img, scale = self._scale(img_bgr)
+        self.seen = img.shape
+        h, w = img.shape[:2]
+        return _unscale([(0, 0, w // 2, h // 2)], scale, img_bgr.shape)
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        FaceDetector()
+
+
+def test_downscale_maps_boxes_back():
+    img = np.zeros((800, 1600, 3), dtype=np.uint8)
+    detector = _CornerDetector(max_side=400)
+    assert detector.detect(img) == [(0, 0, 800, 400)]
+    assert detector.seen[:2] == (200, 400)
+    full = _CornerDetector()
+    assert full.detect(img) == [(0, 0, 800, 400)] and full.seen[:2] == (800, 1600)
+
+
+def test_unscale_clips_to_image():
+    assert _unscale([(90, 40, 30, 30)], 0.5, (100, 200, 3)) == [(180, 80, 200, 100)]
+    assert _unscale([(0, 0, 0, 5)], 1.0, (10, 10, 3)) == []
+
+
+def test_one_model_per_thread():
+    detector = _CornerDetector()
+    img = np.zeros((10, 10, 3), dtype=np.uint8)
+    threads = [threading.Thread(target=lambda: [detector.detect(img) for _ in range(3)]) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert detector.stats()["instances"] == 4
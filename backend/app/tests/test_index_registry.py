@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import time
+
+from backend.app.services.index_registry import (
+    IndexRegistry,
+    active_version,
+    new_version_dir,
+    prune_versions,
+    publish_version,
+)
+
+
+def _version(base, payload):
+    path = new_version_dir(base)
+    (path / "embeddings.npy").write_text(payload, encoding="utf-8")
+    return path
+
+
+def _loader(path):
+    emb = path / "embeddings.npy"
+    return {"payload": emb.read_text(encoding="utf-8")} if emb.exists() else None
+
+
+def test_registry_swaps_versions_without_disturbing_holders(tmp_path):
+    registry = IndexRegistry("test", tmp_path, _loader)
+    assert registry.current() is None
+
+    publish_version(tmp_path, _version(tmp_path, "one"))
+    held = registry.current()
+    assert held.data["payload"] == "one"
+
+    v2 = _version(tmp_path, "two")
+    publish_version(tmp_path, v2)
+    status = registry.reload(wait=True)
+    assert status["loaded"]["version"] == v2.name
+    assert registry.current().data["payload"] == "two"
+    # A request that grabbed the old snapshot keeps a consistent view.
+    assert held.data["payload"] == "one"
+
+
+def test_registry_keeps_serving_when_load_fails(tmp_path):
+    publish_version(tmp_path, _version(tmp_path, "ok"))
+
+    def flaky(path):
+        if (path / "embeddings.npy").read_text(encoding="utf-8") == "bad":
+            raise ValueError("corrupt")
+        return _loader(path)
+
+    registry = IndexRegistry("test", tmp_path, flaky)
+    assert registry.current().data["payload"] == "ok"
+    publish_version(tmp_path, _version(tmp_path, "bad"))
+    status = registry.reload(wait=True)
+    assert "corrupt" in status["last_error"]
+    assert registry.current().data["payload"] == "ok"
+
+
+def test_watcher_picks_up_new_active_version(tmp_path):
+    publish_version(tmp_path, _version(tmp_path, "one"))
+    registry = IndexRegistry("test", tmp_path, _loader)
+    registry.current()
+    registry.start_watcher(0.01)
+    try:
+        publish_version(tmp_path, _version(tmp_path, "two"))
+        deadline = time.monotonic() + 2
+        while registry.current().data["payload"] != "two" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert registry.current().data["payload"] == "two"
+    finally:
+        registry.stop_watcher()
+
+
+def test_prune_versions_keeps_newest_and_active(tmp_path):
+    paths = [_version(tmp_path, str(i)) for i in range(4)]
+    publish_version(tmp_path, paths[0])
+    removed = prune_versions(tmp_path, keep=2)
+    assert sorted(removed) == [paths[1].name]
+    assert active_version(tmp_path) == paths[0].name
+    assert paths[0].exists() and paths[2].exists() and paths[3].exists()
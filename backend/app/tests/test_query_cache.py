@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import time
+
+from backend.app.services.query_cache import QueryCache
+
+
+def _counting_search(calls):
+    def search(queries):
+        calls.append(list(queries))
+        return [[{"title": q}] for q in queries]
+
+    return search
+
+
+def test_cached_batch_runs_only_misses_and_normalizes_queries():
+    cache = QueryCache(max_entries=16)
+    calls = []
+    search = _counting_search(calls)
+    first = cache.cached_batch("svd", "v1", ["Brown fox", "cat", "brown   FOX"], 5, None, search)
+    assert calls == [["Brown fox", "cat"]]
+    assert first[2] == first[0]
+
+    cache.cached_batch("svd", "v1", ["brown fox", "dog"], 5, None, search)
+    assert calls[-1] == ["dog"]
+    # A different index version or top_k is a different key.
+    cache.cached_batch("svd", "v2", ["brown fox"], 5, None, search)
+    cache.cached_batch("svd", "v2", ["brown fox"], 3, None, search)
+    assert len(calls) == 4
+    assert cache.stats()["hits"] == 1
+
+
+def test_lru_ttl_and_invalidation():
+    cache = QueryCache(max_entries=2, ttl_s=0.05)
+    for q in ("a", "b", "c"):
+        cache.set(cache.key("svd", 1, q, 5), "svd", [q])
+    assert cache.get(cache.key("svd", 1, "a", 5)) is None
+    assert cache.stats()["evictions"] == 1
+
+    cache.set(cache.key("sbert", 1, "x", 5), "sbert", ["x"])
+    assert cache.invalidate("svd") == 1
+    assert cache.get(cache.key("sbert", 1, "x", 5)) == ["x"]
+
+    time.sleep(0.06)
+    assert cache.get(cache.key("sbert", 1, "x", 5)) is None
+
+
+def test_sqlite_tier_is_shared_between_instances(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    writer = QueryCache(sqlite_path=path)
+    reader = QueryCache(sqlite_path=path)
+    key = writer.key("svd", "v1", "shared query", 5)
+    writer.set(key, "svd", [{"title": "doc"}])
+    assert reader.get(key) == [{"title": "doc"}]
+    assert reader.stats()["shared_hits"] == 1
+
+    writer.invalidate("svd")
+    assert QueryCache(sqlite_path=path).get(key) is None
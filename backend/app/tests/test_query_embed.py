@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from backend.app.services.query_embed import QueryEmbedder, write_query_projection
+
+CORPUS = [
+    "Solar panels convert sunlight into electricity for homes.",
+    "Wind turbines generate power from moving air.",
+    "Hydroelectric dams store water and release it through turbines.",
+    "Batteries store electricity generated by solar panels and wind.",
+    "The grid balances power demand with supply from every source.",
+    "Heat pumps move heat instead of burning fuel.",
+]
+
+
+def _fit(**kwargs):
+    vec = TfidfVectorizer(stop_words="english", **kwargs)
+    svd = TruncatedSVD(n_components=4, random_state=0).fit(vec.fit_transform(CORPUS))
+    return vec, svd
+
+
+def test_projection_matches_sklearn_pipeline(tmp_path):
+    queries = ["solar electricity", "Wind TURBINES turbines power", "unknown words only", "the grid"]
+    for kwargs in ({}, {"sublinear_tf": True}):
+        vec, svd = _fit(**kwargs)
+        assert write_query_projection(vec, svd, tmp_path)
+        embedder = QueryEmbedder.load(tmp_path)
+        expected = normalize(svd.transform(vec.transform(queries)))
+        np.testing.assert_allclose(embedder.embed(queries), expected, atol=1e-5)
+    assert not embedder.embed(["unknown words only"]).any()
+
+
+def test_unsupported_vectorizer_is_not_exported(tmp_path):
+    vec, svd = _fit(ngram_range=(1, 2))
+    assert not write_query_projection(vec, svd, tmp_path)
+    assert QueryEmbedder.load(tmp_path) is None
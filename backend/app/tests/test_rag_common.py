@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "scripts" / "rag"))
+
+from rag_common import carry_over, finish_version, index_kwargs  # noqa: E402
+
+from backend.app.services.bm25 import BM25_DIR, BM25Index
+from backend.app.services.index_registry import active_dir, new_version_dir, publish_version
+
+
+def _args(**overrides):
+    args = dict(index="flat", nlist=None, pq_m=16, hnsw_m=32, train_size=1000, nprobe=8, ef_search=64, keep=3)
+    return SimpleNamespace(**{**args, **overrides})
+
+
+def test_settings_only_rebuild_keeps_bm25(tmp_path):
+    emb = np.random.default_rng(0).normal(size=(8, 4)).astype(np.float32)
+    prev_dir = new_version_dir(tmp_path)
+    BM25Index.build(["alpha beta", "beta gamma"]).save(prev_dir)
+    publish_version(tmp_path, prev_dir)
+    prev = {"index": index_kwargs(_args())}
+
+    # Same corpus and BM25 settings, so BM25 is carried over rather than rebuilt;
+    # the changed nprobe still publishes a new version.
+    out = new_version_dir(tmp_path)
+    carry_over(prev_dir, out, BM25_DIR)
+    version, _ = finish_version(tmp_path, out, prev_dir, prev, emb, {"unchanged": True}, _args(nprobe=4))
+    assert version == out.name
+    assert active_dir(tmp_path) == out
+    assert BM25Index.load(out) is not None
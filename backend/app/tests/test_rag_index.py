@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import numpy as np
+
+from backend.app.services.rag_index import RAGIndex
+from backend.app.services.ranking import top_k_indices
+
+
+def test_top_k_indices_matches_argsort():
+    rng = np.random.default_rng(0)
+    scores = rng.random((3, 50))
+    idx = top_k_indices(scores, 7)
+    expected = np.argsort(-scores, axis=1)[:, :7]
+    assert np.array_equal(idx, expected)
+    assert top_k_indices(scores[0], 100).shape == (50,)
+    assert top_k_indices(scores[0], 0).shape == (0,)
+
+
+def test_sparse_search_returns_cosine_scores():
+    index = RAGIndex()
+    index.ingest(
+        [
+            {"text": "the quick brown fox"},
+            {"text": "lazy dog sleeping"},
+            {"text": "a red fox in the snow"},
+        ]
+    )
+    hits = index.search("brown fox", top_k=2)
+    assert [hit["doc"]["text"] for hit in hits][0] == "the quick brown fox"
+    assert len(hits) == 2
+    assert 0.0 < hits[0]["score"] <= 1.0 + 1e-6
+    assert hits[0]["score"] >= hits[1]["score"]
+
+
+def test_append_delete_and_merge():
+    index = RAGIndex(max_segments=100)
+    index.ingest(
+        [
+            {"id": "a", "text": "solar panels convert sunlight"},
+            {"id": "b", "text": "wind turbines convert wind"},
+        ]
+    )
+    index.ingest([{"id": "c", "text": "sunlight and wind power"}], mode="append")
+    index.ingest([{"id": "d", "text": "hydro dams store water"}], mode="append")
+    assert len(index.segments) == 3
+    assert len(index.docs) == 4
+
+    assert index.delete(["a", "missing"]) == 1
+    titles = [hit["doc"]["id"] for hit in index.search("sunlight", top_k=10)]
+    assert "a" not in titles and "c" in titles
+
+    index.merge()
+    assert len(index.segments) == 1
+    assert [doc["id"] for doc in index.docs] == ["b", "c", "d"]
+    assert [hit["doc"]["id"] for hit in index.search("convert", top_k=2)] == ["b", "c"]
+
+
+def test_append_retransforms_after_concurrent_replace():
+    index = RAGIndex()
+    index.ingest([{"id": "a", "text": "solar panels convert sunlight"}])
+    old = index.vectorizer
+    transform = old.transform
+
+    def replace_then_transform(texts):
+        # A replace refits the vocabulary between this transform and the append.
+        old.transform = transform
+        index.ingest([{"id": "b", "text": "wind turbines spin quickly over hills"}])
+        return transform(texts)
+
+    old.transform = replace_then_transform
+    index.ingest([{"id": "c", "text": "wind and sunlight"}], mode="append")
+    assert [doc["id"] for doc in index.docs] == ["b", "c"]
+    assert all(seg.matrix.shape[1] == len(index.vectorizer.vocabulary_) for seg in index.segments)
+    assert {hit["doc"]["id"] for hit in index.search("wind", top_k=2)} == {"b", "c"}
+
+
+def test_matrix_skips_deleted_rows():
+    index = RAGIndex()
+    index.ingest([{"id": "a", "text": "alpha beta"}, {"id": "b", "text": "beta gamma"}])
+    index.ingest([{"id": "c", "text": "gamma alpha"}], mode="append")
+    index.delete(["b"])
+    assert index.matrix.shape[0] == len(index.docs) == 2
+
+
+def test_append_without_vocabulary_fits_one():
+    index = RAGIndex()
+    stored = index.ingest([{"text": "first batch"}], mode="append")
+    assert len(stored) == 1
+    assert index.vectorizer is not None
+
+
+def test_search_batch_matches_single_queries():
+    index = RAGIndex()
+    index.ingest([{"id": str(i), "text": f"topic{i % 7} shared word{i}"} for i in range(150)])
+    queries = [f"topic{i} word{i * 3}" for i in range(70)]
+    batched = index.search_batch(queries, top_k=3)
+    assert len(batched) == len(queries)
+    for query, hits in zip(queries, batched):
+        single = index.search(query, top_k=3)
+        assert [h["doc"]["id"] for h in hits] == [h["doc"]["id"] for h in single]
+
+
+def test_cache_id_is_unique_per_instance_and_state():
+    a, b = RAGIndex(), RAGIndex()
+    assert a.version == b.version and a.cache_id != b.cache_id
+    before = a.cache_id
+    a.ingest([{"id": "1", "text": "quick brown fox"}])
+    assert a.cache_id != before
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import time
+
+import numpy as np
+
+from backend.app.services.rerank import ProximityScorer, Reranker, trim_snippet
+
+
+def _hits(texts):
+    return [{"rank": i, "score": 1.0 - i / 10, "title": f"d{i}", "text": t} for i, t in enumerate(texts, start=1)]
+
+
+def test_proximity_prefers_adjacent_terms():
+    texts = [
+        "solar output fell while the long report covered storage and other panel topics",
+        "solar panel output",
+        "nothing relevant here",
+    ]
+    scores = ProximityScorer().score("solar panel", texts)
+    assert scores[1] > scores[0] > scores[2] == 0
+
+
+def test_rerank_reorders_and_keeps_first_stage_rank():
+    hits = _hits(["wind turbines", "the grid", "solar panel output"])
+    ranked, info = Reranker(ProximityScorer()).rerank("solar panel", hits, top_k=2)
+    assert info["applied"]
+    assert [h["title"] for h in ranked] == ["d3", "d1"]
+    assert ranked[0]["first_stage_rank"] == 3 and ranked[0]["rank"] == 1
+
+
+class _SlowScorer:
+    name = "slow"
+
+    def score(self, query, texts):
+        time.sleep(0.02)
+        return np.arange(len(texts), dtype=np.float32)
+
+
+def test_budget_exceeded_falls_back_to_first_stage_order():
+    reranker = Reranker(_SlowScorer(), budget_ms=5, batch_size=1)
+    hits = _hits(["a", "b", "c", "d"])
+    ranked, info = reranker.rerank("q", hits, top_k=3)
+    assert not info["applied"]
+    assert ranked == hits[:3]
+    assert reranker.stats()["budget_exceeded"] == 1
+
+
+def test_trim_snippet_centres_on_query_terms():
+    text = "filler " * 100 + "solar panel efficiency" + " filler" * 100
+    snippet = trim_snippet(text, "solar panel", 80)
+    assert "solar panel" in snippet
+    assert len(snippet) <= 82
+    assert trim_snippet("short", "x", 80) == "short"
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+import pytest
+
+from backend.app.services.video_stream import VIDEO_CFG, FramePipeline, detect_interval, interpolate_boxes, pad_boxes
+
+
+def _frames(n, h=48, w=64):
+    # Frame i is filled with i so the output order is checkable.
+    return [np.full((h, w, 3), i, dtype=np.uint8) for i in range(n)]
+
+
+class _MovingFace:
+    """Detector that reports a box 10px to the right of the last keyframe."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, frame):
+        i = int(frame[0, 0, 0])
+        self.calls.append(i)
+        return [(i, 10, i + 10, 20)]
+
+
+def test_interpolate_pairs_and_keeps_unmatched():
+    prev = [(0, 0, 10, 10), (100, 100, 110, 110)]
+    nxt = [(4, 0, 14, 10), (50, 50, 60, 60)]
+    out = interpolate_boxes(prev, nxt, 0.5)
+    assert (2, 0, 12, 10) in out
+    assert (100, 100, 110, 110) in out and (50, 50, 60, 60) in out
+    assert len(out) == 3
+
+
+def test_pad_boxes_clips_to_frame():
+    assert pad_boxes([(0, 10, 20, 30)], 0.5, (35, 100)) == [(0, 0, 30, 35)]
+
+
+def test_detect_interval_is_bounded():
+    assert detect_interval() == VIDEO_CFG["detect_every"]
+    assert detect_interval(VIDEO_CFG["max_detect_every"]) == VIDEO_CFG["max_detect_every"]
+    for bad in (0, VIDEO_CFG["max_detect_every"] + 1):
+        with pytest.raises(ValueError):
+            detect_interval(bad)
+
+
+def test_lookahead_detects_keyframes_and_interpolates_in_order():
+    detect = _MovingFace()
+    seen, boxes = [], []
+    pipeline = FramePipeline(detect_every=4, detect=detect, queue_size=2)
+    pipeline._blur = lambda items: (boxes.append(b) or f for f, b in items)
+    stats = pipeline.run(_frames(10), lambda f: seen.append(int(f[0, 0, 0])))
+    assert seen == list(range(10))
+    # Keyframes 0, 4, 8 plus the last frame so the tail interpolates.
+    assert detect.calls == [0, 4, 8, 9]
+    assert stats["frames"] == 10 and stats["keyframes"] == 4
+    assert boxes[2] == [(2, 10, 12, 20)]
+    assert stats["fps"] > 0
+
+
+def test_without_lookahead_boxes_are_held():
+    detect = _MovingFace()
+    boxes = []
+    pipeline = FramePipeline(detect_every=3, lookahead=False, detect=detect)
+    pipeline._blur = lambda items: (boxes.append(b) or f for f, b in items)
+    pipeline.run(_frames(5), lambda f: None)
+    assert detect.calls == [0, 3]
+    assert boxes == [[(0, 10, 10, 20)]] * 3 + [[(3, 10, 13, 20)]] * 2
+
+
+def test_blur_changes_only_face_region():
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, size=(60, 80, 3), dtype=np.uint8) for _ in range(3)]
+    originals = [f.copy() for f in frames]
+    out = []
+    FramePipeline(detect_every=2, pad_frac=0.0, detect=lambda f: [(10, 10, 40, 40)]).run(frames, out.append)
+    for got, orig in zip(out, originals):
+        assert (got[10:40, 10:40] != orig[10:40, 10:40]).any()
+        np.testing.assert_array_equal(got[45:], orig[45:])
+
+
+def test_stage_error_stops_every_thread():
+    def frames():
+        yield from _frames(3)
+        raise ValueError("bad frame")
+
+    before = threading.active_count()
+    with pytest.raises(ValueError, match="bad frame"):
+        FramePipeline(detect=lambda f: []).run(frames(), lambda f: None)
+    assert threading.active_count() == before
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import io
+import tarfile
+import types
+
+import numpy as np
+
+from backend.app.services import vision_infer, vision_pipeline
+from backend.app.services.vision_pipeline import iter_tar_images
+
+
+class _FakeSession:
+    """Logits = per-channel means, so each image's prediction is checkable."""
+
+    def __init__(self, batch_dim):
+        self.batch_dim = batch_dim
+        self.batch_sizes = []
+
+    def get_inputs(self):
+        return [types.SimpleNamespace(name="input", shape=[self.batch_dim, 3, 32, 32])]
+
+    def run(self, _outputs, feeds):
+        x = feeds["input"]
+        assert x.flags["C_CONTIGUOUS"] and x.dtype == np.float32
+        self.batch_sizes.append(len(x))
+        return [x.mean(axis=(2, 3))]
+
+
+def _service(monkeypatch, batch_dim):
+    session = _FakeSession(batch_dim)
+    monkeypatch.setattr(vision_infer.ort, "InferenceSession", lambda *a, **k: session)
+    return vision_infer.VisionONNXService("model.onnx"), session
+
+
+def _images():
+    rng = np.random.default_rng(0)
+    imgs = [rng.integers(0, 256, size=(48, 64, 3), dtype=np.uint8) for _ in range(5)]
+    imgs[2][..., 0] = 255  # strong blue (BGR) → RGB channel 2
+    return imgs
+
+
+def test_batch_matches_single_and_runs_once(monkeypatch):
+    service, session = _service(monkeypatch, "batch")
+    imgs = _images()
+    singles = [service.infer_bgr(img) for img in imgs]
+    batched = service.infer_batch_bgr(imgs)
+    assert session.batch_sizes == [1] * 5 + [5]
+    assert [label for label, _ in batched] == [label for label, _ in singles]
+    np.testing.assert_allclose([p for _, p in batched], [p for _, p in singles], rtol=1e-5)
+    assert batched[2][0] == "class_2"
+    assert service.input_hw == (32, 32)
+
+
+def test_buffer_is_reused(monkeypatch):
+    service, _ = _service(monkeypatch, "batch")
+    first = service._buffer(4)
+    assert service._buffer(3).base is first.base
+    assert service._buffer(8).shape == (8, 3, 32, 32)
+
+
+def test_fused_preprocess_matches_reference():
+    cv2 = vision_infer.cv2
+    out = np.empty((3, 32, 32), dtype=np.float32)
+    scratch = vision_infer.preprocess_scratch((32, 32))
+    for img in _images() + [_images()[0][:32, :32]]:
+        rgb = cv2.resize(cv2.cvtColor(img, cv2.COLOR_BGR2RGB), (32, 32), interpolation=cv2.INTER_LINEAR)
+        ref = ((rgb.astype(np.float32) / 255.0 - vision_infer.IMAGENET_MEAN) / vision_infer.IMAGENET_STD).transpose(2, 0, 1)
+        vision_infer._preprocess_into(img, out, scratch)
+        np.testing.assert_allclose(out, ref, atol=1e-5)
+        np.testing.assert_array_equal(scratch[1][0], rgb[..., 2])  # planes stay in BGR order
+
+
+def test_fixed_batch_model_runs_one_image_at_a_time(monkeypatch):
+    service, session = _service(monkeypatch, 1)
+    assert len(service.infer_batch_bgr(_images())) == 5
+    assert session.batch_sizes == [1] * 5
+
+
+def test_iter_tar_images_streams_image_members():
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tf:
+        for name, data in (("a/1.jpg", b"one"), ("a/notes.txt", b"skip"), ("a/2.PNG", b"two")):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    buf.seek(0)
+    assert list(iter_tar_images(buf)) == [("a/1.jpg", b"one"), ("a/2.PNG", b"two")]
+
+
+def test_session_options_and_optimized_cache(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_session(path, opts, providers):
+        calls.append((path, opts))
+        return _FakeSession("batch")
+
+    monkeypatch.setattr(vision_infer.ort, "InferenceSession", fake_session)
+    model = tmp_path / "model.onnx"
+    model.write_bytes(b"onnx")
+    cache = tmp_path / "opt" / "model.opt.onnx"
+    cfg = {"intra_op_threads": 2, "allow_spinning": False, "optimized_model_path": str(cache)}
+
+    service = vision_infer.VisionONNXService(str(model), session_cfg=cfg)
+    path, opts = calls[-1]
+    assert path == str(model) and service.session_source == "model"
+    assert opts.intra_op_num_threads == 2
+    assert opts.optimized_model_filepath == str(cache)
+    assert opts.get_session_config_entry("session.intra_op.allow_spinning") == "0"
+
+    cache.write_bytes(b"optimized")
+    service = vision_infer.VisionONNXService(str(model), session_cfg=cfg)
+    path, opts = calls[-1]
+    assert path == str(cache) and service.session_source == "optimized"
+    assert opts.graph_optimization_level == vision_infer.ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+    assert set(service.warmup([1, 4])) == {1, 4}
+
+
+def test_model_path_selects_built_variant(monkeypatch, tmp_path):
+    fp32 = tmp_path / "model.onnx"
+    fp32.write_bytes(b"")
+    monkeypatch.setattr(vision_pipeline, "MODEL_PATH", fp32)
+    monkeypatch.setattr(vision_pipeline, "VISION_MODEL_CFG", {"variant": "int8_static"})
+    assert vision_pipeline.model_path() == fp32  # not built yet
+    (tmp_path / "model.int8.onnx").write_bytes(b"")
+    assert vision_pipeline.model_path() == tmp_path / "model.int8.onnx"
+
+
+def test_run_prepare_binary_image(monkeypatch):
+    cv2 = vision_infer.cv2
+    monkeypatch.setattr(vision_pipeline, "detect_faces_bgr", lambda img: [(4, 4, 20, 20)])
+    raw = cv2.imencode(".png", _images()[0])[1].tobytes()
+    resp = vision_pipeline.run_prepare(bytearray(raw), True, True, "jpeg")
+    assert "image_png_b64" not in resp
+    assert resp["image_bytes"][:2] == b"\xff\xd8"
+    assert cv2.imdecode(np.frombuffer(resp["image_bytes"], np.uint8), cv2.IMREAD_COLOR).shape == (48, 64, 3)
+    assert "image_png_b64" in vision_pipeline.run_prepare(raw, True, True)
@@ -20,8 +20,7 @@ def write_shards(docs, dest_dir: Path, chunk_size: int, prefix: str):
                 for entry in batch:
                     text = entry.read_text(encoding='utf-8', errors='ignore')
                     payload = {"path": str(entry), "text": text}
-                    f.write(json.dumps(payload, ensure_ascii=False) + '
-')
+                    f.write(json.dumps(payload, ensure_ascii=False) + '\n')
             print(f"wrote {shard} ({len(batch)} docs)")
             batch.clear()
             shard_id += 1
@@ -31,8 +30,7 @@ def write_shards(docs, dest_dir: Path, chunk_size: int, prefix: str):
             for entry in batch:
                 text = entry.read_text(encoding='utf-8', errors='ignore')
                 payload = {"path": str(entry), "text": text}
-                f.write(json.dumps(payload, ensure_ascii=False) + '
-')
+                f.write(json.dumps(payload, ensure_ascii=False) + '\n')
         print(f"wrote {shard} ({len(batch)} docs)")
 
 if __name__ == '__main__':
@@ -6,13 +6,22 @@ import pandas as pd
 SHAP_TOPK = Path("reports/explain/tabular/batch/per_sample_topk.csv")
 ALIGN_OUT = Path("reports/explain/align/align_at_k.csv")
 ALIGN_OUT.parent.mkdir(parents=True, exist_ok=True)
-RAG_DOCS = Path("models/rag/docs.jsonl")
+RAG_BASE = Path("models/rag")
+
+
+def rag_docs_path():
+    # Builders publish models/rag/<version>/ and name it in models/rag/ACTIVE.
+    pointer = RAG_BASE / "ACTIVE"
+    if pointer.exists():
+        return RAG_BASE / pointer.read_text(encoding="utf-8").strip() / "docs.jsonl"
+    return RAG_BASE / "docs.jsonl"
 
 
 def load_rag_texts():
-    if not RAG_DOCS.exists():
+    rag_docs = rag_docs_path()
+    if not rag_docs.exists():
         return []
-    return [json.loads(line) for line in RAG_DOCS.read_text(encoding="utf-8").splitlines() if line.strip()]
+    return [json.loads(line) for line in rag_docs.read_text(encoding="utf-8").splitlines() if line.strip()]
 
 
 def jaccard(a: str, b: str) -> float:
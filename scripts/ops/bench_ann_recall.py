@@ -0,0 +1,136 @@
+"""Recall@k vs query latency for the ANN index options.
+
+Every index is compared against the exact flat (brute-force) result on the
+same embeddings. Uses ``--emb`` (e.g. models/rag/embeddings.npy) when given,
+otherwise a synthetic clustered unit-norm corpus.
+"""
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.services.ann import (  # noqa: E402
+    NumpyIVFIndex,
+    ann_search,
+    build_faiss_index,
+    default_nlist,
+    faiss,
+    training_sample,
+)
+from backend.app.services.ranking import top_k_indices  # noqa: E402
+
+
+def synth_embeddings(n, dim, clusters=256, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype("float32")
+    X = centers[rng.integers(0, clusters, n)] + 0.35 * rng.standard_normal((n, dim)).astype("float32")
+    return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+
+def exact(emb, queries, k):
+    return top_k_indices(queries @ emb.T, k)
+
+
+def recall_at_k(found, truth):
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def time_queries(fn, queries):
+    times = []
+    found = []
+    for q in queries:
+        start = time.perf_counter()
+        _, I = fn(q[None, :])
+        times.append((time.perf_counter() - start) * 1000)
+        found.append(I[0])
+    return np.array(found), np.percentile(times, 50), np.percentile(times, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN recall@k vs latency benchmark")
+    parser.add_argument("--emb", default=None, help="embeddings .npy (default: synthetic)")
+    parser.add_argument("--n", type=int, default=200_000, help="synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", default="1,4,16,64")
+    parser.add_argument("--ef-search", default="16,64,256")
+    parser.add_argument("--pq-m", type=int, default=16)
+    parser.add_argument("--out", default="reports/metrics/ann_recall_bench.csv")
+    args = parser.parse_args()
+
+    if args.emb:
+        emb = np.load(args.emb, mmap_mode="r")
+    else:
+        emb = synth_embeddings(args.n, args.dim)
+    rng = np.random.default_rng(1)
+    queries = np.asarray(emb[np.sort(rng.choice(len(emb), args.queries, replace=False))], dtype="float32")
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype("float32")
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = exact(np.asarray(emb), queries, args.k)
+    nlist = args.nlist or default_nlist(len(emb))
+    nprobes = [int(x) for x in args.nprobe.split(",")]
+    print(f"n={len(emb)} dim={emb.shape[1]} nlist={nlist} k={args.k} faiss={'yes' if faiss else 'no'}")
+
+    rows = []
+
+    def record(name, param, fn, build_s=0.0):
+        found, p50, p95 = time_queries(fn, queries)
+        row = {
+            "index": name,
+            "param": param,
+            "recall_at_k": round(recall_at_k(found, truth), 4),
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "build_s": round(build_s, 2),
+        }
+        rows.append(row)
+        print(f"{name:>14} {param:>14} recall@{args.k}={row['recall_at_k']:.4f} p50={row['p50_ms']}ms p95={row['p95_ms']}ms")
+
+    record("numpy_flat", "-", lambda q: (None, exact(emb, q, args.k)))
+
+    start = time.perf_counter()
+    ivf = NumpyIVFIndex.train(training_sample(emb, 100_000), nlist)
+    ivf.add(emb)
+    build_s = time.perf_counter() - start
+    for nprobe in nprobes:
+        record("numpy_ivf", f"nprobe={nprobe}", lambda q, n=nprobe: ivf.search(emb, q, args.k, n), build_s)
+
+    if faiss is not None:
+        specs = [("flat", {}), ("ivf_flat", {"nlist": nlist}), ("hnsw", {})]
+        if emb.shape[1] % args.pq_m == 0:
+            specs.append(("ivf_pq", {"nlist": nlist, "pq_m": args.pq_m}))
+        for kind, kwargs in specs:
+            start = time.perf_counter()
+            index = build_faiss_index(emb, kind, **kwargs)
+            build_s = time.perf_counter() - start
+            if kind.startswith("ivf"):
+                for nprobe in nprobes:
+                    record(f"faiss_{kind}", f"nprobe={nprobe}",
+                           lambda q, n=nprobe: ann_search(index, emb, q, args.k, nprobe=n), build_s)
+            elif kind == "hnsw":
+                for ef in [int(x) for x in args.ef_search.split(",")]:
+                    record("faiss_hnsw", f"efSearch={ef}",
+                           lambda q, e=ef: ann_search(index, emb, q, args.k, ef_search=e), build_s)
+            else:
+                record("faiss_flat", "-", lambda q: ann_search(index, emb, q, args.k), build_s)
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Wrote", out)
+
+
+if __name__ == "__main__":
+    main()
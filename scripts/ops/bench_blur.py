@@ -0,0 +1,109 @@
+"""Per-image face anonymization latency by resolution, face count and method.
+
+``legacy`` is the old ``blur_faces_bboxes`` (full-frame copy, then a
+31x31 Gaussian per face). The other modes go through the blur engine in
+place: ``gaussian`` (same kernel), ``gaussian_scaled`` and ``box_scaled``
+(kernel = ``--kernel-frac`` of the face), ``box`` (31x31) and
+``pixelate``. Faces are square boxes of ``--face-frac`` of the shorter
+side at random positions; 0 faces measures the no-op path.
+"""
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.services.blur import BLUR_CFG, blur_faces_bboxes  # noqa: E402
+
+
+def legacy(img, boxes):
+    out = img.copy()
+    for (x1, y1, x2, y2) in boxes:
+        roi = out[y1:y2, x1:x2]
+        if roi.size == 0:
+            continue
+        out[y1:y2, x1:x2] = cv2.GaussianBlur(roi, (31, 31), 25)
+    return out
+
+
+def engine(method, kernel_frac=None):
+    def run(img, boxes):
+        BLUR_CFG["kernel_frac"] = kernel_frac
+        return blur_faces_bboxes(img, boxes, method=method, inplace=True)
+
+    return run
+
+
+def random_boxes(h, w, n, face_frac, rng):
+    side = max(8, int(min(h, w) * face_frac))
+    boxes = []
+    for _ in range(n):
+        x, y = int(rng.integers(0, w - side)), int(rng.integers(0, h - side))
+        boxes.append((x, y, x + side, y + side))
+    return boxes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark face blurring methods")
+    parser.add_argument("--sizes", default="480x640,1080x1920,2160x3840", help="HxW list")
+    parser.add_argument("--faces", default="0,1,4,16")
+    parser.add_argument("--face-frac", type=float, default=0.15, help="face side / shorter image side")
+    parser.add_argument("--kernel-frac", type=float, default=0.25)
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--out", default="reports/metrics/blur_bench.csv")
+    args = parser.parse_args()
+
+    modes = [
+        ("legacy", legacy),
+        ("gaussian", engine("gaussian")),
+        ("gaussian_scaled", engine("gaussian", args.kernel_frac)),
+        ("box", engine("box")),
+        ("box_scaled", engine("box", args.kernel_frac)),
+        ("pixelate", engine("pixelate")),
+    ]
+    saved = BLUR_CFG["kernel_frac"]
+    rng = np.random.default_rng(0)
+    rows = []
+    try:
+        for spec in args.sizes.split(","):
+            h, w = (int(v) for v in spec.split("x"))
+            img = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+            for n in [int(f) for f in args.faces.split(",")]:
+                boxes = random_boxes(h, w, n, args.face_frac, rng)
+                for name, fn in modes:
+                    fn(img, boxes)
+                    times = []
+                    for _ in range(args.repeats):
+                        start = time.perf_counter()
+                        fn(img, boxes)
+                        times.append((time.perf_counter() - start) * 1000)
+                    row = {
+                        "mode": name,
+                        "size": spec,
+                        "faces": n,
+                        "p50_ms": round(float(np.percentile(times, 50)), 3),
+                        "p95_ms": round(float(np.percentile(times, 95)), 3),
+                    }
+                    rows.append(row)
+                    print(row)
+    finally:
+        BLUR_CFG["kernel_frac"] = saved
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Wrote", out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Face detection throughput vs image size for each detector mode.
+
+``haar_per_call`` rebuilds the cascade on every image (the old
+``detect_faces_bgr``); ``haar`` reuses the thread-local cascade;
+``haar_max<N>`` detects on a copy downscaled to ``N`` px on the long side;
+``yunet`` runs when the ONNX model is present. ``--image`` is fitted onto
+each size (use a photo with faces to compare detections); without it a
+noise image measures cost only.
+"""
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.services.face_detect import FACE_CFG, HaarFaceDetector, YuNetFaceDetector  # noqa: E402
+
+
+class PerCallHaar:
+    name = "haar_per_call"
+
+    def detect(self, img):
+        return HaarFaceDetector().detect(img)
+
+
+def fit_canvas(base, h, w):
+    """``base`` scaled to fit an ``h`` x ``w`` canvas, keeping its aspect ratio."""
+    scale = min(h / base.shape[0], w / base.shape[1])
+    resized = cv2.resize(base, (int(base.shape[1] * scale), int(base.shape[0] * scale)), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((h, w, 3), 127, dtype=np.uint8)
+    y, x = (h - resized.shape[0]) // 2, (w - resized.shape[1]) // 2
+    canvas[y : y + resized.shape[0], x : x + resized.shape[1]] = resized
+    return canvas
+
+
+def detectors(max_sides, yunet_model):
+    out = [("haar_per_call", PerCallHaar()), ("haar", HaarFaceDetector())]
+    out += [(f"haar_max{side}", HaarFaceDetector(max_side=side)) for side in max_sides]
+    if Path(yunet_model).exists():
+        out.append(("yunet", YuNetFaceDetector(yunet_model)))
+        out += [(f"yunet_max{side}", YuNetFaceDetector(yunet_model, max_side=side)) for side in max_sides]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark face detectors across image sizes")
+    parser.add_argument("--image", default=None, help="photo to resize to each size (default: noise)")
+    parser.add_argument("--sizes", default="480x640,720x1280,1080x1920,2160x3840", help="HxW list")
+    parser.add_argument("--max-sides", default="640", help="downscale targets for the *_max modes")
+    parser.add_argument("--yunet-model", default=FACE_CFG["yunet_model"])
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--out", default="reports/metrics/face_detect_bench.csv")
+    args = parser.parse_args()
+
+    if args.image:
+        base = cv2.imread(args.image)
+        if base is None:
+            raise SystemExit(f"Could not read {args.image}")
+    else:
+        base = np.random.default_rng(0).integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+    max_sides = [int(s) for s in args.max_sides.split(",") if s]
+
+    rows = []
+    for spec in args.sizes.split(","):
+        h, w = (int(v) for v in spec.split("x"))
+        img = fit_canvas(base, h, w)
+        for name, detector in detectors(max_sides, args.yunet_model):
+            faces = detector.detect(img)
+            times = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                detector.detect(img)
+                times.append((time.perf_counter() - start) * 1000)
+            p50 = float(np.percentile(times, 50))
+            row = {
+                "mode": name,
+                "size": spec,
+                "p50_ms": round(p50, 2),
+                "images_per_s": round(1000 / p50, 2),
+                "faces": len(faces),
+                "faces_per_s": round(len(faces) * 1000 / p50, 2),
+            }
+            rows.append(row)
+            print(row)
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Wrote", out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Retrieval latency and quality: dense SVD vs BM25 vs hybrid (RRF).
+
+Known-item evaluation on the active ``models/rag`` version: each query is a
+handful of words sampled from one chunk, and that chunk is the only
+relevant result. Reports recall@k and MRR next to per-query p50/p95
+latency, with BM25 measured both with MaxScore pruning and exhaustively.
+"""
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.services.ann import ann_search  # noqa: E402
+from backend.app.services.index_registry import active_dir, load_svd_artifacts  # noqa: E402
+from backend.app.services.ranking import reciprocal_rank_fusion, top_k_indices  # noqa: E402
+
+
+def known_item_queries(docs, bm25, n, words, seed=0):
+    """(query, chunk id) pairs built from each chunk's own indexed terms."""
+    rng = np.random.default_rng(seed)
+    pairs = []
+    for doc_id in rng.permutation(len(docs)):
+        tokens = [t for t in bm25.token_re.findall(docs[int(doc_id)].get("text", "").lower()) if t in bm25.vocab]
+        tokens = [t for t in tokens if t not in bm25.stop_words]
+        if len(tokens) < words:
+            continue
+        pairs.append((" ".join(rng.choice(tokens, size=words, replace=False)), int(doc_id)))
+        if len(pairs) == n:
+            break
+    return pairs
+
+
+def evaluate(name, search_fn, pairs, k):
+    times, hits, rr = [], 0, 0.0
+    for query, target in pairs:
+        start = time.perf_counter()
+        ids = list(search_fn(query))
+        times.append((time.perf_counter() - start) * 1000)
+        if target in ids[:k]:
+            hits += 1
+            rr += 1.0 / (ids.index(target) + 1)
+    return {
+        "retriever": name,
+        f"recall@{k}": round(hits / len(pairs), 4),
+        "mrr": round(rr / len(pairs), 4),
+        "p50_ms": round(float(np.percentile(times, 50)), 4),
+        "p95_ms": round(float(np.percentile(times, 95)), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dense vs BM25 vs hybrid retrieval")
+    parser.add_argument("--index-dir", default=None, help="version dir (defaults to the ACTIVE models/rag)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--query-words", type=int, default=4)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--depth", type=int, default=50, help="candidates per retriever fed to RRF")
+    parser.add_argument("--out", default="reports/metrics/hybrid_bench.csv")
+    args = parser.parse_args()
+
+    index_dir = Path(args.index_dir) if args.index_dir else active_dir(ROOT / "models" / "rag")
+    state = load_svd_artifacts(index_dir) if index_dir else None
+    if state is None or state["bm25"] is None:
+        raise SystemExit("No SVD index with BM25 postings; run scripts/rag/build_ann.py first.")
+    emb, docs, ann, bm25, embed = state["emb"], state["docs"], state["ann"], state["bm25"], state["embed"]
+    pairs = known_item_queries(docs, bm25, args.queries, args.query_words)
+    if not pairs:
+        raise SystemExit("No chunk has enough indexed terms to build queries.")
+    k = args.top_k
+    depth = max(k, args.depth)
+    print(f"index: {index_dir} chunks={len(docs)} terms={len(bm25.vocab)} queries={len(pairs)}")
+
+    def dense(query, top=k):
+        vec = np.ascontiguousarray(embed([query]), dtype="float32")
+        if ann is not None:
+            return ann_search(ann, emb, vec, top)[1][0].tolist()
+        return top_k_indices(vec @ emb.T, top)[0].tolist()
+
+    def hybrid(query):
+        return reciprocal_rank_fusion([dense(query, depth), bm25.search(query, depth)[1].tolist()], k)[0]
+
+    retrievers = (
+        ("dense", dense),
+        ("bm25", lambda q: bm25.search(q, k)[1].tolist()),
+        ("bm25_exhaustive", lambda q: bm25.search(q, k, prune=False)[1].tolist()),
+        ("hybrid", hybrid),
+    )
+    rows = []
+    for name, fn in retrievers:
+        for query, _ in pairs[:10]:
+            fn(query)
+        rows.append(evaluate(name, fn, pairs, k))
+        print(rows[-1])
+    pruned = np.mean([bm25.search(q, k)[2] for q, _ in pairs])
+    full = np.mean([bm25.search(q, k, prune=False)[2] for q, _ in pairs])
+    print(f"BM25 postings scored per query: pruned={pruned:.1f} exhaustive={full:.1f}")
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Wrote", out)
+
+
+if __name__ == "__main__":
+    main()
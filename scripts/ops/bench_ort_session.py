@@ -0,0 +1,96 @@
+"""Load, first-run and steady-state latency per onnxruntime session config.
+
+Each config is a ``vision_session`` overlay built from the grid of
+``--threads`` x ``--opt-levels`` x ``--spinning``. Sessions are created
+from scratch per config; ``first_ms`` is the first ``run`` (what an
+unwarmed server pays on its first request) and ``p50``/``p95`` are
+steady-state over ``--runs`` calls per batch size. ``--cached`` adds rows
+that load from a saved optimized graph.
+"""
+import argparse
+import csv
+import itertools
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.services.vision_infer import create_session  # noqa: E402
+from backend.app.services.vision_pipeline import MODEL_PATH  # noqa: E402
+
+
+def measure(model, cfg, batches, runs):
+    start = time.perf_counter()
+    sess, source = create_session(model, cfg)
+    load_ms = (time.perf_counter() - start) * 1000
+    inp = sess.get_inputs()[0]
+    hw = [d if isinstance(d, int) else 224 for d in inp.shape[2:]]
+    row = {"source": source, "load_ms": round(load_ms, 1)}
+    for i, n in enumerate(batches):
+        x = np.random.default_rng(0).standard_normal((n, 3, *hw)).astype(np.float32)
+        start = time.perf_counter()
+        sess.run(None, {inp.name: x})
+        if i == 0:
+            row["first_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            sess.run(None, {inp.name: x})
+            times.append((time.perf_counter() - start) * 1000)
+        row[f"b{n}_p50_ms"] = round(float(np.percentile(times, 50)), 2)
+        row[f"b{n}_p95_ms"] = round(float(np.percentile(times, 95)), 2)
+        row[f"b{n}_img_per_s"] = round(n * 1000 / float(np.percentile(times, 50)), 1)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark onnxruntime session options")
+    parser.add_argument("--model", default=str(MODEL_PATH))
+    parser.add_argument("--threads", default="1,2,0", help="intra-op thread counts (0 = ORT default)")
+    parser.add_argument("--opt-levels", default="disable,basic,extended,all")
+    parser.add_argument("--spinning", default="1", help="allow_spinning values, e.g. 1,0")
+    parser.add_argument("--batches", default="1,8")
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--cached", action="store_true", help="also load from a saved optimized graph")
+    parser.add_argument("--out", default="reports/metrics/ort_session_bench.csv")
+    args = parser.parse_args()
+
+    if not Path(args.model).exists():
+        raise SystemExit(f"Model not found: {args.model} (run the vision ONNX export first)")
+    batches = [int(b) for b in args.batches.split(",")]
+    grid = itertools.product(
+        [int(t) for t in args.threads.split(",")],
+        args.opt_levels.split(","),
+        [bool(int(s)) for s in args.spinning.split(",")],
+    )
+    rows = []
+    for threads, level, spin in grid:
+        cfg = {"intra_op_threads": threads, "graph_optimization": level, "allow_spinning": spin}
+        plans = [dict(cfg)]
+        if args.cached:
+            cache = Path(tempfile.mkdtemp()) / "model.opt.onnx"
+            # First session writes the optimized graph, the second reads it.
+            plans = [{**cfg, "optimized_model_path": str(cache)}, {**cfg, "optimized_model_path": str(cache)}]
+        for plan in plans:
+            row = {"intra_op_threads": threads, "graph_optimization": level, "allow_spinning": spin}
+            row.update(measure(args.model, plan, batches, args.runs))
+            rows.append(row)
+            print(row)
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Wrote", out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Per-image latency and allocation of vision preprocessing variants.
+
+``legacy`` is the previous path (cvtColor, resize, float divide, mean/std
+and a transposed copy); ``fused`` is ``_preprocess_into`` allocating its
+uint8 work buffers per call; ``fused_scratch`` reuses them like the
+service does. ``peak_alloc_kb`` is the most temporary memory live at once
+during a call, from tracemalloc (which sees OpenCV outputs too, since the
+Python binding allocates them as ndarrays); 0 means allocation-free.
+"""
+import argparse
+import csv
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.services.vision_infer import (  # noqa: E402
+    IMAGENET_MEAN,
+    IMAGENET_STD,
+    _preprocess_into,
+    preprocess_scratch,
+)
+
+
+def legacy(img, out, _scratch):
+    h, w = out.shape[1:]
+    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    rgb = cv2.resize(rgb, (w, h), interpolation=cv2.INTER_LINEAR).astype(np.float32) / 255.0
+    out[...] = np.transpose((rgb - IMAGENET_MEAN) / IMAGENET_STD, (2, 0, 1))
+
+
+def fused(img, out, _scratch):
+    _preprocess_into(img, out)
+
+
+def fused_scratch(img, out, scratch):
+    _preprocess_into(img, out, scratch)
+
+
+def peak_alloc(fn, img, out, scratch):
+    """Peak bytes allocated above the baseline during one call."""
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        fn(img, out, scratch)
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vision preprocessing")
+    parser.add_argument("--sizes", default="224x224,480x640,1080x1920", help="HxW input sizes")
+    parser.add_argument("--input-hw", default="224x224", help="model input HxW")
+    parser.add_argument("--repeats", type=int, default=500)
+    parser.add_argument("--out", default="reports/metrics/preprocess_bench.csv")
+    args = parser.parse_args()
+
+    ih, iw = (int(v) for v in args.input_hw.split("x"))
+    out = np.empty((3, ih, iw), dtype=np.float32)
+    scratch = preprocess_scratch((ih, iw))
+    rng = np.random.default_rng(0)
+    rows = []
+    for spec in args.sizes.split(","):
+        h, w = (int(v) for v in spec.split("x"))
+        img = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+        for name, fn in (("legacy", legacy), ("fused", fused), ("fused_scratch", fused_scratch)):
+            for _ in range(20):
+                fn(img, out, scratch)
+            times = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                fn(img, out, scratch)
+                times.append((time.perf_counter() - start) * 1e6)
+            row = {
+                "mode": name,
+                "size": spec,
+                "p50_us": round(float(np.percentile(times, 50)), 1),
+                "p95_us": round(float(np.percentile(times, 95)), 1),
+                "peak_alloc_kb": round(peak_alloc(fn, img, out, scratch) / 1024, 1),
+            }
+            rows.append(row)
+            print(row)
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Wrote", out_path)
+
+
+if __name__ == "__main__":
+    main()
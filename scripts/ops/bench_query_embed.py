@@ -0,0 +1,123 @@
+"""Query embedding latency: sklearn TF-IDF + SVD vs the precomposed projection.
+
+Uses the active ``models/rag`` version when it has both artifacts, otherwise
+fits a small synthetic vocabulary. Load time is measured in a fresh
+interpreter so it includes the imports each path needs at startup.
+"""
+import argparse
+import csv
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.services.index_registry import active_dir  # noqa: E402
+from backend.app.services.query_embed import QueryEmbedder, write_query_projection  # noqa: E402
+
+LOAD_SNIPPETS = {
+    "sklearn": "import joblib; v = joblib.load(r'{d}/tfidf_vectorizer.joblib'); s = joblib.load(r'{d}/svd.joblib')",
+    "precomposed": "from backend.app.services.query_embed import QueryEmbedder; QueryEmbedder.load(__import__('pathlib').Path(r'{d}'))",
+}
+
+
+def synth_artifacts(out_dir, n_docs, vocab, components, seed=0):
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    rng = np.random.default_rng(seed)
+    words = [f"w{i}" for i in range(vocab)]
+    docs = [" ".join(rng.choice(words, size=80)) for _ in range(n_docs)]
+    vec = TfidfVectorizer(max_features=100000, stop_words="english")
+    svd = TruncatedSVD(n_components=components, random_state=42).fit(vec.fit_transform(docs))
+    joblib.dump(vec, out_dir / "tfidf_vectorizer.joblib")
+    joblib.dump(svd, out_dir / "svd.joblib")
+
+
+def load_ms(kind, index_dir, repeats):
+    code = "import time; t = time.perf_counter(); " + LOAD_SNIPPETS[kind].format(d=index_dir)
+    code += "; print((time.perf_counter() - t) * 1000)"
+    times = [
+        float(subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout)
+        for _ in range(repeats)
+    ]
+    return float(np.median(times))
+
+
+def per_query_ms(fn, queries):
+    times = []
+    for q in queries:
+        start = time.perf_counter()
+        fn([q])
+        times.append((time.perf_counter() - start) * 1000)
+    return np.percentile(times, 50), np.percentile(times, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark query embedding paths")
+    parser.add_argument("--index-dir", default=None, help="version dir with the TF-IDF/SVD joblibs")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--load-repeats", type=int, default=3)
+    parser.add_argument("--out", default="reports/metrics/query_embed_bench.csv")
+    args = parser.parse_args()
+
+    index_dir = Path(args.index_dir) if args.index_dir else active_dir(ROOT / "models" / "rag")
+    if index_dir is None or not (index_dir / "svd.joblib").exists():
+        index_dir = Path(tempfile.mkdtemp())
+        synth_artifacts(index_dir, n_docs=2000, vocab=20000, components=256)
+    vec = joblib.load(index_dir / "tfidf_vectorizer.joblib")
+    svd = joblib.load(index_dir / "svd.joblib")
+    # Export to a scratch dir, never into a published version directory.
+    proj_dir = Path(tempfile.mkdtemp())
+    if not write_query_projection(vec, svd, proj_dir):
+        raise SystemExit("Vectorizer settings are not supported by the query projection.")
+    embedder = QueryEmbedder.load(proj_dir)
+
+    rng = np.random.default_rng(0)
+    terms = list(vec.vocabulary_)
+    queries = [" ".join(rng.choice(terms, size=int(rng.integers(2, 12)))) for _ in range(args.queries)]
+    print(f"index: {index_dir} vocab={len(terms)} dim={embedder.dim}")
+
+    def sklearn_embed(qs):
+        proj = svd.transform(vec.transform(qs))
+        return proj / (np.linalg.norm(proj, axis=1, keepdims=True) + 1e-8)
+
+    err = float(np.abs(sklearn_embed(queries[:50]) - embedder.embed(queries[:50])).max())
+    rows = []
+    for name, fn in (("sklearn", sklearn_embed), ("precomposed", embedder.embed)):
+        fn(queries[:10])
+        p50, p95 = per_query_ms(fn, queries)
+        start = time.perf_counter()
+        fn(queries)
+        batch_ms = (time.perf_counter() - start) * 1000
+        load = load_ms(name, proj_dir if name == "precomposed" else index_dir, args.load_repeats)
+        rows.append(
+            {
+                "path": name,
+                "p50_ms": round(float(p50), 4),
+                "p95_ms": round(float(p95), 4),
+                f"batch{len(queries)}_ms": round(batch_ms, 2),
+                "load_ms": round(load, 1),
+                "max_abs_err": round(err, 7) if name == "precomposed" else 0.0,
+            }
+        )
+        print(rows[-1])
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Wrote", out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Latency and peak-RSS benchmark for RAGIndex.search against corpus size.
+
+Each (corpus size, engine) pair runs in a fresh spawned process so the
+reported ``ru_maxrss`` belongs to that configuration only. The ``dense``
+engine reproduces the previous ``toarray()`` search path for comparison.
+"""
+import argparse
+import csv
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def synth_corpus(n_docs, vocab_size, doc_len=120, seed=0):
+    rng = np.random.default_rng(seed)
+    vocab = [f"term{i}" for i in range(vocab_size)]
+    # Zipf-distributed term ids give a realistic long-tail vocabulary.
+    ids = rng.zipf(1.3, size=(n_docs, doc_len)) % vocab_size
+    return [{"title": f"doc_{i}", "text": " ".join(vocab[j] for j in row)} for i, row in enumerate(ids)], vocab
+
+
+def _dense_search(index, query, top_k):
+    vector = index.vectorizer.transform([query])
+    matrix_array = index.matrix.toarray()
+    vector_array = vector.toarray()
+    denom = np.linalg.norm(matrix_array, axis=1) * np.linalg.norm(vector_array)
+    denom[denom == 0] = 1e-8
+    sim = (matrix_array @ vector_array.T).ravel() / denom
+    return np.argsort(-sim)[:top_k]
+
+
+def _maxrss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def run_one(n_docs, vocab_size, engine, n_queries, top_k):
+    from backend.app.services.rag_index import RAGIndex
+
+    docs, vocab = synth_corpus(n_docs, vocab_size)
+    index = RAGIndex()
+    index.ingest(docs)
+    rss_build = _maxrss_mb()
+    rng = np.random.default_rng(1)
+    queries = [" ".join(rng.choice(vocab[:2000], size=4)) for _ in range(n_queries)]
+    times = []
+    for q in queries:
+        start = time.perf_counter()
+        if engine == "dense":
+            _dense_search(index, q, top_k)
+        else:
+            index.search(q, top_k)
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "engine": engine,
+        "n_docs": n_docs,
+        "vocab": len(index.vectorizer.vocabulary_),
+        "p50_ms": round(float(np.percentile(times, 50)), 3),
+        "p95_ms": round(float(np.percentile(times, 95)), 3),
+        "rss_after_build_mb": round(rss_build, 1),
+        "peak_rss_mb": round(_maxrss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RAGIndex search latency and memory")
+    parser.add_argument("--sizes", default="1000,5000,20000,50000", help="comma-separated corpus sizes")
+    parser.add_argument("--vocab", type=int, default=50000, help="synthetic vocabulary size")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--dense-max-docs", type=int, default=20000, help="skip the dense engine above this size")
+    parser.add_argument("--out", default="reports/metrics/rag_search_bench.csv")
+    args = parser.parse_args()
+
+    rows = []
+    ctx = get_context("spawn")
+    for n in [int(s) for s in args.sizes.split(",") if s]:
+        engines = ["sparse"] + (["dense"] if n <= args.dense_max_docs else [])
+        for engine in engines:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                row = pool.submit(run_one, n, args.vocab, engine, args.queries, args.top_k).result()
+            rows.append(row)
+            print(
+                f"{row['engine']:>6} docs={row['n_docs']:>6} vocab={row['vocab']:>6} "
+                f"p50={row['p50_ms']:.2f}ms p95={row['p95_ms']:.2f}ms "
+                f"rss_build={row['rss_after_build_mb']}MB peak_rss={row['peak_rss_mb']}MB"
+            )
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Wrote", out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Throughput vs p99 latency of the SBERT micro-batcher under concurrent load.
+
+Drives ``MicroBatcher`` in-process with ``--concurrency`` clients that each
+submit queries back to back. Uses the real encoder artifact when present;
+otherwise a synthetic encoder whose cost is ``per_call_ms + n * per_item_ms``
+stands in for the fixed per-call overhead that batching amortizes.
+"""
+import argparse
+import asyncio
+import csv
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.services.batching import MicroBatcher  # noqa: E402
+from backend.app.services.encoder import sbert_encoder  # noqa: E402
+
+
+class SyntheticEncoder:
+    def __init__(self, per_call_ms, per_item_ms, dim=384):
+        self.per_call_ms = per_call_ms
+        self.per_item_ms = per_item_ms
+        self.dim = dim
+
+    def encode(self, texts, convert_to_numpy=True):
+        time.sleep((self.per_call_ms + self.per_item_ms * len(texts)) / 1000)
+        return np.zeros((len(texts), self.dim), dtype="float32")
+
+
+async def drive(batcher, concurrency, duration_s):
+    latencies = []
+    stop = time.perf_counter() + duration_s
+
+    async def client(cid):
+        n = 0
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            await batcher.submit(f"client {cid} query {n}")
+            latencies.append((time.perf_counter() - start) * 1000)
+            n += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the SBERT micro-batcher")
+    parser.add_argument("--encoder", default=None, help="encoder.joblib (default: the active SBERT version)")
+    parser.add_argument("--concurrency", default="1,8,32,64")
+    parser.add_argument("--configs", default="1:0,8:2,32:5,64:10", help="max_batch:max_wait_ms pairs")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per run")
+    parser.add_argument("--per-call-ms", type=float, default=8.0, help="synthetic encoder fixed cost")
+    parser.add_argument("--per-item-ms", type=float, default=0.5, help="synthetic encoder per-query cost")
+    parser.add_argument("--out", default="reports/metrics/sbert_batcher_bench.csv")
+    args = parser.parse_args()
+
+    enc_path = Path(args.encoder) if args.encoder else sbert_encoder.path
+    if enc_path.exists():
+        import joblib
+
+        encoder = joblib.load(enc_path)
+        source = str(enc_path)
+    else:
+        encoder = SyntheticEncoder(args.per_call_ms, args.per_item_ms)
+        source = "synthetic"
+    print(f"encoder: {source}")
+
+    def encode(texts):
+        return encoder.encode(texts, convert_to_numpy=True)
+
+    rows = []
+    for spec in args.configs.split(","):
+        max_batch, max_wait = spec.split(":")
+        for conc in [int(c) for c in args.concurrency.split(",")]:
+            batcher = MicroBatcher(encode, max_batch=int(max_batch), max_wait_ms=float(max_wait))
+            qps, p50, p99 = asyncio.run(drive(batcher, conc, args.duration))
+            stats = batcher.stats()
+            row = {
+                "encoder": source,
+                "max_batch": int(max_batch),
+                "max_wait_ms": float(max_wait),
+                "concurrency": conc,
+                "qps": round(qps, 1),
+                "p50_ms": round(float(p50), 2),
+                "p99_ms": round(float(p99), 2),
+                "mean_batch": stats["mean_batch_size"],
+            }
+            rows.append(row)
+            print(
+                f"batch<={row['max_batch']:>3} wait={row['max_wait_ms']:>5}ms conc={conc:>3} "
+                f"qps={row['qps']:>8} p50={row['p50_ms']:>7}ms p99={row['p99_ms']:>7}ms "
+                f"mean_batch={row['mean_batch']}"
+            )
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Wrote", out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Images/s vs p99 latency of batched ONNX classification under concurrent load.
+
+Drives the vision ``MicroBatcher`` in-process with ``--concurrency``
+clients that each submit images back to back. ``1:0`` (batch of one, no
+wait) is the unbatched baseline. Images are decoded up front so the
+numbers cover preprocessing + ``session.run`` only.
+"""
+import argparse
+import asyncio
+import csv
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.services.batching import MicroBatcher  # noqa: E402
+from backend.app.services.vision_infer import VisionONNXService  # noqa: E402
+from backend.app.services.vision_pipeline import MODEL_PATH  # noqa: E402
+
+
+async def drive(batcher, images, concurrency, duration_s):
+    latencies = []
+    stop = time.perf_counter() + duration_s
+
+    async def client(cid):
+        n = cid
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            await batcher.submit(images[n % len(images)])
+            latencies.append((time.perf_counter() - start) * 1000)
+            n += concurrency
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test batched vision inference")
+    parser.add_argument("--model", default=str(MODEL_PATH))
+    parser.add_argument("--concurrency", default="1,4,16,32")
+    parser.add_argument("--configs", default="1:0,8:2,16:4,32:8", help="max_batch:max_wait_ms pairs")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per run")
+    parser.add_argument("--image-size", default="480x640", help="HxW of the synthetic input images")
+    parser.add_argument("--out", default="reports/metrics/vision_batcher_bench.csv")
+    args = parser.parse_args()
+
+    if not Path(args.model).exists():
+        raise SystemExit(f"Model not found: {args.model} (run the vision ONNX export first)")
+    service = VisionONNXService(args.model)
+    h, w = (int(v) for v in args.image_size.split("x"))
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8) for _ in range(64)]
+    service.infer_batch_bgr(images[:4])
+    print(f"model: {args.model} input={service.input_hw} fixed_batch={service.fixed_batch}")
+
+    rows = []
+    for spec in args.configs.split(","):
+        max_batch, max_wait = spec.split(":")
+        for conc in [int(c) for c in args.concurrency.split(",")]:
+            batcher = MicroBatcher(service.infer_batch_bgr, max_batch=int(max_batch), max_wait_ms=float(max_wait))
+            ips, p50, p99 = asyncio.run(drive(batcher, images, conc, args.duration))
+            stats = batcher.stats()
+            row = {
+                "model": Path(args.model).name,
+                "max_batch": int(max_batch),
+                "max_wait_ms": float(max_wait),
+                "concurrency": conc,
+                "images_per_s": round(ips, 1),
+                "p50_ms": round(float(p50), 2),
+                "p99_ms": round(float(p99), 2),
+                "mean_batch": stats["mean_batch_size"],
+            }
+            rows.append(row)
+            print(
+                f"batch<={row['max_batch']:>3} wait={row['max_wait_ms']:>5}ms conc={conc:>3} "
+                f"img/s={row['images_per_s']:>8} p50={row['p50_ms']:>7}ms p99={row['p99_ms']:>7}ms "
+                f"mean_batch={row['mean_batch']}"
+            )
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Wrote", out)
+
+
+if __name__ == "__main__":
+    main()
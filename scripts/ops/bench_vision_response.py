@@ -0,0 +1,105 @@
+"""Bytes on the wire and serialization CPU per /vision/infer response format.
+
+``json`` is the base64-PNG JSON body (``return_image=true``): PNG encode,
+base64 and FastAPI's JSON rendering. ``jpeg`` and ``webp`` are the binary
+bodies: one encode at the ``vision_response`` quality, plus the small
+``X-`` headers. ``--image`` is fitted onto each size; without it a
+smooth synthetic scene stands in for a photo (noise would defeat every
+codec equally).
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.services.vision_pipeline import IMAGE_ENCODINGS, b64_png, encode_image  # noqa: E402
+
+RESULT = {
+    "faces": [{"x1": 158, "y1": 106, "x2": 374, "y2": 322}],
+    "timings_ms": {"decode": 1.8, "detect": 80.0, "blur": 2.9, "encode": 1.4, "infer": 12.4},
+    "pred": "class_5",
+    "score": 0.999962,
+    "consent_enabled": False,
+}
+
+
+def synthetic(h, w):
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+    img = np.stack([xx / w * 255, yy / h * 255, (xx + yy) / (h + w) * 255], axis=-1).astype(np.uint8)
+    for i in range(12):
+        cv2.circle(img, (int(w * (i + 1) / 13), int(h / 2)), int(min(h, w) / 10), (40 * i % 255, 90, 200), -1)
+    return cv2.GaussianBlur(img, (5, 5), 0)
+
+
+def json_body(img):
+    body = {**RESULT, "image_png_b64": b64_png(img)}
+    return json.dumps(jsonable_encoder(body), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def binary_body(img, fmt):
+    headers = {
+        "X-Pred": RESULT["pred"],
+        "X-Score": f"{RESULT['score']:.6f}",
+        "X-Faces": json.dumps([[158, 106, 374, 322]], separators=(",", ":")),
+        "X-Timings-Ms": json.dumps(RESULT["timings_ms"], separators=(",", ":")),
+        "X-Consent-Enabled": "false",
+    }
+    header_bytes = sum(len(k) + len(v) + 4 for k, v in headers.items())
+    return encode_image(img, fmt), header_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /vision/infer response formats")
+    parser.add_argument("--image", default=None)
+    parser.add_argument("--sizes", default="480x640,1080x1920,2160x3840", help="HxW list")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--out", default="reports/metrics/vision_response_bench.csv")
+    args = parser.parse_args()
+
+    base = cv2.imread(args.image) if args.image else None
+    if args.image and base is None:
+        raise SystemExit(f"Could not read {args.image}")
+    rows = []
+    for spec in args.sizes.split(","):
+        h, w = (int(v) for v in spec.split("x"))
+        img = cv2.resize(base, (w, h), interpolation=cv2.INTER_LINEAR) if base is not None else synthetic(h, w)
+        modes = [("json", lambda: (json_body(img), 0))]
+        modes += [(fmt, lambda fmt=fmt: binary_body(img, fmt)) for fmt in IMAGE_ENCODINGS]
+        for name, fn in modes:
+            body, header_bytes = fn()
+            times = []
+            for _ in range(args.repeats):
+                start = time.process_time()
+                fn()
+                times.append((time.process_time() - start) * 1000)
+            row = {
+                "format": name,
+                "size": spec,
+                "body_kb": round(len(body) / 1024, 1),
+                "header_bytes": header_bytes,
+                "cpu_ms_p50": round(float(np.percentile(times, 50)), 2),
+            }
+            rows.append(row)
+            print(row)
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Wrote", out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,117 @@
 from pathlib import Path
-import json
-import numpy as np
+import argparse
+import shutil
+
 import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
 from sklearn.decomposition import TruncatedSVD
 from sklearn.preprocessing import normalize
 
+from rag_common import (
+    add_corpus_args,
+    add_incremental_args,
+    add_index_args,
+    build_incremental,
+    carry_over,
+    file_fingerprint,
+    finish_version,
+    format_stats,
+    index_kwargs,
+    iter_chunks,
+    iter_source_docs,
+    reservoir_sample,
+    start_version,
+)
+from backend.app.services.bm25 import BM25_DIR, BM25Index
+from backend.app.services.docstore import DocStore
+from backend.app.services.query_embed import write_query_projection
+
+
+def make_svd_encoder(vec_path, svd_path):
+    vec = joblib.load(vec_path)
+    svd = joblib.load(svd_path)
+
+    def encode(texts):
+        return normalize(svd.transform(vec.transform(texts))).astype("float32")
 
-def iter_docs():
-    roots = [Path("README.md"), Path("docs")]
-    for r in roots:
-        if r.is_file():
-            yield {"title": "README", "url": "", "text": r.read_text(encoding="utf-8", errors="ignore")}
-        elif r.exists():
-            for p in r.rglob("*"):
-                if p.suffix.lower() in {".md", ".txt"}:
-                    yield {"title": p.stem, "url": "", "text": p.read_text(encoding="utf-8", errors="ignore")}
+    return encode
 
 
 def main():
-    docs = [d for d in iter_docs()]
-    if not docs:
+    parser = argparse.ArgumentParser(description="Build the TF-IDF/SVD RAG index")
+    add_corpus_args(parser)
+    add_index_args(parser)
+    add_incremental_args(parser)
+    parser.add_argument("--fit-sample", type=int, default=50_000, help="chunks sampled to fit TF-IDF + SVD")
+    parser.add_argument("--components", type=int, default=256, help="SVD dimensions")
+    parser.add_argument("--bm25-k1", type=float, default=1.2, help="BM25 term-frequency saturation")
+    parser.add_argument("--bm25-b", type=float, default=0.75, help="BM25 length normalization")
+    args = parser.parse_args()
+
+    base = Path("models/rag")
+    prev_dir, prev, out = start_version(base, args.full)
+    vec_path, svd_path = out / "tfidf_vectorizer.joblib", out / "svd.joblib"
+
+    # Pass 1: fit the vocabulary and projection on a bounded uniform sample.
+    # Incremental runs keep the fitted projection so unchanged rows stay valid.
+    if prev is not None and (prev_dir / vec_path.name).exists() and (prev_dir / svd_path.name).exists():
+        carry_over(prev_dir, out, vec_path.name)
+        carry_over(prev_dir, out, svd_path.name)
+        vec, svd = joblib.load(vec_path), joblib.load(svd_path)
+    else:
+        chunks = iter_chunks(iter_source_docs(args.roots, args.shards), args.chunk_words, args.overlap_words)
+        sample = reservoir_sample((c["text"] for c in chunks), args.fit_sample)
+        if not sample:
+            shutil.rmtree(out)
+            print("No docs found.")
+            return
+        vec = TfidfVectorizer(max_features=100000, stop_words="english")
+        X = vec.fit_transform(sample)
+        svd = TruncatedSVD(n_components=args.components, random_state=42)
+        svd.fit(X)
+        joblib.dump(vec, vec_path)
+        joblib.dump(svd, svd_path)
+    # Serving embeds queries with this table instead of the sklearn estimators.
+    if not write_query_projection(vec, svd, out):
+        print("Vectorizer settings not supported by the query projection; serving will use sklearn.")
+
+    # Pass 2: encode new/changed docs in the pool, copy the rest.
+    bm25_settings = {"k1": args.bm25_k1, "b": args.bm25_b}
+    Z, stats = build_incremental(
+        iter_source_docs(args.roots, args.shards),
+        out,
+        file_fingerprint(vec_path, svd_path),
+        make_svd_encoder,
+        (str(vec_path), str(svd_path)),
+        args,
+        prev_dir=prev_dir,
+        extra={"index": index_kwargs(args), "bm25": bm25_settings},
+    )
+    if not len(Z):
+        shutil.rmtree(out)
         print("No docs found.")
         return
 
-    corpus = [d["text"] for d in docs]
-    vec = TfidfVectorizer(max_features=100000, stop_words="english")
-    X = vec.fit_transform(corpus)
-    svd = TruncatedSVD(n_components=256, random_state=42)
-    Z = svd.fit_transform(X)
-    Z = normalize(Z).astype("float32")
-
-    out = Path("models/rag")
-    out.mkdir(parents=True, exist_ok=True)
-    joblib.dump(vec, out / "tfidf_vectorizer.joblib")
-    joblib.dump(svd, out / "svd.joblib")
-    np.save(out / "embeddings.npy", Z)
-    with (out / "docs.jsonl").open("w", encoding="utf-8") as f:
-        for d in docs:
-            f.write(json.dumps(d, ensure_ascii=False) + "\n")
-
-    have_faiss = False
-    try:
-        import faiss
-        idx = faiss.IndexFlatIP(Z.shape[1])
-        idx.add(Z)
-        faiss.write_index(idx, str(out / "faiss.index"))
-        have_faiss = True
-    except Exception:
-        pass
-
-    print(f"Indexed {len(docs)} docs → {out} | FAISS={'yes' if have_faiss else 'no'}")
+    # BM25 statistics (idf, avgdl) are corpus-wide, so the sparse index is
+    # rebuilt from the assembled docstore rather than patched. When it is
+    # current it is still carried over: finish_version publishes this
+    # directory anyway if only the ANN index settings changed.
+    bm25_current = prev is not None and prev.get("bm25") == bm25_settings and (prev_dir / BM25_DIR).exists()
+    if not (stats["unchanged"] and bm25_current):
+        bm25 = BM25Index.build(
+            (doc.get("text", "") for doc in DocStore(out / "docs.jsonl")),
+            k1=args.bm25_k1,
+            b=args.bm25_b,
+            stop_words=ENGLISH_STOP_WORDS,
+        )
+        bm25.save(out)
+        stats["unchanged"] = False
+    else:
+        carry_over(prev_dir, out, BM25_DIR)
+
+    version, built = finish_version(base, out, prev_dir, prev, Z, stats, args)
+    print(f"Indexed {stats['docs']} docs ({len(Z)} chunks) → {base}/{version} | index={built}")
+    print("Throughput:", format_stats(stats))
 
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 from pathlib import Path
+import argparse
+import shutil
 
-import json
-import numpy as np
 import joblib
 
 try:
@@ -9,43 +9,67 @@ try:
 except ImportError:  # pragma: no cover
     SentenceTransformer = None
 
+from rag_common import (
+    add_corpus_args,
+    add_incremental_args,
+    add_index_args,
+    build_incremental,
+    finish_version,
+    format_stats,
+    index_kwargs,
+    iter_source_docs,
+    start_version,
+)
 
-def iter_docs():
-    roots = [Path("docs"), Path("README.md")]
-    for root in roots:
-        if root.is_file():
-            yield {"title": "README", "url": "", "text": root.read_text(encoding="utf-8", errors="ignore")}
-        else:
-            for path in sorted(root.rglob("*.md")) + sorted(root.rglob("*.txt")):
-                if path.is_file():
-                    yield {"title": path.stem, "url": "", "text": path.read_text(encoding="utf-8", errors="ignore")}
+
+def make_sbert_encoder(model_name):
+    model = SentenceTransformer(model_name)
+
+    def encode(texts):
+        return model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+
+    return encode
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Build the SBERT RAG index")
+    add_corpus_args(parser)
+    add_index_args(parser)
+    add_incremental_args(parser)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    # torch already spreads one encode over every core; extra processes
+    # mostly help when the machine has cores to spare per model copy.
+    parser.set_defaults(workers=0)
+    args = parser.parse_args()
+
     if SentenceTransformer is None:
         raise SystemExit("Install sentence-transformers to build SBERT embeddings.")
-    docs = list(iter_docs())
-    if not docs:
+    base = Path("models/rag_sbert")
+    encoder_key = f"sbert:{args.model}"
+    prev_dir, prev, out_dir = start_version(base, args.full)
+    embeddings, stats = build_incremental(
+        iter_source_docs(args.roots, args.shards),
+        out_dir,
+        encoder_key,
+        make_sbert_encoder,
+        (args.model,),
+        args,
+        prev_dir=prev_dir,
+        extra={"index": index_kwargs(args)},
+    )
+    if not len(embeddings):
+        shutil.rmtree(out_dir)
         raise SystemExit("No docs found to index.")
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    texts = [doc["text"] for doc in docs]
-    embeddings = model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
-    out_dir = Path("models/rag_sbert")
-    out_dir.mkdir(parents=True, exist_ok=True)
-    np.save(out_dir / "embeddings.npy", embeddings.astype("float32"))
-    joblib.dump(model, out_dir / "encoder.joblib")
-    with (out_dir / "docs.jsonl").open("w", encoding="utf-8") as f:
-        for doc in docs:
-            f.write(json.dumps(doc, ensure_ascii=False) + "\n")
-    try:
-        import faiss
-
-        idx = faiss.IndexFlatIP(embeddings.shape[1])
-        idx.add(embeddings.astype("float32"))
-        faiss.write_index(idx, str(out_dir / "faiss.index"))
-    except Exception:
-        pass
-    print("SBERT index stored at", out_dir)
+
+    # The query encoder ships with the version it embedded.
+    prev_encoder = prev_dir / "encoder.joblib" if prev_dir is not None else None
+    if prev is not None and prev.get("encoder") == encoder_key and prev_encoder.exists():
+        shutil.copy2(prev_encoder, out_dir / "encoder.joblib")
+    else:
+        joblib.dump(SentenceTransformer(args.model), out_dir / "encoder.joblib")
+    version, built = finish_version(base, out_dir, prev_dir, prev, embeddings, stats, args)
+    print("SBERT index stored at", base / str(version), "| index:", built)
+    print("Throughput:", format_stats(stats))
 
 
 if __name__ == "__main__":
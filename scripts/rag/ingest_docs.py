@@ -1,38 +1,39 @@
-import re, json
+import argparse
 from pathlib import Path
 from sklearn.feature_extraction.text import TfidfVectorizer
 import joblib
 
-def iter_docs():
-    roots = [Path("docs"), Path("README.md")]
-    for root in roots:
-        if root.is_file():
-            text = root.read_text(encoding="utf-8", errors="ignore")
-            yield {"title": "README", "url": "", "text": text}
-        else:
-            for p in root.rglob("*"):
-                if p.suffix.lower() in {".md", ".txt"}:
-                    text = p.read_text(encoding="utf-8", errors="ignore")
-                    yield {"title": p.stem, "url": "", "text": text}
+from rag_common import add_corpus_args, iter_chunks, iter_source_docs
+from backend.app.services.docstore import DocStoreWriter
 
-def main():
-    docs = [d for d in iter_docs()]
-    if not docs:
-        print("No docs found.")
-        return
 
-    corpus = [d["text"] for d in docs]
-    vectorizer = TfidfVectorizer(max_features=50000, stop_words="english")
-    X = vectorizer.fit_transform(corpus)
+def main():
+    parser = argparse.ArgumentParser(description="Build the TF-IDF matrix artifacts for RAGIndex")
+    add_corpus_args(parser)
+    args = parser.parse_args()
 
     out_dir = Path("models/rag")
     out_dir.mkdir(parents=True, exist_ok=True)
+    stats = {"docs": 0}
+    chunks = iter_chunks(iter_source_docs(args.roots, args.shards), args.chunk_words, args.overlap_words, stats)
+
+    vectorizer = TfidfVectorizer(max_features=50000, stop_words="english")
+    with DocStoreWriter(out_dir/"docs.jsonl") as doc_writer:
+        def texts():
+            # Docs are written as the vectorizer consumes them: one pass, no list.
+            for chunk in chunks:
+                doc_writer.add(chunk)
+                yield chunk["text"]
+
+        try:
+            X = vectorizer.fit_transform(texts())
+        except ValueError:
+            print("No docs found.")
+            return
+
     joblib.dump(vectorizer, out_dir/"tfidf_vectorizer.joblib")
     joblib.dump(X, out_dir/"tfidf_matrix.joblib")
-    with (out_dir/"docs.jsonl").open("w", encoding="utf-8") as f:
-        for d in docs:
-            f.write(json.dumps(d, ensure_ascii=False) + "\n")
-    print(f"Indexed {len(docs)} docs → {out_dir}")
+    print(f"Indexed {stats['docs']} docs ({X.shape[0]} chunks) → {out_dir}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,421 @@
+"""Shared pieces of the RAG index builders (build_ann.py, build_sbert.py, ingest_docs.py).
+
+The builders stream documents from ``README.md``, ``docs/`` and the
+``data/shards/text/*.jsonl.gz`` shards written by make_text_shards.py,
+split them into overlapping word windows, and encode fixed-size blocks of
+chunks in a process pool. Embedding blocks are appended to disk as they
+complete, so memory stays bounded by the number of in-flight blocks.
+
+Each build writes a new ``<base>/<version>/`` directory that is published
+through the ``ACTIVE`` pointer (see services/index_registry.py).
+``build_incremental`` keeps a ``manifest.json`` of per-document content
+hashes in it, so the next build re-embeds only new or changed documents
+and copies every other row from the active version.
+"""
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.services.ann import INDEX_KINDS, write_ann_index  # noqa: E402
+from backend.app.services.docstore import DocStore, DocStoreWriter, offsets_path  # noqa: E402
+from backend.app.services.index_registry import (  # noqa: E402
+    REGISTRY_CFG,
+    active_dir,
+    active_version,
+    new_version_dir,
+    prune_versions,
+    publish_version,
+)
+
+TEXT_SUFFIXES = {".md", ".txt"}
+WORD_RE = re.compile(r"\S+")
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def add_index_args(parser):
+    group = parser.add_argument_group("ANN index")
+    group.add_argument("--index", choices=INDEX_KINDS, default="flat", help="vector index type")
+    group.add_argument("--nlist", type=int, default=None, help="IVF lists (default ~4*sqrt(n))")
+    group.add_argument("--pq-m", type=int, default=16, help="IVF-PQ sub-quantizers; must divide the dim")
+    group.add_argument("--hnsw-m", type=int, default=32, help="HNSW graph degree")
+    group.add_argument("--train-size", type=int, default=100_000, help="vectors sampled to train IVF")
+    group.add_argument("--nprobe", type=int, default=8, help="default IVF lists probed per query")
+    group.add_argument("--ef-search", type=int, default=64, help="default HNSW search breadth")
+    return parser
+
+
+def index_kwargs(args):
+    return {
+        "kind": args.index,
+        "nlist": args.nlist,
+        "pq_m": args.pq_m,
+        "hnsw_m": args.hnsw_m,
+        "train_size": args.train_size,
+        "nprobe": args.nprobe,
+        "ef_search": args.ef_search,
+    }
+
+
+def add_corpus_args(parser):
+    group = parser.add_argument_group("corpus")
+    group.add_argument("--roots", nargs="*", default=["README.md", "docs"], help="files or folders of .md/.txt")
+    group.add_argument("--shards", default="data/shards/text/*.jsonl.gz", help="glob of text shards ('' to skip)")
+    group.add_argument("--chunk-words", type=int, default=200, help="words per chunk")
+    group.add_argument("--overlap-words", type=int, default=40, help="words shared by consecutive chunks")
+    group.add_argument("--block-size", type=int, default=256, help="chunks per encode task / embedding block")
+    group.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="encoder processes (0 = in-process)")
+    return parser
+
+
+def add_incremental_args(parser):
+    group = parser.add_argument_group("versions")
+    group.add_argument("--full", action="store_true", help="ignore the previous version and re-embed every document")
+    group.add_argument("--keep", type=int, default=REGISTRY_CFG["keep_versions"], help="version directories to keep")
+    return parser
+
+
+def iter_source_docs(roots, shards_glob=""):
+    """Yield one dict per source document without holding the corpus in memory."""
+    for root in map(Path, roots):
+        if root.is_file():
+            title = "README" if root.name == "README.md" else root.stem
+            yield {"title": title, "url": "", "source": str(root), "text": root.read_text(encoding="utf-8", errors="ignore")}
+        elif root.is_dir():
+            for path in sorted(root.rglob("*")):
+                if path.suffix.lower() in TEXT_SUFFIXES and path.is_file():
+                    yield {"title": path.stem, "url": "", "source": str(path), "text": path.read_text(encoding="utf-8", errors="ignore")}
+    if shards_glob:
+        for shard in sorted(Path().glob(shards_glob)):
+            with gzip.open(shard, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    rec = json.loads(line)
+                    source = rec.get("path") or f"{shard}:{rec.get('id', '')}"
+                    yield {"title": Path(source).stem, "url": "", "source": source, "text": rec.get("text", "")}
+
+
+def chunk_text(text, chunk_words=200, overlap_words=40):
+    """Split ``text`` into overlapping windows of ``chunk_words`` words.
+
+    Chunks are slices of the original string, so line breaks inside a
+    window are preserved.
+    """
+    spans = [m.span() for m in WORD_RE.finditer(text)]
+    if not spans:
+        return []
+    step = max(1, chunk_words - overlap_words)
+    chunks = []
+    for start in range(0, len(spans), step):
+        window = spans[start : start + chunk_words]
+        chunks.append(text[window[0][0] : window[-1][1]])
+        if start + chunk_words >= len(spans):
+            break
+    return chunks
+
+
+def iter_chunks(docs, chunk_words=200, overlap_words=40, stats=None):
+    for doc in docs:
+        if stats is not None:
+            stats["docs"] += 1
+        for i, text in enumerate(chunk_text(doc["text"], chunk_words, overlap_words)):
+            yield {**doc, "text": text, "chunk": i}
+
+
+def reservoir_sample(items, k, seed=42):
+    rng = random.Random(seed)
+    sample = []
+    for n, item in enumerate(items):
+        if n < k:
+            sample.append(item)
+        else:
+            j = rng.randint(0, n)
+            if j < k:
+                sample[j] = item
+    return sample
+
+
+def batched(items, n):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class EmbeddingWriter:
+    """Append float32 embedding blocks to disk and finalize them as ``.npy``.
+
+    Blocks go to a raw sidecar file as they arrive; ``close`` copies them
+    block by block into a memory-mapped ``.npy`` of the final shape.
+    """
+
+    def __init__(self, path, copy_block=65536):
+        self.path = Path(path)
+        self._raw_path = self.path.with_suffix(".f32.tmp")
+        self._raw = self._raw_path.open("wb")
+        self.rows = 0
+        self.dim = None
+        self.copy_block = copy_block
+
+    def write(self, block):
+        block = np.ascontiguousarray(block, dtype="float32")
+        if self.dim is None:
+            self.dim = block.shape[1]
+        self._raw.write(block.tobytes())
+        self.rows += len(block)
+
+    def close(self):
+        self._raw.close()
+        dim = self.dim or 0
+        out = np.lib.format.open_memmap(self.path, mode="w+", dtype="float32", shape=(self.rows, dim))
+        if self.rows:
+            raw = np.memmap(self._raw_path, dtype="float32", mode="r", shape=(self.rows, dim))
+            for start in range(0, self.rows, self.copy_block):
+                out[start : start + self.copy_block] = raw[start : start + self.copy_block]
+            del raw
+        out.flush()
+        del out
+        self._raw_path.unlink(missing_ok=True)
+        return np.load(self.path, mmap_mode="r")
+
+
+_WORKER = {}
+
+
+def _init_worker(factory, args):
+    _WORKER["encode"] = factory(*args)
+
+
+def _encode_block(texts):
+    return _WORKER["encode"](texts)
+
+
+def encode_stream(chunks, factory, factory_args, emb_writer, doc_writer, block_size=256, workers=1, stats=None):
+    """Encode ``chunks`` in blocks and append vectors and docs in input order.
+
+    ``factory(*factory_args)`` is called once per worker process and must
+    return ``encode(texts) -> ndarray``. At most ``2 * workers`` blocks are
+    in flight, which bounds memory regardless of corpus size.
+    """
+    stats = stats if stats is not None else {"docs": 0}
+    stats.setdefault("chunks", 0)
+    start = time.perf_counter()
+
+    def consume(block, vecs):
+        emb_writer.write(vecs)
+        for chunk in block:
+            doc_writer.add(chunk)
+        stats["chunks"] += len(block)
+
+    if workers <= 0:
+        encode = factory(*factory_args)
+        for block in batched(chunks, block_size):
+            consume(block, encode([c["text"] for c in block]))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(factory, factory_args)) as pool:
+            pending = deque()
+            for block in batched(chunks, block_size):
+                pending.append((block, pool.submit(_encode_block, [c["text"] for c in block])))
+                if len(pending) >= 2 * workers:
+                    done_block, future = pending.popleft()
+                    consume(done_block, future.result())
+            while pending:
+                done_block, future = pending.popleft()
+                consume(done_block, future.result())
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    stats["seconds"] = round(elapsed, 2)
+    stats["docs_per_s"] = round(stats["docs"] / elapsed, 1)
+    stats["chunks_per_s"] = round(stats["chunks"] / elapsed, 1)
+    return stats
+
+
+def format_stats(stats):
+    line = (
+        f"{stats['docs']} docs / {stats['chunks']} chunks in {stats['seconds']}s "
+        f"({stats['docs_per_s']} docs/s, {stats['chunks_per_s']} chunks/s)"
+    )
+    if "reused" in stats:
+        line += f" | reused={stats['reused']} encoded={stats['encoded']} removed={stats['removed']}"
+    return line
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_fingerprint(*paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(out_dir):
+    path = Path(out_dir) / MANIFEST
+    if not path.exists():
+        return None
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+
+def _reusable(manifest, prev_dir, encoder_key, chunking):
+    # Previous rows are only valid when produced by the same encoder and
+    # chunking, and the artifacts on disk still match the manifest.
+    if manifest is None or manifest.get("encoder") != encoder_key or manifest.get("chunking") != chunking:
+        return False
+    emb_path, docs_path = prev_dir / "embeddings.npy", prev_dir / "docs.jsonl"
+    if not (emb_path.exists() and docs_path.exists()):
+        return False
+    rows = manifest.get("rows", -1)
+    return len(np.load(emb_path, mmap_mode="r")) == rows and len(DocStore(docs_path)) == rows
+
+
+def _copy_rows(src_emb, src_docs, start, count, emb_writer, doc_writer, block=65536):
+    for lo in range(start, start + count, block):
+        hi = min(lo + block, start + count)
+        emb_writer.write(src_emb[lo:hi])
+        for i in range(lo, hi):
+            doc_writer.add(src_docs[i])
+
+
+def build_incremental(docs, out_dir, encoder_key, factory, factory_args, args, prev_dir=None, extra=None):
+    """Write ``embeddings.npy``/``docs.jsonl`` into ``out_dir``, re-embedding only changed docs.
+
+    Each source document is hashed. Documents whose hash matches the
+    ``manifest.json`` in ``prev_dir`` (same encoder and chunking) copy their
+    rows from the previous version; new and changed ones are chunked and
+    encoded through ``encode_stream``; documents that disappeared are
+    dropped. Rows are written in source order.
+
+    Returns ``(embeddings, stats)``; ``stats`` adds ``reused``, ``encoded``
+    and ``removed`` document counts to the throughput fields, and
+    ``unchanged`` when the output is identical to the previous version.
+    ``extra`` is stored in the manifest as-is (e.g. the index settings).
+    """
+    out_dir = Path(out_dir)
+    chunking = {"chunk_words": args.chunk_words, "overlap_words": args.overlap_words}
+    prev = load_manifest(prev_dir) if prev_dir is not None else None
+    if not _reusable(prev, prev_dir, encoder_key, chunking):
+        prev = None
+    prev_docs = prev["docs"] if prev else {}
+
+    stats = {"docs": 0, "reused": 0, "encoded": 0}
+    plan = []
+    entries = {}
+
+    def changed_chunks():
+        new_rows = 0
+        for doc in docs:
+            digest = content_hash(doc["text"])
+            old = prev_docs.get(doc["source"])
+            entries[doc["source"]] = digest
+            if old is not None and old["hash"] == digest:
+                stats["reused"] += 1
+                plan.append((doc["source"], "old", old["start"], old["count"]))
+                continue
+            stats["encoded"] += 1
+            count = 0
+            for chunk in iter_chunks([doc], args.chunk_words, args.overlap_words, stats):
+                count += 1
+                yield chunk
+            plan.append((doc["source"], "new", new_rows, count))
+            new_rows += count
+
+    new_emb_path, new_docs_path = out_dir / "embeddings.changed.npy", out_dir / "docs.changed.jsonl"
+    new_writer = EmbeddingWriter(new_emb_path)
+    with DocStoreWriter(new_docs_path) as new_docs_writer:
+        encode_stream(changed_chunks(), factory, factory_args, new_writer, new_docs_writer, args.block_size, args.workers, stats)
+    new_emb = new_writer.close()
+    stats["docs"] = stats["reused"] + stats["encoded"]
+    stats["removed"] = len(set(prev_docs) - set(entries))
+
+    sources = {
+        "old": (np.load(prev_dir / "embeddings.npy", mmap_mode="r"), DocStore(prev_dir / "docs.jsonl")) if prev else None,
+        "new": (new_emb, DocStore(new_docs_path)),
+    }
+    emb_writer = EmbeddingWriter(out_dir / "embeddings.npy")
+    manifest_docs = {}
+    rows = 0
+    with DocStoreWriter(out_dir / "docs.jsonl") as doc_writer:
+        for source, origin, start, count in plan:
+            src_emb, src_docs = sources[origin]
+            _copy_rows(src_emb, src_docs, start, count, emb_writer, doc_writer)
+            manifest_docs[source] = {"hash": entries[source], "start": rows, "count": count}
+            rows += count
+    del sources, new_emb
+    embeddings = emb_writer.close()
+    for path in (new_emb_path, new_docs_path, offsets_path(new_docs_path)):
+        path.unlink(missing_ok=True)
+
+    stats["unchanged"] = prev is not None and manifest_docs == prev_docs
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "encoder": encoder_key,
+        "chunking": chunking,
+        "rows": rows,
+        "docs": manifest_docs,
+        **(extra or {}),
+    }
+    (out_dir / MANIFEST).write_text(json.dumps(manifest), encoding="utf-8")
+    return embeddings, stats
+
+
+def start_version(base, full=False):
+    """``(prev_dir, prev_manifest, out_dir)`` for a new build under ``base``."""
+    base.mkdir(parents=True, exist_ok=True)
+    prev_dir = None if full else active_dir(base)
+    prev = load_manifest(prev_dir) if prev_dir is not None else None
+    return prev_dir, prev, new_version_dir(base)
+
+
+def carry_over(prev_dir, out_dir, name):
+    """Copy the file or directory ``name`` from the previous version into ``out_dir``."""
+    src, dst = prev_dir / name, out_dir / name
+    if src.is_dir():
+        shutil.copytree(src, dst)
+    else:
+        shutil.copy2(src, dst)
+
+
+def finish_version(base, out_dir, prev_dir, prev, embeddings, stats, args):
+    """Index ``out_dir`` and make it the ACTIVE version; returns ``(version, index)``.
+
+    An unchanged corpus with unchanged index settings publishes nothing and
+    the new directory is discarded. IVF indexes reuse the previous version's
+    training when the settings match.
+    """
+    settings = index_kwargs(args)
+    same_index = prev is not None and prev.get("index") == settings
+    if stats["unchanged"] and same_index:
+        shutil.rmtree(out_dir)
+        return active_version(base), "unchanged"
+    built = write_ann_index(embeddings, out_dir, **settings, trained_from=prev_dir if same_index else None)
+    version = publish_version(base, out_dir)
+    prune_versions(base, args.keep)
+    return version, built
@@ -1,17 +1,23 @@
 from pathlib import Path
+import sys
 import cv2
 import numpy as np
 from csv import DictWriter
 
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.services.face_detect import HaarFaceDetector  # noqa: E402
+
 IMG_ROOT = Path("data/raw/vision/test")
 OUT = Path("reports/privacy_utility/blur_sweep.csv")
 OUT.parent.mkdir(parents=True, exist_ok=True)
 
-CASCADE = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+DETECTOR = HaarFaceDetector(min_size=30)
 
 def detect_faces(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    return CASCADE.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=5, minSize=(30, 30))
+    return [(x1, y1, x2 - x1, y2 - y1) for (x1, y1, x2, y2) in DETECTOR.detect(img)]
 
 def face_score(faces, img_gray):
     if len(faces) == 0:
@@ -0,0 +1,212 @@
+"""Quantized variants of the exported vision model plus an accuracy/latency report.
+
+Writes next to ``model.onnx`` (names from ``VARIANT_FILES``):
+
+* ``int8_static``: QDQ INT8, activations calibrated on a sample of the
+  validation images run through the serving preprocessing;
+* ``int8_dynamic``: INT8 weights, activations quantized at run time;
+* ``fp16``: FP16 weights and compute with FP32 inputs/outputs (needs
+  ``onnxconverter-common``).
+
+Every variant (and FP32) is then scored on ``--eval-samples`` validation
+images: top-1 accuracy against the ImageFolder class, top-1 agreement
+with FP32, batch-1 p50/p95 of ``session.run`` and file size. Rows go to
+``reports/metrics/latency_size.csv``. Serve a variant by setting
+``vision_model.variant`` in configs/app.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import yaml
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.services.vision_infer import VARIANT_FILES, VisionONNXService, _preprocess_into  # noqa: E402
+from backend.app.services.vision_pipeline import IMAGE_EXTS  # noqa: E402
+
+HEADER = "model_name,version,hardware,batch,p50_ms,p95_ms,size_mb,metric_name,metric_value,ts\n"
+
+
+def load_cfg():
+    cfg_path = Path("configs/vision/resnet18_classification.yml")
+    defaults = {"img_size": 224, "val_dir": "data/raw/cv/valid", "save_dir": "models/vision/resnet18"}
+    if cfg_path.exists():
+        defaults.update(yaml.safe_load(cfg_path.read_text()) or {})
+    return defaults
+
+
+def sample_images(root: Path, n: int, seed: int = 0):
+    """Up to ``n`` ``(path, class name)`` pairs from an ImageFolder tree, spread over classes."""
+    paths = sorted(p for p in root.rglob("*") if p.suffix.lower() in IMAGE_EXTS and p.is_file())
+    rng = np.random.default_rng(seed)
+    picked = sorted(rng.choice(len(paths), size=min(n, len(paths)), replace=False)) if paths else []
+    return [(paths[i], paths[i].relative_to(root).parts[0]) for i in picked]
+
+
+def tensor_for(path: Path, hw):
+    img = cv2.imread(str(path), cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    x = np.empty((1, 3) + tuple(hw), dtype=np.float32)
+    _preprocess_into(img, x[0])
+    return x
+
+
+class ImageReader:
+    """``CalibrationDataReader`` over preprocessed validation images."""
+
+    def __init__(self, input_name, paths, hw):
+        self.input_name = input_name
+        self.paths = iter(paths)
+        self.hw = hw
+
+    def get_next(self):
+        for path in self.paths:
+            x = tensor_for(path, self.hw)
+            if x is not None:
+                return {self.input_name: x}
+        return None
+
+
+def quantize_static_int8(src: Path, dst: Path, calib_paths, hw, per_channel: bool):
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    prepped = dst.with_suffix(".prep.onnx")
+    # Spatial dims are static after export, so ONNX shape inference is enough.
+    quant_pre_process(str(src), str(prepped), skip_symbolic_shape=True)
+    input_name = VisionONNXService(str(src)).input_name
+    quantize_static(
+        str(prepped),
+        str(dst),
+        ImageReader(input_name, calib_paths, hw),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=per_channel,
+        calibrate_method=CalibrationMethod.MinMax,
+    )
+    prepped.unlink(missing_ok=True)
+
+
+def quantize_dynamic_int8(src: Path, dst: Path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(str(src), str(dst), weight_type=QuantType.QUInt8)
+
+
+def convert_fp16(src: Path, dst: Path):
+    import onnx
+    from onnxconverter_common import float16
+
+    model = float16.convert_float_to_float16(onnx.load(str(src)), keep_io_types=True)
+    onnx.save(model, str(dst))
+
+
+def evaluate(path: Path, labels_path: Path, samples, runs: int):
+    service = VisionONNXService(str(path), str(labels_path) if labels_path.exists() else None)
+    preds, correct = [], 0
+    tensors = []
+    for img_path, cls in samples:
+        x = tensor_for(img_path, service.input_hw)
+        if x is None:
+            continue
+        tensors.append(x)
+        logits = service.sess.run(None, {service.input_name: x})[0]
+        label = service._label(int(np.argmax(logits[0])))
+        preds.append(label)
+        correct += int(label == cls)
+    if not tensors:
+        raise SystemExit(f"No decodable images among the {len(samples)} eval samples")
+    times = []
+    for i in range(runs):
+        x = tensors[i % len(tensors)]
+        start = time.perf_counter()
+        service.sess.run(None, {service.input_name: x})
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "preds": preds,
+        "accuracy": correct / len(preds) if preds else float("nan"),
+        "p50": float(np.percentile(times, 50)),
+        "p95": float(np.percentile(times, 95)),
+        "size_mb": path.stat().st_size / 1024 / 1024,
+    }
+
+
+def main():
+    cfg = load_cfg()
+    parser = argparse.ArgumentParser(description="Build and compare quantized vision ONNX variants")
+    parser.add_argument("--model-dir", default=cfg["save_dir"])
+    parser.add_argument("--calib-dir", default=cfg["val_dir"])
+    parser.add_argument("--calib-samples", type=int, default=200)
+    parser.add_argument("--eval-samples", type=int, default=500)
+    parser.add_argument("--variants", default="int8_static,int8_dynamic", help=f"subset of {list(VARIANT_FILES)[1:]}")
+    parser.add_argument("--per-channel", action="store_true", help="per-channel weight scales for static INT8")
+    parser.add_argument("--runs", type=int, default=100, help="timed batch-1 runs per variant")
+    parser.add_argument("--version", default="v0.1")
+    parser.add_argument("--out", default="reports/metrics/latency_size.csv")
+    args = parser.parse_args()
+
+    model_dir = Path(args.model_dir)
+    src = model_dir / VARIANT_FILES["fp32"]
+    if not src.exists():
+        raise SystemExit(f"FP32 model not found: {src} (run export_vision_onnx.py first)")
+    calib_root = Path(args.calib_dir)
+    if not calib_root.exists():
+        raise SystemExit(f"Validation images not found: {calib_root}")
+    hw = VisionONNXService(str(src)).input_hw
+    calib = [p for p, _ in sample_images(calib_root, args.calib_samples, seed=1)]
+    if not calib:
+        raise SystemExit(f"No images under {calib_root}")
+
+    builders = {
+        "int8_static": lambda dst: quantize_static_int8(src, dst, calib, hw, args.per_channel),
+        "int8_dynamic": lambda dst: quantize_dynamic_int8(src, dst),
+        "fp16": lambda dst: convert_fp16(src, dst),
+    }
+    built = ["fp32"]
+    for variant in [v for v in args.variants.split(",") if v]:
+        if variant not in builders:
+            raise SystemExit(f"Unknown variant {variant!r}; choose from {list(builders)}")
+        dst = model_dir / VARIANT_FILES[variant]
+        try:
+            builders[variant](dst)
+        except ImportError as exc:
+            print(f"skip {variant}: {exc}")
+            continue
+        built.append(variant)
+        print(f"wrote {dst}")
+
+    samples = sample_images(calib_root, args.eval_samples, seed=2)
+    labels_path = model_dir / "labels.txt"
+    results = {v: evaluate(model_dir / VARIANT_FILES[v], labels_path, samples, args.runs) for v in built}
+    reference = results["fp32"]["preds"]
+    ts = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    header = not out.exists() or out.stat().st_size == 0
+    with out.open("a", encoding="utf-8") as f:
+        if header:
+            f.write(HEADER)
+        for variant, res in results.items():
+            agreement = float(np.mean([a == b for a, b in zip(res["preds"], reference)])) if reference else float("nan")
+            print(
+                f"{variant:>13}: acc={res['accuracy']:.4f} agree={agreement:.4f} "
+                f"p50={res['p50']:.2f}ms p95={res['p95']:.2f}ms size={res['size_mb']:.2f}MB"
+            )
+            for metric, value in (("top1_acc", res["accuracy"]), ("top1_agreement_fp32", agreement)):
+                f.write(
+                    f"resnet18_onnx_{variant},{args.version},CPU,1,{res['p50']:.2f},{res['p95']:.2f},"
+                    f"{res['size_mb']:.2f},{metric},{value:.4f},{ts}\n"
+                )
+    print("Appended quantization comparison to", out)
+
+
+if __name__ == "__main__":
+    main()